@@ -53,10 +53,13 @@ CREATE INDEX idx_personas_documento ON personas(numero_documento);
 CREATE INDEX idx_personas_tipo_documento ON personas(tipo_documento);
 CREATE INDEX idx_personas_fecha_nacimiento ON personas(fecha_nacimiento);
 CREATE INDEX idx_personas_created_at ON personas(created_at);
+-- Orden y cursor de /search (keyset sobre created_at, id)
+CREATE INDEX idx_personas_created_at_id ON personas(created_at DESC, id DESC);
 
 CREATE INDEX idx_logs_transaction_type ON transaction_logs(transaction_type);
 CREATE INDEX idx_logs_numero_documento ON transaction_logs(numero_documento);
 CREATE INDEX idx_logs_created_at ON transaction_logs(created_at);
+CREATE INDEX idx_logs_created_at_id ON transaction_logs(created_at DESC, id DESC);
 CREATE INDEX idx_logs_user_id ON transaction_logs(user_id);
 
 -- Función para actualizar el timestamp de updated_at
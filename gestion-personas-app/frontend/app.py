@@ -1,16 +1,41 @@
-﻿from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+﻿from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, copy_current_request_context, has_request_context, abort, send_file, stream_with_context, got_request_exception, before_render_template, template_rendered
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from collections import OrderedDict
 from datetime import datetime, date
+from http.cookiejar import DefaultCookiePolicy
+import bisect
+import copy
+import csv
+import functools
+import gzip
+import hashlib
+import itertools
 import json
+import logging
+import logging.handlers
+import mimetypes
 import os
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from io import BytesIO, StringIO, TextIOWrapper
 from dotenv import load_dotenv
-import base64
-from io import BytesIO
-from PIL import Image
-import plotly
-import plotly.express as px
-import plotly.graph_objects as go
+from flask.logging import default_handler
+from werkzeug.utils import secure_filename
+from flask_session.sessions import ServerSideSession, SessionInterface as ServerSideSessionInterface
+from itsdangerous import BadSignature, want_bytes
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+# pandas and Pillow are heavy (most of the import time and RSS) and are not needed
+# to serve requests: import them inside the functions that use them
 
 # Load environment variables - look in parent directory for .env
 load_dotenv(dotenv_path='../.env')
@@ -19,108 +44,2447 @@ load_dotenv()  # Also load from current directory if exists
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 
+IS_DEVELOPMENT = os.getenv('FLASK_DEBUG') == '1' or os.getenv('FLASK_ENV') == 'development'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if IS_DEVELOPMENT else 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text' if IS_DEVELOPMENT else 'json')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Fraction of high-volume debug lines (one per upstream call) that are kept
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1' if IS_DEVELOPMENT else '0.01'))
+# Request/response bodies may hold personal data: never logged unless enabled
+LOG_REQUEST_BODIES = os.getenv('LOG_REQUEST_BODIES', 'true' if IS_DEVELOPMENT else 'false').lower() == 'true'
+
+_STANDARD_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'sampled'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as JSON lines (or key=value text), including ``extra`` fields"""
+
+    def __init__(self, json_output=True):
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _STANDARD_RECORD_ATTRS}
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if self.json_output:
+            payload = {'ts': self.formatTime(record), 'level': record.levelname,
+                       'logger': record.name, 'msg': message, **fields}
+            if record.exc_text:
+                payload['exc'] = record.exc_text
+            return json.dumps(payload, default=str, ensure_ascii=False)
+        text = f"{self.formatTime(record)} {record.levelname} {message}"
+        if fields:
+            text += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            text += '\n' + record.exc_text
+        return text
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of debug records marked with ``extra={'sampled': True}``"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'sampled', False) and record.levelno <= logging.DEBUG:
+            return self.rate >= 1 or random.random() < self.rate
+        return True
+
+
+class BatchedStreamHandler(logging.StreamHandler):
+    """Stream handler that leaves flushing to the queue listener (once per burst, not per line)"""
+
+    def flush(self):
+        pass
+
+    def flush_pending(self):
+        super().flush()
+
+    def close(self):
+        self.flush_pending()
+        super().close()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes its handlers whenever the queue runs empty"""
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                getattr(handler, 'flush_pending', handler.flush)()
+            return self.queue.get(block)
+
+    def enqueue_sentinel(self):
+        # Blocks rather than raising queue.Full: the records ahead of it are still written
+        self.queue.put(self._sentinel)
+
+
+_IMMUTABLE_LOG_ARGS = (str, bytes, int, float, bool)
+
+
+def _immutable_args(args):
+    values = args.values() if isinstance(args, dict) else args
+    return all(value is None or isinstance(value, _IMMUTABLE_LOG_ARGS) for value in values)
+
+
+class AsyncLogHandler(logging.handlers.QueueHandler):
+    """Queue-backed handler: request threads only enqueue, a listener thread writes.
+
+    The queue is bounded; when it is full records are dropped (and counted)
+    instead of blocking the request. The listener is started lazily per
+    process so preforked workers each get their own.
+    """
+
+    def __init__(self, target, maxsize=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def handle(self, record):
+        # Queue.put is thread-safe: skip Handler's lock, which would serialize the request threads
+        result = self.filter(record)
+        if result:
+            self.emit(result if isinstance(result, logging.LogRecord) else record)
+        return result
+
+    def prepare(self, record):
+        # Formatting (message, extra fields) happens on the listener thread; arguments
+        # that could change before then are interpolated here
+        if record.args and not _immutable_args(record.args):
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_listener(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Records queued by a parent process would never be drained here
+            self.queue = queue.Queue(self.maxsize)
+            self._listener = BatchingQueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._listener = None
+        super().close()
+
+
+def configure_logging(flask_app):
+    """Route the app logger through a non-blocking, structured, sampled handler"""
+    stream_handler = BatchedStreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(json_output=LOG_FORMAT == 'json'))
+    handler = AsyncLogHandler(stream_handler)
+    handler.addFilter(DebugSamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+
+    flask_app.logger.removeHandler(default_handler)
+    flask_app.logger.addHandler(handler)
+    flask_app.logger.setLevel(LOG_LEVEL)
+    flask_app.logger.propagate = False
+    return handler
+
+
+log_handler = configure_logging(app)
+
 # Debug: Ensure environment variables are loaded correctly
 if os.getenv('API_GATEWAY_URL'):
-    print(f"INFO: Using API_GATEWAY_URL: {os.getenv('API_GATEWAY_URL')}")
+    app.logger.info(f"Using API_GATEWAY_URL: {os.getenv('API_GATEWAY_URL')}")
 else:
-    print("INFO: Using default API_GATEWAY_URL: http://localhost:8001")
+    app.logger.info("Using default API_GATEWAY_URL: http://localhost:8001")
+
+# Server-side sessions: the cookie only carries a signed opaque session id
+SESSION_TYPE = os.getenv('SESSION_TYPE', 'filesystem').lower()
+SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/1')
+SESSION_FILE_DIR = os.getenv('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'flask-sessions'))
+SESSION_FILE_THRESHOLD = int(os.getenv('SESSION_FILE_THRESHOLD', '10000'))
+SESSION_LIFETIME_SECONDS = int(os.getenv('SESSION_LIFETIME_SECONDS', str(12 * 3600)))
+SESSION_KEY_PREFIX = 'session:'
+
+
+class LazyServerSideSession(ServerSideSession):
+    """Server-side session whose data is fetched from the store on first access.
+
+    Requests that never read the session (static files, photos, health
+    checks) do not touch the store at all. Loading goes through ``dict``
+    directly so it does not mark the session as modified.
+    """
+
+    def __init__(self, sid, loader=None):
+        ServerSideSession.__init__(self, sid=sid)
+        self._loader = loader
+        self._load_lock = threading.Lock()
+        self.loaded = loader is None
+        self.new = loader is None
+        # Set by LazySessionInterface.rotate: deleted from the store on save
+        self.previous_sid = None
+
+    def _load(self):
+        if self.loaded:
+            return
+        # Threads sharing the request (stream_with_context, copy_current_request_context)
+        # must not see the session as loaded before its data is there
+        with self._load_lock:
+            if not self.loaded:
+                data = self._loader()
+                if data:
+                    dict.update(self, data)
+                self.loaded = True
+
+    def __getitem__(self, key):
+        self._load()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load()
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._load()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self._load()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load()
+        return super().__len__()
+
+    def keys(self):
+        self._load()
+        return super().keys()
+
+    def values(self):
+        self._load()
+        return super().values()
+
+    def items(self):
+        self._load()
+        return super().items()
+
+    def __setitem__(self, key, value):
+        self._load()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._load()
+        super().__delitem__(key)
+
+    def setdefault(self, key, default=None):
+        self._load()
+        return super().setdefault(key, default)
+
+    def pop(self, key, *default):
+        self._load()
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self._load()
+        return super().popitem()
+
+    def update(self, *args, **kwargs):
+        self._load()
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._load()
+        super().clear()
+
+
+class LazySessionInterface(ServerSideSessionInterface):
+    """Flask-Session backed session store with lazy load and write-back.
+
+    ``cache`` is any cachelib cache (``FileSystemCache`` locally,
+    ``RedisCache`` when several hosts share sessions). The store is read
+    only if a view touches the session and written only if it was modified;
+    the cookie is set once, when a session is first stored.
+    """
+
+    def __init__(self, cache, key_prefix=SESSION_KEY_PREFIX, lifetime_seconds=SESSION_LIFETIME_SECONDS):
+        self.cache = cache
+        self.key_prefix = key_prefix
+        self.lifetime_seconds = lifetime_seconds
+
+    def open_session(self, app, request):
+        signer = self._get_signer(app)
+        if signer is None:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = signer.unsign(cookie).decode()
+                return LazyServerSideSession(sid, loader=lambda: self.cache.get(self.key_prefix + sid))
+            except BadSignature:
+                # Legacy signed-cookie sessions land here and start over
+                pass
+        return LazyServerSideSession(self._generate_sid())
+
+    def rotate(self, session):
+        """Move ``session`` to a fresh id, keeping its data.
+
+        Called on login so an id planted in the browser before authenticating
+        (session fixation) never becomes an authenticated session.
+        """
+        session._load()
+        if session.previous_sid is None:
+            session.previous_sid = session.sid
+        session.sid = self._generate_sid()
+        session.new = True
+        session.modified = True
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            return
+        if session.previous_sid is not None:
+            self.cache.delete(self.key_prefix + session.previous_sid)
+        if not session.new:
+            response.vary.add('Cookie')
+        # Sliding expiry: an unmodified session is re-stored once a quarter of its lifetime has passed
+        stale = bool(session) and session.get('_stored_at', 0) < time.time() - self.lifetime_seconds / 4
+        if not session.modified and not stale:
+            return
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            self.cache.delete(self.key_prefix + session.sid)
+            if not session.new:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        dict.__setitem__(session, '_stored_at', time.time())
+        self.cache.set(self.key_prefix + session.sid, dict(session), self.lifetime_seconds)
+        if session.new or session.permanent:
+            response.vary.add('Cookie')
+            response.set_cookie(
+                name, self._get_signer(app).sign(want_bytes(session.sid)).decode(),
+                expires=self.get_expiration_time(app, session), httponly=self.get_cookie_httponly(app),
+                domain=domain, path=path, secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+
+def create_session_cache():
+    """Session store for SESSION_TYPE: 'redis' or the local 'filesystem' stand-in"""
+    if SESSION_TYPE == 'redis':
+        import redis
+        from cachelib.redis import RedisCache
+        return RedisCache(redis.Redis.from_url(SESSION_REDIS_URL), key_prefix='',
+                          default_timeout=SESSION_LIFETIME_SECONDS)
+    from cachelib.file import FileSystemCache
+    return FileSystemCache(SESSION_FILE_DIR, threshold=SESSION_FILE_THRESHOLD,
+                           default_timeout=SESSION_LIFETIME_SECONDS)
+
+
+app.session_interface = LazySessionInterface(create_session_cache())
+
+
+def rotate_session():
+    """Give the current session a new id; call before marking it authenticated"""
+    app.session_interface.rotate(session._get_current_object())
+
+
+# API Configuration
+# For browser redirects (Auth0), always use localhost regardless of Docker internal URLs
+BROWSER_API_BASE_URL = 'http://localhost:8001'
+# For server-side API calls, use environment variable or default to localhost
+API_BASE_URL = os.getenv('API_GATEWAY_URL', 'http://localhost:8001')
+
+def get_browser_api_url():
+    """Get API URL for browser redirects (always localhost for external access)"""
+    return BROWSER_API_BASE_URL
+
+def build_image_url(foto_url, size=None):
+    """Build complete image URL using the gateway.
+
+    With ``size`` (in pixels) the URL points to the smallest cached
+    rendition of at least that size served by this frontend.
+    """
+    if size and foto_url and foto_url.startswith('/uploads/') and has_request_context():
+        filename = foto_url[len('/uploads/'):]
+        return url_for('persona_photo', size=thumbnail_size_for(size), filename=filename)
+    if foto_url and foto_url.startswith('/uploads/'):
+        # Use BROWSER_API_BASE_URL for images that will be loaded by the browser
+        return f"{BROWSER_API_BASE_URL}{foto_url}"
+    return foto_url
+
+def invalidate_stats_cache(auth_token=None):
+    """Invalidate stats cache to force refresh of dashboard"""
+    try:
+        make_request('POST', '/api/consulta/cache/invalidate-stats', timeout_seconds=2.0, auth_token=auth_token)
+        app.logger.info("Stats cache invalidated successfully")
+    except Exception as e:
+        app.logger.warning(f"Failed to invalidate stats cache: {e}")
+        # No bloquear la operación principal si falla la invalidación del cache
+    finally:
+        # Only after consulta's: a snapshot fetched in between would still hold the
+        # old numbers and, under an already bumped version, be served for a whole TTL
+        stats_cache.invalidate()
+    # Push the new numbers to connected dashboards of this worker
+    stats_broadcaster.notify()
+
+# Jinja context: expose date/datetime to templates
+@app.context_processor
+def inject_datetime_tools():
+    return {
+        'date': date,
+        'datetime': datetime,
+        'build_image_url': build_image_url,
+        'asset_url': asset_url
+    }
+
+# Also register as Jinja globals to ensure availability in all render paths
+app.jinja_env.globals.update(date=date, datetime=datetime)
+
+# Compiled templates persist across restarts: a new master loads bytecode
+# instead of parsing and compiling the template sources (empty disables)
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR',
+                                        os.path.join(tempfile.gettempdir(), 'frontend-jinja-cache'))
+# Compile every template at import, so with gunicorn's preload the workers
+# inherit them from the master instead of each compiling on first render
+TEMPLATE_PRECOMPILE = os.getenv('TEMPLATE_PRECOMPILE', 'false' if IS_DEVELOPMENT else 'true').lower() == 'true'
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', '256'))
+FRAGMENT_CACHE_MAX_BYTES = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', str(2 * 1024 * 1024)))
+
+if TEMPLATE_BYTECODE_CACHE_DIR:
+    os.makedirs(TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
+    # Keyed by template name and source checksum, so edited templates are recompiled
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_BYTECODE_CACHE_DIR)
+
+
+class FragmentCache:
+    """Per-worker LRU of rendered template fragments keyed by (name, data version).
+
+    Templates wrap blocks that depend only on cacheable data in
+    ``{% call cache_fragment('name', version) %}...{% endcall %}``: the block
+    is rendered once per version and later renders reuse the markup. The
+    version must cover everything the block reads (e.g. the
+    ``stats_fingerprint`` of the stats it shows, or the selected filter
+    values), never per-user data or CSRF tokens. ``None`` renders uncached.
+    """
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_MAX_ENTRIES, max_bytes=FRAGMENT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, name, version, caller):
+        if version is None or self.max_entries <= 0:
+            return caller()
+        key = (name, version)
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return markup
+            self.misses += 1
+
+        # Rendered outside the lock: concurrent misses may both render, and the last one is kept
+        markup = Markup(caller())
+        if len(markup) > self.max_bytes:
+            return markup
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = markup
+            self._bytes += len(markup)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+                self.evictions += 1
+        return markup
+
+    def status(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+fragment_cache = FragmentCache()
+app.jinja_env.globals['cache_fragment'] = fragment_cache.render
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+# Shared directory where every gunicorn worker writes its samples, so a scrape
+# of any worker reports the whole container (empty: only the scraped worker)
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+# When set, /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5,
+                   0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+METRIC_KINDS = ('counters', 'gauges', 'histograms')
+
+
+class Metrics:
+    """Prometheus-style counters, gauges and histograms with per-thread aggregation.
+
+    Every thread records into its own dicts without taking a lock; a scrape
+    sums the shards of all threads (and, with ``directory``, the snapshots
+    other workers flush there). Samples are keyed by ``(name, label_values)``;
+    metrics are declared once with their type, help text and label names.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, directory=METRICS_DIR, flush_seconds=METRICS_FLUSH_SECONDS):
+        self.buckets = buckets
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.definitions = {}
+        self._collectors = []
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Start empty: a forked worker must not report its parent's samples"""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        # Samples of threads that have exited, so their shards can be dropped
+        self._retired = self.empty()
+        self._flusher_pid = None
+
+    @staticmethod
+    def empty():
+        return {kind: {} for kind in METRIC_KINDS}
+
+    def declare(self, kind, name, help_text, labels=()):
+        self.definitions[name] = (kind, help_text, tuple(labels))
+
+    def register_collector(self, collector):
+        """``collector()`` yields ``(name, label_values, value)`` for values read at scrape time"""
+        self._collectors.append(collector)
+
+    def _register_thread(self):
+        shard = self.empty()
+        self._local.counters = shard['counters']
+        self._local.gauges = shard['gauges']
+        self._local.histograms = shard['histograms']
+        with self._lock:
+            # Thread-per-request servers start a thread for every request: fold the
+            # shards of finished threads now rather than only when someone scrapes
+            self._retire_dead_threads()
+            self._shards.append((threading.current_thread(), shard))
+            self._start_flusher()
+        return shard
+
+    def _retire_dead_threads(self):
+        """Merge the shards of exited threads into ``_retired`` (caller holds the lock)"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self.merge(self._retired, shard)
+        self._shards = live
+
+    def inc(self, name, labels=(), amount=1):
+        try:
+            counters = self._local.counters
+        except AttributeError:
+            counters = self._register_thread()['counters']
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def add(self, name, labels=(), amount=1):
+        """Move a gauge by ``amount``; shards are summed, so +1 and -1 may come from different threads"""
+        try:
+            gauges = self._local.gauges
+        except AttributeError:
+            gauges = self._register_thread()['gauges']
+        key = (name, labels)
+        gauges[key] = gauges.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        try:
+            histograms = self._local.histograms
+        except AttributeError:
+            histograms = self._register_thread()['histograms']
+        key = (name, labels)
+        counts = histograms.get(key)
+        if counts is None:
+            # One count per bucket plus +Inf, then the sum of observed values
+            counts = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        counts[-1] += seconds
+
+    @staticmethod
+    def merge(totals, samples):
+        """Add ``samples`` into ``totals`` (both shaped like ``empty()``)"""
+        for kind in ('counters', 'gauges'):
+            target = totals[kind]
+            for key, value in samples[kind].items():
+                target[key] = target.get(key, 0) + value
+        target = totals['histograms']
+        for key, counts in samples['histograms'].items():
+            current = target.get(key)
+            if current is None:
+                target[key] = list(counts)
+            else:
+                for index, count in enumerate(counts):
+                    current[index] += count
+
+    def snapshot(self):
+        """Totals of this process, including collector values"""
+        with self._lock:
+            self._retire_dead_threads()
+            live = self._shards
+            totals = self.empty()
+            self.merge(totals, self._retired)
+        for _, shard in live:
+            # Copies are taken under the GIL; the owning thread may keep recording meanwhile
+            self.merge(totals, {kind: dict(shard[kind]) for kind in METRIC_KINDS})
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                kind = 'gauges' if self.definitions[name][0] == 'gauge' else 'counters'
+                totals[kind][(name, labels)] = totals[kind].get((name, labels), 0) + value
+        return totals
+
+    def _path_for(self, pid):
+        return os.path.join(self.directory, f'worker-{pid}.json')
+
+    @property
+    def _archive_path(self):
+        return os.path.join(self.directory, 'archived.json')
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {kind: {(name, tuple(labels)): value for name, labels, value in payload.get(kind, ())}
+                for kind in METRIC_KINDS}
+
+    def _write(self, path, samples):
+        payload = {kind: [[name, list(labels), value] for (name, labels), value in samples[kind].items()]
+                   for kind in METRIC_KINDS}
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(temp_path, path)
+
+    def flush(self, samples=None):
+        """Write this worker's totals to the shared directory"""
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self._path_for(os.getpid()), samples or self.snapshot())
+        except OSError as e:
+            app.logger.warning("Failed to write metrics snapshot", extra={'error': str(e)})
+
+    def _start_flusher(self):
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def flush_periodically():
+            while True:
+                time.sleep(self.flush_seconds)
+                self.flush()
+
+        threading.Thread(target=flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def collect(self):
+        """Totals of every worker sharing ``directory`` (just this one without it)"""
+        own = self.snapshot()
+        if not self.directory:
+            return own
+        self.flush(own)
+        totals = self.empty()
+        self.merge(totals, own)
+        own_path = self._path_for(os.getpid())
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.endswith('.json') and path != own_path:
+                samples = self._read(path)
+                if samples is not None:
+                    self.merge(totals, samples)
+        return totals
+
+    def archive(self, pid):
+        """Fold the snapshot of an exited worker into the archive file (run by the gunicorn master).
+
+        Counters and histograms keep their totals; gauges such as in-flight
+        requests ended with the worker.
+        """
+        samples = self._read(self._path_for(pid))
+        if samples is None:
+            return
+        samples['gauges'] = {}
+        archived = self._read(self._archive_path) or self.empty()
+        self.merge(archived, samples)
+        self._write(self._archive_path, archived)
+        os.remove(self._path_for(pid))
+
+    @staticmethod
+    def format_value(value):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value) if isinstance(value, float) else str(value)
+
+    @staticmethod
+    def format_labels(pairs):
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self, samples):
+        """Prometheus text exposition format (version 0.0.4)"""
+        by_name = {}
+        for kind in METRIC_KINDS:
+            for (name, labels), value in samples[kind].items():
+                by_name.setdefault(name, []).append((labels, value))
+
+        bounds = self.buckets + (float('inf'),)
+        lines = []
+        for name, (kind, help_text, label_names) in self.definitions.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(by_name.get(name, ()), key=lambda sample: sample[0]):
+                pairs = list(zip(label_names, labels))
+                if kind != 'histogram':
+                    lines.append(f'{name}{self.format_labels(pairs)} {self.format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{self.format_labels(pairs + [("le", self.format_value(bound))])} {cumulative}')
+                lines.append(f'{name}_sum{self.format_labels(pairs)} {self.format_value(value[-1])}')
+                lines.append(f'{name}_count{self.format_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.declare('histogram', 'frontend_http_request_duration_seconds', 'Time to produce a response, per Flask endpoint', ('endpoint',))
+metrics.declare('counter', 'frontend_http_requests_total', 'Responses per Flask endpoint, method and status', ('endpoint', 'method', 'status'))
+metrics.declare('counter', 'frontend_http_exceptions_total', 'Unhandled exceptions per Flask endpoint', ('endpoint',))
+metrics.declare('gauge', 'frontend_http_requests_in_flight', 'Requests being processed')
+metrics.declare('histogram', 'frontend_upstream_request_duration_seconds', 'Gateway call duration per path template', ('upstream', 'method'))
+metrics.declare('counter', 'frontend_upstream_requests_total',
+                'Gateway calls per path template and outcome (status code, timeout, connection_error, error, short_circuited)',
+                ('upstream', 'method', 'outcome'))
+metrics.declare('gauge', 'frontend_upstream_requests_in_flight', 'Gateway calls waiting for a response', ('upstream',))
+metrics.declare('counter', 'frontend_cache_requests_total', 'Cache lookups per cache and result (hit, stale, miss)', ('cache', 'result'))
+metrics.declare('gauge', 'frontend_cache_hit_ratio', 'Share of cache lookups answered from the cache (hit or stale)', ('cache',))
+metrics.declare('gauge', 'frontend_circuit_open', '1 while the circuit breaker of an upstream is open', ('circuit',))
+metrics.declare('counter', 'frontend_stale_responses_served_total', 'Stale gateway responses served while an upstream failed')
+metrics.declare('counter', 'frontend_retry_budget_attempts_total', 'Hedges and retries taken from the retry budget, and attempts it denied', ('result',))
+metrics.declare('counter', 'frontend_log_records_dropped_total', 'Log records dropped because the log queue was full')
+
+
+# Server-Timing on every response (upstream, render and app time); exposes timings to browsers
+TRACE_SERVER_TIMING = os.getenv('TRACE_SERVER_TIMING', 'true').lower() == 'true'
+# Finished traces go to a JSON-lines file or are POSTed to a collector URL (empty: not exported)
+TRACE_EXPORT = os.getenv('TRACE_EXPORT', '')
+TRACE_EXPORT_SAMPLE_RATE = float(os.getenv('TRACE_EXPORT_SAMPLE_RATE', '1'))
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv('TRACE_EXPORT_QUEUE_SIZE', '1000'))
+TRACE_EXPORT_BATCH_SIZE = 100
+TRACE_HEADER = 'X-Trace-Id'
+# Incoming trace ids are only reused when they look like one
+TRACE_ID_PATTERN = re.compile(r'^[A-Za-z0-9-]{8,64}$')
+
+
+class RequestTrace:
+    """Timed spans of one incoming request, shared by every thread working on it.
+
+    Upstream spans keep the Server-Timing entries the gateway and services
+    returned, so a slow request can be pinned to a hop (gateway auth,
+    consulta queries, Jinja render) instead of guessed at.
+    """
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._render_started = []
+
+    def add(self, kind, name, started, duration, **attributes):
+        span = {'kind': kind, 'name': name, 'start_ms': round((started - self.started) * 1000, 2),
+                'duration_ms': round(duration * 1000, 2), **attributes}
+        with self._lock:
+            self.spans.append(span)
+
+    def start_render(self):
+        self._render_started.append(time.perf_counter())
+
+    def finish_render(self, template_name):
+        if self._render_started:
+            started = self._render_started.pop()
+            self.add('render', template_name, started, time.perf_counter() - started)
+
+    def _busy_ms(self, kind):
+        """Wall time covered by spans of ``kind``; parallel fan-out calls overlap"""
+        busy, end = 0.0, None
+        for span in sorted((s for s in self.spans if s['kind'] == kind), key=lambda s: s['start_ms']):
+            start, stop = span['start_ms'], span['start_ms'] + span['duration_ms']
+            if end is None or start > end:
+                busy += stop - start
+                end = stop
+            elif stop > end:
+                busy += stop - end
+                end = stop
+        return busy
+
+    def server_timing(self, total_ms):
+        with self._lock:
+            upstream_calls = [span for span in self.spans if span['kind'] == 'upstream']
+            upstream_ms = self._busy_ms('upstream')
+            render_ms = self._busy_ms('render')
+        entries = [f'upstream;dur={upstream_ms:.1f};desc="{len(upstream_calls)} calls"']
+        # Hops reported by the gateway and services, summed over this request's calls
+        hops = {}
+        for span in upstream_calls:
+            for name, duration in span.get('server_timing', {}).items():
+                hops[name] = hops.get(name, 0.0) + duration
+        entries += [f'{name};dur={duration:.1f}' for name, duration in hops.items()]
+        entries.append(f'render;dur={render_ms:.1f}')
+        entries.append(f'app;dur={max(0.0, total_ms - upstream_ms - render_ms):.1f}')
+        entries.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(entries)
+
+    def to_dict(self, **fields):
+        with self._lock:
+            spans = list(self.spans)
+        return {'trace_id': self.trace_id, 'start': self.started_at, **fields, 'spans': spans}
+
+
+def parse_server_timing(header):
+    """'db;dur=3.2;desc="2 queries", gateway;dur=9' -> {'db': 3.2, 'gateway': 9.0}"""
+    timings = {}
+    for entry in (header or '').split(','):
+        name, _, params = entry.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if name and key == 'dur':
+                try:
+                    timings[name] = timings.get(name, 0.0) + float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+def current_trace():
+    """Trace of the request being served by this thread, if any"""
+    if not has_request_context():
+        return None
+    return request.environ.get('frontend.trace')
+
+
+class TraceContextFilter(logging.Filter):
+    """Add the trace id of the current request to log records"""
+
+    def filter(self, record):
+        trace = current_trace()
+        if trace is not None:
+            record.trace_id = trace.trace_id
+        return True
+
+
+class TraceExporter:
+    """Export finished traces from a background thread, never blocking the request.
+
+    ``target`` is a file path (one JSON object per line) or an http(s) URL
+    that receives batches as ``{"traces": [...]}``. The queue is bounded;
+    traces are dropped (and counted) when it is full.
+    """
+
+    def __init__(self, target, maxsize=TRACE_EXPORT_QUEUE_SIZE, sample_rate=TRACE_EXPORT_SAMPLE_RATE):
+        self.target = target
+        self.maxsize = maxsize
+        self.sample_rate = sample_rate
+        self.exported = 0
+        self.dropped = 0
+        self._queue = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def export(self, trace_record):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        if self._pid != os.getpid():
+            self._start_worker()
+        try:
+            self._queue.put_nowait(trace_record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_worker(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.maxsize)
+            threading.Thread(target=self._run, name='trace-export', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < TRACE_EXPORT_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                app.logger.warning("Trace export failed", extra={'target': self.target, 'error': str(e)})
+
+    def _write(self, batch):
+        if self.target.startswith(('http://', 'https://')):
+            requests.post(self.target, json={'traces': batch}, timeout=5).raise_for_status()
+            return
+        lines = ''.join(json.dumps(record, default=str, ensure_ascii=False) + '\n' for record in batch)
+        # One unbuffered append per batch, so workers sharing the file do not interleave lines
+        with open(self.target, 'ab', buffering=0) as f:
+            f.write(lines.encode('utf-8'))
+
+
+trace_exporter = TraceExporter(TRACE_EXPORT) if TRACE_EXPORT else None
+log_handler.addFilter(TraceContextFilter())
+
+
+DEFAULT_HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', '6'))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', '3'))
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '32'))
+
+def parse_endpoint_timeouts(raw):
+    """Parse '/api/nlp=20,/api/consulta=6' into {prefix: seconds}"""
+    timeouts = {}
+    for item in (raw or '').split(','):
+        if '=' not in item:
+            continue
+        prefix, seconds = item.split('=', 1)
+        try:
+            timeouts[prefix.strip()] = float(seconds)
+        except ValueError:
+            app.logger.warning(f"Ignoring invalid endpoint timeout: {item}")
+    return timeouts
+
+# Per-endpoint read timeouts (longest prefix wins); NLP answers come from Gemini and are slower
+HTTP_ENDPOINT_TIMEOUTS = parse_endpoint_timeouts(os.getenv('HTTP_ENDPOINT_TIMEOUTS', '/api/nlp=20'))
+
+
+class GatewayClient:
+    """Per-process HTTP client for the API gateway.
+
+    All worker threads share one bounded urllib3 connection pool, so
+    connections to the gateway are kept alive and reused instead of being
+    opened per call. Each thread gets its own lightweight ``requests.Session``
+    mounted on that pool (sessions are not thread-safe), and the pool is
+    rebuilt after a fork so preforked workers never share sockets.
+    """
+
+    def __init__(self, base_url, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                 default_timeout=DEFAULT_HTTP_TIMEOUT_SECONDS, connect_timeout=HTTP_CONNECT_TIMEOUT_SECONDS,
+                 endpoint_timeouts=None):
+        self.base_url = base_url.rstrip('/')
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.default_timeout = default_timeout
+        self.connect_timeout = connect_timeout
+        self.endpoint_timeouts = dict(endpoint_timeouts or {})
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._adapter = None
+        self._pid = None
+
+    def _get_adapter(self):
+        pid = os.getpid()
+        if self._adapter is None or self._pid != pid:
+            with self._lock:
+                if self._adapter is None or self._pid != pid:
+                    self._adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                                pool_maxsize=self.pool_maxsize)
+                    self._pid = pid
+        return self._adapter
+
+    def _get_session(self):
+        adapter = self._get_adapter()
+        http = getattr(self._local, 'session', None)
+        if http is None or self._local.adapter is not adapter:
+            http = requests.Session()
+            # Never keep gateway cookies: the pool is shared by every user of this worker
+            http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            http.mount('http://', adapter)
+            http.mount('https://', adapter)
+            self._local.session = http
+            self._local.adapter = adapter
+        return http
+
+    def timeout_for(self, endpoint, timeout_seconds=None):
+        """Return the (connect, read) timeout for an endpoint"""
+        if timeout_seconds is None:
+            timeout_seconds = self.default_timeout
+            matches = [prefix for prefix in self.endpoint_timeouts if endpoint.startswith(prefix)]
+            if matches:
+                timeout_seconds = self.endpoint_timeouts[max(matches, key=len)]
+        return (min(self.connect_timeout, timeout_seconds), timeout_seconds)
+
+    def request(self, method, endpoint, timeout_seconds=None, **kwargs):
+        """Send a request to the gateway through the shared pool"""
+        return self._get_session().request(
+            method, f"{self.base_url}{endpoint}",
+            timeout=self.timeout_for(endpoint, timeout_seconds), **kwargs
+        )
+
+    def close(self):
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.close()
+            self._adapter = None
+
+
+gateway_client = GatewayClient(API_BASE_URL, endpoint_timeouts=HTTP_ENDPOINT_TIMEOUTS)
+
+PHOTO_MAX_BYTES = int(os.getenv('PHOTO_MAX_BYTES', str(2 * 1024 * 1024)))
+# Reject oversized requests from their Content-Length before the body is read
+app.config['MAX_CONTENT_LENGTH'] = PHOTO_MAX_BYTES + int(os.getenv('FORM_OVERHEAD_BYTES', str(256 * 1024)))
+# Bulk import spreadsheets are far larger than a photo: that route has its own limit
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', str(20 * 1024 * 1024)))
+
+
+class UploadLimitRequest(app.request_class):
+    """Request whose body limit depends on the route it matched"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'importar_personas':
+            return IMPORT_MAX_BYTES
+        return super().max_content_length
+
+
+app.request_class = UploadLimitRequest
+
+
+def upload_size(upload):
+    """Size in bytes of an uploaded file, measured without reading it into memory"""
+    stream = upload.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell() - position
+    stream.seek(position)
+    return size
+
+
+PHOTO_FORMAT = os.getenv('PHOTO_FORMAT', 'WEBP').upper()
+PHOTO_QUALITY = int(os.getenv('PHOTO_QUALITY', '80'))
+# Photos display at 300px; 2x for high-density screens. The personas service stores
+# WebP uploads within its PHOTO_MAX_DIMENSION as sent and re-encodes anything else
+PHOTO_MAX_DIMENSION = int(os.getenv('PHOTO_MAX_DIMENSION', '600'))
+PHOTO_WORKERS = int(os.getenv('PHOTO_WORKERS', '2'))
+PHOTO_PROCESS_TIMEOUT_SECONDS = float(os.getenv('PHOTO_PROCESS_TIMEOUT_SECONDS', '10'))
+PHOTO_CONTENT_TYPES = {'WEBP': ('image/webp', 'webp'), 'JPEG': ('image/jpeg', 'jpg')}
+_photo_executor = None
+_photo_executor_pid = None
+_photo_executor_lock = threading.Lock()
+
+
+def get_photo_executor():
+    """Return this process's image-encoding pool (recreated after a fork)"""
+    global _photo_executor, _photo_executor_pid
+    pid = os.getpid()
+    if _photo_executor is None or _photo_executor_pid != pid:
+        with _photo_executor_lock:
+            if _photo_executor is None or _photo_executor_pid != pid:
+                _photo_executor = ThreadPoolExecutor(max_workers=PHOTO_WORKERS, thread_name_prefix='photo-encode')
+                _photo_executor_pid = pid
+    return _photo_executor
+
+
+def transcode_photo(stream, image_format, quality=PHOTO_QUALITY, max_dimension=PHOTO_MAX_DIMENSION):
+    """Downscale and re-encode an image, dropping EXIF and other metadata"""
+    from PIL import Image, ImageOps
+
+    with Image.open(stream) as image:
+        # Let the JPEG decoder downscale while decoding instead of after
+        image.draft('RGB', (max_dimension, max_dimension))
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension))
+        keep_alpha = image_format == 'WEBP' and (image.mode in ('RGBA', 'LA') or 'transparency' in image.info)
+        image = image.convert('RGBA' if keep_alpha else 'RGB')
+        output = BytesIO()
+        # Saving without exif=/icc_profile= writes no metadata
+        image.save(output, format=image_format, quality=quality, optimize=image_format == 'JPEG')
+    output.seek(0)
+    return output
+
+
+def optimize_photo(upload):
+    """Return the multipart file tuple for an upload, transcoded when possible.
+
+    Encoding runs on a small per-worker pool so CPU-heavy work is bounded
+    no matter how many request threads upload at once. If the image cannot
+    be processed the original upload is forwarded unchanged and the personas
+    service validates it.
+    """
+    image_format = PHOTO_FORMAT if PHOTO_FORMAT in PHOTO_CONTENT_TYPES else 'JPEG'
+    content_type, extension = PHOTO_CONTENT_TYPES[image_format]
+    position = upload.stream.tell()
+    try:
+        future = get_photo_executor().submit(transcode_photo, upload.stream, image_format)
+        output = future.result(timeout=PHOTO_PROCESS_TIMEOUT_SECONDS)
+    except Exception as e:
+        app.logger.warning("Photo could not be optimized, forwarding original", extra={'error': str(e)})
+        upload.stream.seek(position)
+        return (upload.filename, upload.stream, upload.content_type)
+
+    name = os.path.splitext(upload.filename or '')[0] or 'foto'
+    app.logger.debug("Photo optimized", extra={'original_bytes': upload_size(upload),
+                                               'optimized_bytes': output.getbuffer().nbytes,
+                                               'format': image_format})
+    return (f"{name}.{extension}", output, content_type)
+
+
+class MultipartStream:
+    """multipart/form-data body that is generated while it is sent.
+
+    Form fields are encoded up front; file parts are read from their
+    (spooled) upload streams in chunks, so a photo is never buffered in
+    worker memory. The total length is known in advance, so requests sends
+    a Content-Length instead of chunked encoding.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields=None, files=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self._parts = []
+        for name, value in (fields or {}).items():
+            if value is None:
+                continue
+            header = self._part_header(name)
+            self._parts.append((header, str(value).encode('utf-8'), None))
+        for name, (filename, fileobj, content_type) in (files or {}).items():
+            header = self._part_header(name, filename, content_type or 'application/octet-stream')
+            start = fileobj.tell()
+            fileobj.seek(0, os.SEEK_END)
+            size = fileobj.tell() - start
+            fileobj.seek(start)
+            self._parts.append((header, (fileobj, start), size))
+        self._closing = f'--{self.boundary}--\r\n'.encode('ascii')
+
+    def _part_header(self, name, filename=None, content_type=None):
+        disposition = f'form-data; name="{self._quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{self._quote(filename)}"'
+        header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if content_type:
+            header += f'Content-Type: {content_type}\r\n'
+        return (header + '\r\n').encode('utf-8')
+
+    @staticmethod
+    def _quote(value):
+        return str(value).replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+    def __len__(self):
+        total = len(self._closing)
+        for header, payload, size in self._parts:
+            total += len(header) + (len(payload) if size is None else size) + 2
+        return total
+
+    def __iter__(self):
+        for header, payload, size in self._parts:
+            yield header
+            if size is None:
+                yield payload
+            else:
+                fileobj, start = payload
+                fileobj.seek(start)
+                remaining = size
+                while remaining > 0:
+                    chunk = fileobj.read(min(self.CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise IOError('Upload stream ended before its announced size')
+                    remaining -= len(chunk)
+                    yield chunk
+            yield b'\r\n'
+        yield self._closing
+
+# Helper functions
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv('CIRCUIT_RECOVERY_SECONDS', '15'))
+STALE_RESPONSE_MAX_BYTES = int(os.getenv('STALE_RESPONSE_MAX_BYTES', str(8 * 1024 * 1024)))
+STALE_RESPONSE_MAX_AGE_SECONDS = float(os.getenv('STALE_RESPONSE_MAX_AGE_SECONDS', '600'))
+# GET responses carrying an ETag or Last-Modified, kept to revalidate with conditional requests
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2000'))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream.
+
+    closed: calls go through; ``failure_threshold`` consecutive failures
+    (connection errors, timeouts, 5xx) open the circuit.
+    open: calls fail immediately for ``recovery_seconds``.
+    half_open: a single probe call is let through; its success closes the
+    circuit, its failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, recovery_seconds=CIRCUIT_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.recovery_seconds:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                app.logger.info("Circuit closed", extra={'circuit': self.name})
+            self.state = 'closed'
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                app.logger.warning("Circuit opened", extra={'circuit': self.name, 'failures': self.failures})
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state == 'open':
+                retry_in = round(max(0.0, self.recovery_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'retry_in_seconds': retry_in,
+                'short_circuited': self.short_circuited,
+                'times_opened': self.times_opened,
+            }
+
+
+class CircuitBreakerRegistry:
+    """One breaker per upstream prefix (``/api/consulta``, ``/api/nlp``, ...)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    @staticmethod
+    def prefix_for(endpoint):
+        parts = endpoint.split('?', 1)[0].strip('/').split('/')
+        return '/' + '/'.join(parts[:2] if parts[0] == 'api' else parts[:1])
+
+    def for_endpoint(self, endpoint):
+        prefix = self.prefix_for(endpoint)
+        breaker = self._breakers.get(prefix)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(prefix, CircuitBreaker(prefix))
+        return breaker
+
+    def status(self):
+        return {prefix: breaker.status() for prefix, breaker in sorted(self._breakers.items())}
+
+
+class StaleResponseCache:
+    """Last successful GET response per (token, endpoint, params), bounded by bytes.
+
+    Only consulted when the upstream is failing or its circuit is open, so
+    a degraded page shows slightly old data instead of an error.
+    """
+
+    def __init__(self, max_bytes=STALE_RESPONSE_MAX_BYTES, max_age_seconds=STALE_RESPONSE_MAX_AGE_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.served = 0
+
+    @staticmethod
+    def key_for(token, endpoint, params):
+        raw = json.dumps([token, endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def put(self, key, response):
+        size = len(response.content)
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (time.monotonic(), response, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.max_age_seconds:
+                return None
+            self._entries.move_to_end(key)
+            self.served += 1
+        stale = copy.copy(entry[1])
+        stale.headers = CaseInsensitiveDict(entry[1].headers)
+        stale.headers['X-Frontend-Stale'] = 'true'
+        return stale
+
+    def status(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'served': self.served}
+
+
+class ConditionalResponseCache:
+    """Last GET response with an ETag or Last-Modified per (token, endpoint, params).
+
+    make_request sends the stored validators as If-None-Match /
+    If-Modified-Since; a 304 from the upstream is answered with the stored
+    response, so unchanged records are not transferred again. Bounded by
+    entries and bytes, least recently used first out.
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.revalidated = 0
+
+    def validators(self, key):
+        """Conditional request headers for the stored response, or {}"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry[0].headers.get('ETag'):
+            headers['If-None-Match'] = entry[0].headers['ETag']
+        if entry[0].headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = entry[0].headers['Last-Modified']
+        return headers
+
+    def put(self, key, response):
+        """Store a 200 response that has validators; anything else drops the key"""
+        size = len(response.content)
+        cacheable = (response.status_code == 200 and size <= self.max_bytes // 8
+                     and ('ETag' in response.headers or 'Last-Modified' in response.headers))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if not cacheable:
+                return
+            self._entries[key] = (response, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_revalidated(self, key, not_modified):
+        """Stored response for a 304, with the 304's headers (trace, timing) applied"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.revalidated += 1
+        cached = copy.copy(entry[0])
+        cached.headers = CaseInsensitiveDict(entry[0].headers)
+        cached.headers.update({name: value for name, value in not_modified.headers.items()
+                               if not name.lower().startswith('content-')})
+        cached.elapsed = not_modified.elapsed
+        return cached
+
+    def status(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'revalidated': self.revalidated}
+
+
+circuit_breakers = CircuitBreakerRegistry()
+stale_responses = StaleResponseCache()
+response_cache = ConditionalResponseCache()
+
+
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'true').lower() == 'true'
+# A GET still unanswered at this percentile of its recent latency gets a second attempt
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY_MS = float(os.getenv('HEDGE_MIN_DELAY_MS', '20'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MAX_WORKERS = int(os.getenv('HEDGE_MAX_WORKERS', '32'))
+# Only these GETs (endpoint_key form) are hedged and retried: consulta and personas
+# lookups write a transaction_logs row per request, so extra attempts would log twice
+HEDGE_ENDPOINTS = frozenset(key.strip() for key in os.getenv(
+    'HEDGE_ENDPOINTS', '/api/logs/search,/api/logs/stats,/api/logs/:id,/api/auth/verify,/api/consulta/cache/stats'
+).split(',') if key.strip())
+# Extra attempts (hedges and retries) may add at most this fraction on top of regular traffic
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.1'))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv('RETRY_BUDGET_MAX_TOKENS', '10'))
+RETRYABLE_STATUSES = (502, 503, 504)
+
+
+class LatencyHistogram:
+    """Bucketed latency histogram that favours recent samples.
+
+    Counts are halved every ``decay_every`` observations, so percentiles
+    follow the upstream's current behaviour without keeping raw samples.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, decay_every=1000):
+        self.buckets = buckets
+        self.decay_every = decay_every
+        self._lock = threading.Lock()
+        self._counts = [0.0] * (len(buckets) + 1)
+        self._since_decay = 0
+        self.samples = 0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self.samples += 1
+            self._since_decay += 1
+            if self._since_decay >= self.decay_every:
+                self._counts = [count / 2 for count in self._counts]
+                self._since_decay = 0
+
+    def percentile(self, percent):
+        """Latency in seconds below which ``percent`` of recent samples fall (interpolated)"""
+        with self._lock:
+            counts = list(self._counts)
+        total = sum(counts)
+        if not total:
+            return None
+        target = total * percent / 100.0
+        cumulative = 0.0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= target:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1] * 2
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def status(self):
+        return {
+            'samples': self.samples,
+            'p50_ms': round((self.percentile(50) or 0) * 1000, 1),
+            'p95_ms': round((self.percentile(95) or 0) * 1000, 1),
+            'p99_ms': round((self.percentile(99) or 0) * 1000, 1),
+        }
+
+
+@functools.lru_cache(maxsize=4096)
+def endpoint_key(endpoint):
+    """Endpoint path with ids collapsed: /api/consulta/persona/123 -> /api/consulta/persona/:id"""
+    path = endpoint.split('?', 1)[0]
+    return '/'.join(':id' if any(char.isdigit() for char in part) else part for part in path.split('/'))
+
+
+class LatencyTracker:
+    """One LatencyHistogram per endpoint_key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def for_endpoint(self, endpoint):
+        key = endpoint_key(endpoint)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def status(self):
+        return {key: histogram.status() for key, histogram in sorted(self._histograms.items())}
+
+
+class RetryBudget:
+    """Token bucket shared by hedges and retries.
+
+    Every first attempt deposits ``ratio`` tokens (up to ``max_tokens``);
+    every extra attempt withdraws a whole token. Extra load is therefore
+    capped at ``ratio`` of regular traffic, and a failing upstream cannot
+    be hit with a retry storm.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, max_tokens=RETRY_BUDGET_MAX_TOKENS):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens = max_tokens
+        self.hedges = 0
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self, kind):
+        with self._lock:
+            if self._tokens < 1:
+                self.denied += 1
+                return False
+            self._tokens -= 1
+            if kind == 'hedge':
+                self.hedges += 1
+            else:
+                self.retries += 1
+            return True
+
+    def status(self):
+        with self._lock:
+            return {'tokens': round(self._tokens, 2), 'hedges': self.hedges,
+                    'retries': self.retries, 'denied': self.denied}
+
+
+latency_tracker = LatencyTracker()
+retry_budget = RetryBudget()
+_hedge_executor = None
+_hedge_executor_pid = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_hedge_executor():
+    """Return this process's pool for hedged GET attempts (recreated after a fork)"""
+    global _hedge_executor, _hedge_executor_pid
+    pid = os.getpid()
+    if _hedge_executor is None or _hedge_executor_pid != pid:
+        with _hedge_executor_lock:
+            if _hedge_executor is None or _hedge_executor_pid != pid:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix='gateway-hedge')
+                _hedge_executor_pid = pid
+    return _hedge_executor
+
+
+def timed_get(endpoint, histogram, timeout_seconds=None, **kwargs):
+    """One GET attempt; answered attempts feed the endpoint's latency histogram"""
+    started = time.perf_counter()
+    response = gateway_client.request('GET', endpoint, timeout_seconds=timeout_seconds, **kwargs)
+    if response.status_code < 500:
+        histogram.observe(time.perf_counter() - started)
+    return response
+
+
+def single_get(endpoint, timeout_seconds=None, **kwargs):
+    """One GET attempt, for endpoints whose reads have side effects"""
+    return timed_get(endpoint, latency_tracker.for_endpoint(endpoint), timeout_seconds, **kwargs)
+
+
+def hedged_get(endpoint, timeout_seconds=None, **kwargs):
+    """GET with a hedged second attempt and one budgeted retry.
+
+    Only for side-effect-free endpoints (HEDGE_ENDPOINTS); see single_get.
+
+    If the first attempt has not answered within HEDGE_PERCENTILE of the
+    endpoint's recent latency, a second identical request is sent and the
+    first good answer wins (the slower one finishes in the background and
+    its connection goes back to the pool). Connection errors and 502/503/504
+    are retried once. Both extra attempts draw from the retry budget.
+    """
+    histogram = latency_tracker.for_endpoint(endpoint)
+    retry_budget.deposit()
+    total_timeout = gateway_client.timeout_for(endpoint, timeout_seconds)[1]
+    started = time.perf_counter()
+
+    hedge_delay = None
+    if HEDGE_ENABLED and histogram.samples >= HEDGE_MIN_SAMPLES:
+        hedge_delay = max(HEDGE_MIN_DELAY_MS / 1000.0, histogram.percentile(HEDGE_PERCENTILE))
+
+    def remaining():
+        return max(0.1, total_timeout - (time.perf_counter() - started))
+
+    def first_good(futures):
+        """First successful response; otherwise the last failure (response or exception).
+
+        Waits no longer than the caller's timeout: attempts still queued behind a
+        busy hedge pool are cancelled and the call fails with a ReadTimeout.
+        """
+        failure = None
+        pending = set(futures)
+        while pending:
+            left = total_timeout - (time.perf_counter() - started)
+            done, pending = wait(pending, timeout=max(0.0, left), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise requests.exceptions.ReadTimeout(f"No answer from {endpoint} within {total_timeout:.1f}s")
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    failure = e
+                    continue
+                if response.status_code in RETRYABLE_STATUSES:
+                    failure = response
+                    continue
+                return response
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    def attempt():
+        if hedge_delay is None or hedge_delay >= total_timeout:
+            return timed_get(endpoint, histogram, timeout_seconds, **kwargs)
+        executor = get_hedge_executor()
+        first = executor.submit(timed_get, endpoint, histogram, timeout_seconds, **kwargs)
+        done, _ = wait([first], timeout=hedge_delay)
+        if done or not retry_budget.withdraw('hedge'):
+            return first_good([first])
+        app.logger.debug("Hedging slow GET", extra={'endpoint': endpoint, 'hedge_delay_ms': round(hedge_delay * 1000, 1),
+                                                    'sampled': True})
+        second = executor.submit(timed_get, endpoint, histogram, remaining(), **kwargs)
+        return first_good([first, second])
+
+    try:
+        response = attempt()
+    except requests.exceptions.ConnectionError:
+        # Read timeouts have already used the caller's time; only these are worth retrying
+        if not retry_budget.withdraw('retry'):
+            raise
+    else:
+        if response.status_code not in RETRYABLE_STATUSES or not retry_budget.withdraw('retry'):
+            return response
+    time.sleep(random.uniform(0.05, 0.15))
+    return timed_get(endpoint, histogram, remaining(), **kwargs)
+
+
+def gateway_get(endpoint, **kwargs):
+    """hedged_get for HEDGE_ENDPOINTS, a single attempt for everything else"""
+    get = hedged_get if endpoint_key(endpoint) in HEDGE_ENDPOINTS else single_get
+    return get(endpoint, **kwargs)
+
+
+def conditional_get(cache_key, endpoint, headers, params=None, timeout_seconds=None):
+    """GET that revalidates a cached response instead of fetching it again"""
+    validators = response_cache.validators(cache_key)
+    if validators:
+        # A no-cache request header would make the upstream ignore the validators
+        conditional_headers = {name: value for name, value in headers.items() if name not in ('Cache-Control', 'Pragma')}
+        conditional_headers.update(validators)
+        response = gateway_get(endpoint, headers=conditional_headers, params=params, timeout_seconds=timeout_seconds)
+        if response.status_code == 304:
+            cached = response_cache.get_revalidated(cache_key, response)
+            if cached is not None:
+                metrics.inc('frontend_cache_requests_total', ('conditional', 'hit'))
+                return cached
+            # Evicted since the validators were read: fetch the full body
+            response = gateway_get(endpoint, headers=headers, params=params, timeout_seconds=timeout_seconds)
+        metrics.inc('frontend_cache_requests_total', ('conditional', 'miss'))
+    else:
+        response = gateway_get(endpoint, headers=headers, params=params, timeout_seconds=timeout_seconds)
+    if response.status_code < 500:
+        response_cache.put(cache_key, response)
+    return response
+
+
+def make_request(method, endpoint, data=None, files=None, params=None, timeout_seconds: float = None,
+                 auth_token: str = None, cache: bool = True):
+    """Make authenticated API request with sane timeouts and graceful failures.
+
+    ``timeout_seconds`` defaults to the per-endpoint timeout of the gateway client.
+    ``auth_token`` overrides the session token, for calls made outside a request.
+    ``cache=False`` keeps a GET out of the stale and conditional response caches,
+    for one-off reads (export pages) that would only evict entries worth keeping.
+    """
+    headers = {
+        'Cache-Control': 'no-cache, no-store, must-revalidate',
+        'Pragma': 'no-cache'
+    }
+    token = auth_token or (session.get('token') if has_request_context() else None)
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    trace = current_trace()
+    if trace is not None:
+        headers[TRACE_HEADER] = trace.trace_id
+
+    breaker = circuit_breakers.for_endpoint(endpoint)
+    stale_key = stale_responses.key_for(token, endpoint, params) if method == 'GET' and cache else None
+
+    def fallback():
+        """Last good response for this GET when the upstream cannot answer"""
+        stale = stale_responses.get(stale_key) if stale_key else None
+        if stale is not None:
+            app.logger.info("Serving stale response", extra={'method': method, 'endpoint': endpoint})
+        return stale
+
+    upstream = endpoint_key(endpoint)
+    if not breaker.allow():
+        # Fail fast instead of holding a worker thread for the whole timeout
+        app.logger.debug("Circuit open, failing fast",
+                         extra={'method': method, 'endpoint': endpoint, 'circuit': breaker.name, 'sampled': True})
+        metrics.inc('frontend_upstream_requests_total', (upstream, method, 'short_circuited'))
+        return fallback()
+
+    if LOG_REQUEST_BODIES and data and not files:
+        app.logger.debug("Gateway request body", extra={'method': method, 'endpoint': endpoint, 'body': data})
+
+    outcome = 'error'
+    response = None
+    metrics.add('frontend_upstream_requests_in_flight', (upstream,))
+    started = time.perf_counter()
+    try:
+        if method == 'GET' and stale_key:
+            response = conditional_get(stale_key, endpoint, headers, params=params, timeout_seconds=timeout_seconds)
+        elif method == 'GET':
+            response = gateway_get(endpoint, headers=headers, params=params, timeout_seconds=timeout_seconds)
+        elif method in ('POST', 'PUT'):
+            if files:
+                # Stream the upload to the gateway instead of building the multipart body in memory
+                body = MultipartStream(data, files)
+                headers['Content-Type'] = body.content_type
+                response = gateway_client.request(method, endpoint, headers=headers, data=body, timeout_seconds=timeout_seconds)
+            else:
+                headers['Content-Type'] = 'application/json'
+                response = gateway_client.request(method, endpoint, headers=headers, json=data, timeout_seconds=timeout_seconds)
+        elif method == 'DELETE':
+            response = gateway_client.request('DELETE', endpoint, headers=headers, timeout_seconds=timeout_seconds)
+        else:
+            app.logger.error("Unsupported method", extra={'method': method, 'endpoint': endpoint})
+            breaker.record_success()
+            return None
+
+        outcome = str(response.status_code)
+        fields = {'method': method, 'endpoint': endpoint, 'status': response.status_code,
+                  'duration_ms': round((time.perf_counter() - started) * 1000, 1)}
+        if response.status_code >= 500:
+            breaker.record_failure()
+            app.logger.warning("Gateway error response", extra=fields)
+        else:
+            breaker.record_success()
+            # One line per upstream call: sampled so it stays cheap under load
+            app.logger.debug("Gateway response", extra=dict(fields, sampled=True))
+        if LOG_REQUEST_BODIES and response.status_code >= 400:
+            app.logger.debug("Gateway error body", extra=dict(fields, body=response.text))
+
+        if stale_key and response.status_code == 200:
+            stale_responses.put(stale_key, response)
+        elif response.status_code >= 500:
+            return fallback() or response
+        return response
+    except requests.exceptions.ConnectionError as e:
+        outcome = 'connection_error'
+        app.logger.warning("Gateway connection error", extra={'method': method, 'endpoint': endpoint, 'error': str(e)})
+    except requests.exceptions.ReadTimeout as e:
+        outcome = 'timeout'
+        app.logger.warning("Gateway read timeout", extra={'method': method, 'endpoint': endpoint, 'error': str(e)})
+    except requests.exceptions.Timeout as e:
+        outcome = 'timeout'
+        app.logger.warning("Gateway timeout", extra={'method': method, 'endpoint': endpoint, 'error': str(e)})
+    except Exception as e:
+        app.logger.exception("Unexpected gateway error", extra={'method': method, 'endpoint': endpoint})
+    finally:
+        metrics.add('frontend_upstream_requests_in_flight', (upstream,), -1)
+        metrics.inc('frontend_upstream_requests_total', (upstream, method, outcome))
+        elapsed = time.perf_counter() - started
+        metrics.observe('frontend_upstream_request_duration_seconds', (upstream, method), elapsed)
+        if trace is not None:
+            trace.add('upstream', f'{method} {upstream}', started, elapsed, outcome=outcome,
+                      server_timing=parse_server_timing(response.headers.get('Server-Timing')) if response is not None else {})
+    breaker.record_failure()
+    return fallback()
+
+FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', '16'))
+_fanout_executor = None
+_fanout_executor_pid = None
+_fanout_executor_lock = threading.Lock()
+
+def get_fanout_executor():
+    """Return this process's fan-out thread pool (recreated after a fork)"""
+    global _fanout_executor, _fanout_executor_pid
+    pid = os.getpid()
+    if _fanout_executor is None or _fanout_executor_pid != pid:
+        with _fanout_executor_lock:
+            if _fanout_executor is None or _fanout_executor_pid != pid:
+                _fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS,
+                                                      thread_name_prefix='gateway-fanout')
+                _fanout_executor_pid = pid
+    return _fanout_executor
+
+def fan_out_requests(calls, deadline_seconds: float = DEFAULT_HTTP_TIMEOUT_SECONDS):
+    """Issue several independent make_request calls in parallel with one shared deadline.
+
+    ``calls`` maps a name to the keyword arguments of make_request, e.g.
+    ``{'search': {'method': 'GET', 'endpoint': '/api/logs/search', 'params': params}}``.
+    Returns ``(responses, errors)``: responses that arrived in time keyed by name,
+    and an error message for every call that failed or missed the deadline.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    executor = get_fanout_executor()
+    futures = {}
+    for name, kwargs in calls.items():
+        kwargs = dict(kwargs)
+        endpoint_timeout = gateway_client.timeout_for(kwargs['endpoint'], kwargs.get('timeout_seconds'))[1]
+        kwargs['timeout_seconds'] = min(endpoint_timeout, deadline_seconds)
+        # Each worker thread gets its own copy of the request context so make_request can read the session
+        futures[executor.submit(copy_current_request_context(make_request), **kwargs)] = name
+
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+    responses, errors = {}, {}
+    for future in done:
+        name = futures[future]
+        try:
+            response = future.result()
+        except Exception as e:
+            errors[name] = f'Unexpected error: {e}'
+            continue
+        if response is None:
+            errors[name] = 'No response from gateway'
+        else:
+            responses[name] = response
+    for future in not_done:
+        future.cancel()
+        errors[futures[future]] = f'Deadline of {deadline_seconds}s exceeded'
+        app.logger.warning("Fan-out call missed the deadline", extra={'call': futures[future]})
+    return responses, errors
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one in-flight execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is running wait for it and share its result (or exception). Works across
+    the threads of one worker process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['done'].set()
+
+    def counters(self):
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
+
+
+THUMBNAIL_SIZES = tuple(sorted(int(size) for size in os.getenv('THUMBNAIL_SIZES', '64,160,480').split(',') if size.strip()))
+THUMBNAIL_CACHE_DIR = os.getenv('THUMBNAIL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'persona-thumbnails'))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+THUMBNAIL_MAX_AGE_SECONDS = int(os.getenv('THUMBNAIL_MAX_AGE_SECONDS', str(365 * 24 * 3600)))
+
+
+def thumbnail_size_for(size):
+    """Smallest configured rendition that covers ``size`` pixels"""
+    for candidate in THUMBNAIL_SIZES:
+        if candidate >= size:
+            return candidate
+    return THUMBNAIL_SIZES[-1]
+
+
+class ThumbnailCache:
+    """Bounded on-disk LRU cache of persona photo renditions.
+
+    Upload filenames are never reused (the personas service names them
+    ``<documento>_<timestamp>.<webp|jpg>``), so a rendition is identified by the
+    source filename, size and encoding settings and never goes stale; the
+    same key doubles as the strong ETag. Files are written atomically and
+    shared by all workers; each worker keeps its own LRU index (seeded from
+    the directory by mtime) and evicts the least recently used files once
+    the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes=THUMBNAIL_CACHE_MAX_BYTES, image_format=PHOTO_FORMAT,
+                 quality=PHOTO_QUALITY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.image_format = image_format if image_format in PHOTO_CONTENT_TYPES else 'JPEG'
+        self.content_type, self.extension = PHOTO_CONTENT_TYPES[self.image_format]
+        self.quality = quality
+        self.flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._index = None
+        self._index_pid = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key_for(self, filename, size):
+        raw = f"{filename}|{size}|{self.image_format}|{self.quality}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.{self.extension}")
+
+    def _load_index(self):
+        """Seed this process's LRU index from the files already on disk"""
+        pid = os.getpid()
+        if self._index is not None and self._index_pid == pid:
+            return self._index
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(f".{self.extension}"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name.rsplit('.', 1)[0], stat.st_size))
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._index_pid = pid
+        self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def get(self, key):
+        """Path of a cached rendition, or None"""
+        path = self.path_for(key)
+        with self._lock:
+            index = self._load_index()
+            if key in index and os.path.exists(path):
+                index.move_to_end(key)
+                self.hits += 1
+                return path
+            if key in index:
+                # Evicted by another worker
+                self._total_bytes -= index.pop(key)
+            elif os.path.exists(path):
+                # Written by another worker
+                index[key] = os.path.getsize(path)
+                self._total_bytes += index[key]
+                self.hits += 1
+                return path
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        """Store a rendition atomically, evicting old ones past the byte budget"""
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            index = self._load_index()
+            self._total_bytes += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            while self._total_bytes > self.max_bytes and len(index) > 1:
+                old_key, old_size = index.popitem(last=False)
+                self._total_bytes -= old_size
+                self.evictions += 1
+                try:
+                    os.remove(self.path_for(old_key))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def render(self, filename, size):
+        """Return (path, key) for a rendition, generating it on first request"""
+        key = self.key_for(filename, size)
+        path = self.get(key)
+        if path is not None:
+            return path, key
+
+        def generate():
+            response = gateway_client.request('GET', f"/uploads/{filename}")
+            if response.status_code == 404:
+                raise FileNotFoundError(filename)
+            response.raise_for_status()
+            future = get_photo_executor().submit(
+                transcode_photo, BytesIO(response.content), self.image_format, self.quality, size
+            )
+            output = future.result(timeout=PHOTO_PROCESS_TIMEOUT_SECONDS)
+            return self.put(key, output.getvalue())
+
+        return self.flight.do(key, generate), key
+
+    def status(self):
+        with self._lock:
+            return {
+                'entries': len(self._index or ()),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+thumbnail_cache = ThumbnailCache(THUMBNAIL_CACHE_DIR)
+
+
+# Fingerprinted static files: off in development so edits show up without a restart
+STATIC_ASSETS_ENABLED = (os.getenv('STATIC_ASSETS_ENABLED') or str(not IS_DEVELOPMENT)).lower() == 'true'
+STATIC_ASSETS_DIR = os.getenv('STATIC_ASSETS_DIR') or os.path.join(tempfile.gettempdir(), 'frontend-assets')
+STATIC_ASSETS_MAX_AGE_SECONDS = int(os.getenv('STATIC_ASSETS_MAX_AGE_SECONDS', str(365 * 24 * 3600)))
+STATIC_ASSETS_COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# A compressed variant that saves less than this is not worth a second request path
+STATIC_ASSETS_MIN_SAVING = 0.05
+
+
+class AssetPipeline:
+    """Content-fingerprinted copies of ``static/`` with precompressed variants.
+
+    ``build`` copies every static file to ``<name>.<hash><ext>`` (the first
+    12 hex digits of its SHA-256) and, for text formats, writes ``.gz`` and
+    ``.br`` (when the Brotli package is installed) variants next to it at
+    maximum compression. A fingerprinted URL always names the same bytes, so
+    it is served as immutable and editing a file changes its URL. Output is
+    content-addressed: restarts and workers building the same sources reuse
+    the files already written instead of compressing them again.
+    """
+
+    def __init__(self, source_dir, directory):
+        self.source_dir = source_dir
+        self.directory = directory
+        # 'css/style.css' -> 'css/style.<hash>.css'
+        self.manifest = {}
+        # 'css/style.<hash>.css' -> (mimetype, {'identity': path, 'br': path, 'gzip': path})
+        self.assets = {}
+
+    @staticmethod
+    def compressors():
+        """(encoding, suffix, compress) for the available encodings, preferred first"""
+        found = []
+        try:
+            import brotli
+        except ImportError:
+            pass
+        else:
+            found.append(('br', '.br', lambda data: brotli.compress(data, quality=11)))
+        found.append(('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)))
+        return found
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def build(self):
+        """Fingerprint and compress every static file; returns the manifest"""
+        compressors = self.compressors()
+        manifest, assets = {}, {}
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            for name in files:
+                if name.startswith('.'):
+                    continue
+                source = os.path.join(root, name)
+                logical = os.path.relpath(source, self.source_dir).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    data = f.read()
+                stem, extension = os.path.splitext(logical)
+                hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+                path = os.path.join(self.directory, *hashed.split('/'))
+                if not os.path.exists(path):
+                    self._write(path, data)
+                variants = {'identity': path}
+                if extension.lower() in STATIC_ASSETS_COMPRESSIBLE:
+                    for encoding, suffix, compress in compressors:
+                        if os.path.exists(path + suffix):
+                            variants[encoding] = path + suffix
+                            continue
+                        encoded = compress(data)
+                        if len(encoded) <= len(data) * (1 - STATIC_ASSETS_MIN_SAVING):
+                            self._write(path + suffix, encoded)
+                            variants[encoding] = path + suffix
+                manifest[logical] = hashed
+                assets[hashed] = (mimetypes.guess_type(logical)[0] or 'application/octet-stream', variants)
+        self._write(os.path.join(self.directory, 'manifest.json'),
+                    json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+        self.manifest, self.assets = manifest, assets
+        return manifest
+
+    def negotiate(self, hashed, accept_encodings):
+        """(path, content encoding or None, mimetype) of the best variant, or None"""
+        asset = self.assets.get(hashed)
+        if asset is None:
+            return None
+        mimetype, variants = asset
+        for encoding in ('br', 'gzip'):
+            if encoding in variants and accept_encodings.quality(encoding) > 0:
+                return variants[encoding], encoding, mimetype
+        return variants['identity'], None, mimetype
+
+
+asset_pipeline = AssetPipeline(app.static_folder, STATIC_ASSETS_DIR)
+if STATIC_ASSETS_ENABLED:
+    try:
+        asset_pipeline.build()
+        app.logger.info("Static assets fingerprinted", extra={
+            'assets': len(asset_pipeline.assets), 'directory': STATIC_ASSETS_DIR,
+            'encodings': [encoding for encoding, _, _ in AssetPipeline.compressors()]})
+    except OSError as e:
+        app.logger.warning("Static assets could not be fingerprinted, serving /static",
+                           extra={'error': str(e)})
+
+
+def asset_url(filename):
+    """URL of a static file: fingerprinted when the pipeline built it, plain /static otherwise"""
+    hashed = asset_pipeline.manifest.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('static_asset', filename=hashed)
+
+
+STATS_CACHE_TTL_SECONDS = float(os.getenv('STATS_CACHE_TTL_SECONDS', '10'))
+STATS_CACHE_MAX_STALE_SECONDS = float(os.getenv('STATS_CACHE_MAX_STALE_SECONDS', '300'))
+
+# frontend_cache_requests_total result label of each StatsCache state
+STATS_CACHE_RESULTS = {'fresh': 'hit', 'stale': 'stale', 'miss': 'miss', 'unavailable': 'miss'}
+
+
+class StatsCache:
+    """In-process stale-while-revalidate cache for the consulta aggregate stats.
+
+    Snapshots younger than ``ttl`` are served as-is. Older ones (up to
+    ``max_stale`` past the TTL) are served immediately while a single
+    background refresh fetches a new one. ``invalidate()`` bumps the snapshot
+    version so the next read of this worker fetches synchronously; the last
+    good snapshot is still returned if that fetch fails.
+    """
+
+    def __init__(self, ttl=STATS_CACHE_TTL_SECONDS, max_stale=STATS_CACHE_MAX_STALE_SECONDS):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.version = 0
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # Concurrent misses for the same snapshot share one upstream fetch
+        self.flight = SingleFlight()
+
+    def get(self, endpoint, timeout_seconds=None, allow_stale=True, auth_token=None):
+        """Return ``(stats, state)`` where state is 'fresh', 'stale', 'miss' or 'unavailable'.
+
+        Outside a request, ``auth_token`` must carry the token used for upstream fetches.
+        """
+        stats, state = self._lookup(endpoint, timeout_seconds, allow_stale, auth_token)
+        metrics.inc('frontend_cache_requests_total', ('stats', STATS_CACHE_RESULTS[state]))
+        return stats, state
+
+    def _lookup(self, endpoint, timeout_seconds, allow_stale, auth_token):
+        if auth_token is None:
+            auth_token = session.get('token')
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            version = self.version
+
+        if entry is not None and entry['version'] == version and allow_stale:
+            age = time.monotonic() - entry['fetched_at']
+            if age < self.ttl:
+                return entry['data'], 'fresh'
+            if age < self.ttl + self.max_stale:
+                self._refresh_in_background(endpoint, timeout_seconds, auth_token)
+                return entry['data'], 'stale'
+
+        data = self._fetch(endpoint, version, timeout_seconds, auth_token)
+        if data is not None:
+            return data, 'miss'
+        if entry is not None and allow_stale:
+            # A stale snapshot beats an empty dashboard
+            return entry['data'], 'stale'
+        return None, 'unavailable'
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def status(self):
+        """Snapshot ages and coalescing counters, for monitoring"""
+        now = time.monotonic()
+        with self._lock:
+            snapshots = {
+                endpoint: {
+                    'age_seconds': round(now - entry['fetched_at'], 3),
+                    'current': entry['version'] == self.version,
+                }
+                for endpoint, entry in self._entries.items()
+            }
+            version = self.version
+        return {
+            'version': version,
+            'ttl_seconds': self.ttl,
+            'snapshots': snapshots,
+            'coalescing': self.flight.counters(),
+        }
 
-# API Configuration
-# For browser redirects (Auth0), always use localhost regardless of Docker internal URLs
-BROWSER_API_BASE_URL = 'http://localhost:8001'
-# For server-side API calls, use environment variable or default to localhost
-API_BASE_URL = os.getenv('API_GATEWAY_URL', 'http://localhost:8001')
+    def _fetch(self, endpoint, version, timeout_seconds, auth_token):
+        return self.flight.do((endpoint, version),
+                              lambda: self._fetch_uncoalesced(endpoint, version, timeout_seconds, auth_token))
 
-def get_browser_api_url():
-    """Get API URL for browser redirects (always localhost for external access)"""
-    return BROWSER_API_BASE_URL
+    def _fetch_uncoalesced(self, endpoint, version, timeout_seconds, auth_token):
+        response = make_request('GET', endpoint, timeout_seconds=timeout_seconds, auth_token=auth_token)
+        if not response or response.status_code != 200:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        with self._lock:
+            current = self._entries.get(endpoint)
+            # A slow fetch from before an invalidation must not replace a newer snapshot
+            if current is None or current['version'] <= version:
+                self._entries[endpoint] = {'data': data, 'version': version, 'fetched_at': time.monotonic()}
+        return data
 
-def build_image_url(foto_url):
-    """Build complete image URL using the gateway"""
-    if foto_url and foto_url.startswith('/uploads/'):
-        # Use BROWSER_API_BASE_URL for images that will be loaded by the browser
-        return f"{BROWSER_API_BASE_URL}{foto_url}"
-    return foto_url
+    def _refresh_in_background(self, endpoint, timeout_seconds, auth_token):
+        with self._lock:
+            if endpoint in self._refreshing:
+                return
+            self._refreshing.add(endpoint)
 
-def invalidate_stats_cache():
-    """Invalidate stats cache to force refresh of dashboard"""
-    try:
-        make_request('POST', '/api/consulta/cache/invalidate-stats', timeout_seconds=2.0)
-        print("Stats cache invalidated successfully")
-    except Exception as e:
-        print(f"Failed to invalidate stats cache: {e}")
-        # No bloquear la operación principal si falla la invalidación del cache
+        def refresh():
+            try:
+                self._fetch(endpoint, self.version, timeout_seconds, auth_token)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(endpoint)
 
-# Jinja context: expose date/datetime to templates
-@app.context_processor
-def inject_datetime_tools():
-    return {
-        'date': date,
-        'datetime': datetime,
-        'build_image_url': build_image_url
-    }
+        try:
+            get_fanout_executor().submit(refresh)
+        except RuntimeError:
+            with self._lock:
+                self._refreshing.discard(endpoint)
 
-# Also register as Jinja globals to ensure availability in all render paths
-app.jinja_env.globals.update(date=date, datetime=datetime)
 
-DEFAULT_HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', '6'))
+stats_cache = StatsCache()
 
-# Helper functions
-def make_request(method, endpoint, data=None, files=None, params=None, timeout_seconds: float = DEFAULT_HTTP_TIMEOUT_SECONDS):
-    """Make authenticated API request with sane timeouts and graceful failures"""
-    headers = {
-        'Cache-Control': 'no-cache, no-store, must-revalidate',
-        'Pragma': 'no-cache'
-    }
-    if session.get('token'):
-        headers['Authorization'] = f'Bearer {session["token"]}'
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_POLL_SECONDS = float(os.getenv('SSE_POLL_SECONDS', '10'))
+SSE_CLIENT_BUFFER = int(os.getenv('SSE_CLIENT_BUFFER', '16'))
+# Every open stream holds a server thread: stay below the gthread pool (see gunicorn.conf.py)
+SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS') or max(int(os.getenv('GUNICORN_THREADS', '8')) - 2, 0))
 
-    url = f"{API_BASE_URL}{endpoint}"
-    
-    print(f"DEBUG: Making {method} request to {url}")
-    if data and not files:
-        print(f"DEBUG: Request data: {data}")
 
-    try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers, params=params, timeout=timeout_seconds)
-        elif method == 'POST':
-            if files:
-                response = requests.post(url, headers=headers, data=data, files=files, timeout=timeout_seconds)
-            else:
-                headers['Content-Type'] = 'application/json'
-                response = requests.post(url, headers=headers, json=data, timeout=timeout_seconds)
-        elif method == 'PUT':
-            if files:
-                response = requests.put(url, headers=headers, data=data, files=files, timeout=timeout_seconds)
+class StatsBroadcaster:
+    """Push dashboard stats to Server-Sent Events clients of this worker.
+
+    One producer thread per worker re-reads the stats through ``stats_cache``
+    when ``notify()`` is called (create/update/delete invalidations) or every
+    ``poll_seconds`` as a fallback, and fans out only the keys that changed.
+    Each client has a bounded queue; a client that falls behind has its
+    queue replaced by a single full snapshot instead of growing unbounded.
+    The producer stops when the last client disconnects.
+
+    Fetches use the token of a connected subscriber (the oldest one), never
+    of one that has left; if a fetch with it fails, that subscriber moves to
+    the back so the next check uses someone else's token.
+    """
+
+    ENDPOINT = '/api/consulta/dashboard/stats'
+
+    def __init__(self, heartbeat_seconds=SSE_HEARTBEAT_SECONDS, poll_seconds=SSE_POLL_SECONDS,
+                 client_buffer=SSE_CLIENT_BUFFER, max_clients=SSE_MAX_CLIENTS):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.client_buffer = client_buffer
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # client queue -> auth token of its user, oldest subscriber first
+        self._clients = {}
+        self._snapshot = None
+        self._version = 0
+        self._producer = None
+
+    def subscribe(self, auth_token):
+        """Register a client and return its queue, or None when the worker is at capacity"""
+        client = queue.Queue(maxsize=self.client_buffer)
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                return None
+            self._clients[client] = auth_token
+            if self._snapshot is not None:
+                client.put_nowait(self._full_event())
+            if self._producer is None or not self._producer.is_alive():
+                self._producer = threading.Thread(target=self._run, name='stats-sse-producer', daemon=True)
+                self._producer.start()
+        self._wake.set()
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.pop(client, None)
+
+    def notify(self):
+        """Ask the producer to re-check the stats now"""
+        self._wake.set()
+
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def _full_event(self):
+        return self._format('stats', {'full': True, 'version': self._version, 'changes': self._snapshot, 'removed': []})
+
+    @staticmethod
+    def _format(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._clients:
+                    self._producer = None
+                    return
+            timeout = max(0.0, min(self.heartbeat_seconds, next_poll - time.monotonic()))
+            woken = self._wake.wait(timeout)
+            self._wake.clear()
+            if woken or time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll_seconds
+                # Picked after the wait so a subscriber that just left is never used
+                with self._lock:
+                    if not self._clients:
+                        continue
+                    fetcher, token = next(iter(self._clients.items()))
+                try:
+                    fetched = self._check(token)
+                except Exception:
+                    fetched = False
+                    app.logger.exception("Stats SSE producer error")
+                if not fetched:
+                    self._rotate(fetcher)
             else:
-                headers['Content-Type'] = 'application/json'
-                response = requests.put(url, headers=headers, json=data, timeout=timeout_seconds)
-        elif method == 'DELETE':
-            response = requests.delete(url, headers=headers, timeout=timeout_seconds)
-        else:
-            print(f"DEBUG: Unsupported method: {method}")
-            return None
+                self._publish(': heartbeat\n\n')
 
-        print(f"DEBUG: Response status: {response.status_code}")
-        if response.status_code >= 400:
-            print(f"DEBUG: Response error content: {response.text}")
-        else:
-            print(f"DEBUG: Response success")
-        
-        return response
-    except requests.exceptions.ConnectionError as e:
-        print(f"DEBUG: Connection error: {e}")
-        return None
-    except requests.exceptions.Timeout as e:
-        print(f"DEBUG: Timeout error: {e}")
-        return None
-    except requests.exceptions.ReadTimeout as e:
-        print(f"DEBUG: Read timeout error: {e}")
-        return None
-    except Exception as e:
-        print(f"DEBUG: Unexpected error: {e}")
-        return None
+    def _check(self, token):
+        """Fetch the stats and publish what changed; False when they could not be fetched"""
+        stats, _ = stats_cache.get(self.ENDPOINT, timeout_seconds=3.0, auth_token=token)
+        if stats is None:
+            return False
+        current = {key: value for key, value in stats.items() if not key.startswith('_')}
+        with self._lock:
+            previous = self._snapshot or {}
+            changes = {key: value for key, value in current.items() if previous.get(key) != value}
+            removed = [key for key in previous if key not in current]
+            if self._snapshot is not None and not changes and not removed:
+                return True
+            full = self._snapshot is None
+            self._snapshot = current
+            self._version += 1
+            event = self._format('stats', {'full': full, 'version': self._version,
+                                           'changes': changes, 'removed': removed})
+        self._publish(event)
+        return True
+
+    def _rotate(self, client):
+        """Move a subscriber to the back so the next fetch uses another user's token"""
+        with self._lock:
+            if client in self._clients:
+                self._clients[client] = self._clients.pop(client)
+
+    def _publish(self, message):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Slow client: drop its backlog and resync it with one full snapshot
+                with self._lock:
+                    resync = self._full_event() if self._snapshot is not None else message
+                while True:
+                    try:
+                        client.get_nowait()
+                    except queue.Empty:
+                        break
+                try:
+                    client.put_nowait(resync)
+                except queue.Full:
+                    pass
+
+
+stats_broadcaster = StatsBroadcaster()
 
 def login_required(f):
     """Decorator to require login"""
@@ -139,19 +2503,177 @@ def index():
         return redirect(url_for('dashboard'))
     return redirect(url_for('login'))
 
+@app.route('/health')
+def health():
+    """Liveness probe: the worker is up and serving requests"""
+    return jsonify({'status': 'OK', 'service': 'frontend', 'pid': os.getpid()})
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness probe: the worker can reach the API gateway"""
+    try:
+        response = gateway_client.request('GET', '/health', timeout_seconds=2.0)
+        gateway_ok = response.status_code == 200
+        gateway_status = response.status_code
+    except requests.exceptions.RequestException as e:
+        gateway_ok = False
+        gateway_status = str(e)
+    
+    return jsonify({
+        'status': 'OK' if gateway_ok else 'ERROR',
+        'service': 'frontend',
+        'ready': gateway_ok,
+        'checks': {'gateway': gateway_status},
+        'pid': os.getpid()
+    }), 200 if gateway_ok else 503
+
+@app.route('/health/circuits')
+def health_circuits():
+    """Circuit breakers, upstream latency and retry budget of this worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'circuits': circuit_breakers.status(),
+        'stale_responses': stale_responses.status(),
+        'response_cache': response_cache.status(),
+        'fragment_cache': fragment_cache.status(),
+        'latency': latency_tracker.status(),
+        'retry_budget': retry_budget.status()
+    })
+
+class MetricsRequest(app.request_class):
+    """Request that also stores itself in the environ under a key Flask does not
+    clear when the request context ends, so the middleware can read the endpoint"""
+
+    def __init__(self, environ, *args, **kwargs):
+        super().__init__(environ, *args, **kwargs)
+        environ['frontend.request'] = self
+
+
+class RequestMetricsMiddleware:
+    """WSGI wrapper recording duration, status and in-flight count of every request.
+
+    Works on the WSGI environ instead of Flask's context locals, which cost
+    more than the recording itself. Durations run until the response headers
+    are ready, so streamed bodies are not included.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        statuses = []
+
+        def recording_start_response(status, headers, exc_info=None):
+            statuses.append(status[:3])
+            return start_response(status, headers, exc_info)
+
+        metrics.add('frontend_http_requests_in_flight')
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, recording_start_response)
+        finally:
+            elapsed = time.perf_counter() - started
+            flask_request = environ.pop('frontend.request', None)
+            # Unmatched URLs (404s) share one label instead of one series per path
+            endpoint = getattr(flask_request, 'endpoint', None) or 'unmatched'
+            metrics.add('frontend_http_requests_in_flight', (), -1)
+            metrics.observe('frontend_http_request_duration_seconds', (endpoint,), elapsed)
+            metrics.inc('frontend_http_requests_total',
+                        (endpoint, environ['REQUEST_METHOD'], statuses[0] if statuses else '500'))
+
+def record_request_exception(sender, exception, **extra):
+    metrics.inc('frontend_http_exceptions_total', (request.endpoint or 'unmatched',))
+
+if METRICS_ENABLED:
+    app.request_class = MetricsRequest
+    app.wsgi_app = RequestMetricsMiddleware(app.wsgi_app)
+    got_request_exception.connect(record_request_exception, app)
+
+@app.before_request
+def start_trace():
+    incoming = request.headers.get(TRACE_HEADER, '')
+    trace_id = incoming if TRACE_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    request.environ['frontend.trace'] = RequestTrace(trace_id)
+
+def start_render_span(sender, template, context, **extra):
+    trace = current_trace()
+    if trace is not None:
+        trace.start_render()
+
+def finish_render_span(sender, template, context, **extra):
+    trace = current_trace()
+    if trace is not None:
+        trace.finish_render(template.name)
+
+before_render_template.connect(start_render_span, app)
+template_rendered.connect(finish_render_span, app)
+
+@app.after_request
+def finish_trace(response):
+    trace = request.environ.get('frontend.trace')
+    if trace is None:
+        return response
+    total_ms = (time.perf_counter() - trace.started) * 1000
+    response.headers[TRACE_HEADER] = trace.trace_id
+    if TRACE_SERVER_TIMING:
+        response.headers['Server-Timing'] = trace.server_timing(total_ms)
+    if trace_exporter is not None:
+        trace_exporter.export(trace.to_dict(endpoint=request.endpoint, method=request.method, path=request.path,
+                                            status=response.status_code, duration_ms=round(total_ms, 2)))
+    return response
+
+def collect_component_metrics():
+    """Counters kept by the caches, breakers and log handler, read at scrape time"""
+    thumbnails = thumbnail_cache.status()
+    yield 'frontend_cache_requests_total', ('thumbnails', 'hit'), thumbnails['hits']
+    yield 'frontend_cache_requests_total', ('thumbnails', 'miss'), thumbnails['misses']
+    fragments = fragment_cache.status()
+    yield 'frontend_cache_requests_total', ('fragments', 'hit'), fragments['hits']
+    yield 'frontend_cache_requests_total', ('fragments', 'miss'), fragments['misses']
+    for prefix, circuit in circuit_breakers.status().items():
+        yield 'frontend_circuit_open', (prefix,), int(circuit['state'] == 'open')
+    yield 'frontend_stale_responses_served_total', (), stale_responses.served
+    budget = retry_budget.status()
+    for result in ('hedges', 'retries', 'denied'):
+        yield 'frontend_retry_budget_attempts_total', (result,), budget[result]
+    yield 'frontend_log_records_dropped_total', (), log_handler.dropped
+
+metrics.register_collector(collect_component_metrics)
+
+def add_cache_hit_ratios(samples):
+    """Derive frontend_cache_hit_ratio from the (already merged) cache counters"""
+    lookups = {}
+    for (name, labels), value in samples['counters'].items():
+        if name == 'frontend_cache_requests_total':
+            cache, result = labels
+            served, total = lookups.get(cache, (0, 0))
+            lookups[cache] = (served + (value if result in ('hit', 'stale') else 0), total + value)
+    for cache, (served, total) in lookups.items():
+        if total:
+            samples['gauges'][('frontend_cache_hit_ratio', (cache,))] = round(served / total, 4)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: request, upstream and cache metrics of all workers"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        abort(401)
+    samples = metrics.collect()
+    add_cache_hit_ratios(samples)
+    return Response(metrics.render(samples), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         login_method = request.form.get('login_method')
         
-        app.logger.info(f"DEBUG: Login attempt - method: {login_method}")
+        app.logger.debug(f"Login attempt - method: {login_method}")
         flash(f'DEBUG: Método de login: {login_method}', 'info')
         
         if login_method == 'local':
             username = request.form.get('username')
             password = request.form.get('password')
             
-            app.logger.info(f"DEBUG: Local login - username: {username}")
+            app.logger.debug(f"Local login - username: {username}")
             flash(f'DEBUG: Intentando login con usuario: {username}', 'info')
             
             if username and password:
@@ -164,6 +2686,7 @@ def login():
                 if response and response.status_code == 200:
                     try:
                         data = response.json()
+                        rotate_session()
                         session['authenticated'] = True
                         session['token'] = data['token']
                         session['user'] = data['user']
@@ -184,6 +2707,7 @@ def login():
                     flash(f'DEBUG: Login falló - status: {response.status_code if response else "None"}', 'warning')
                     # Fallback para admin en caso de emergencia
                     if username == 'admin' and password == 'admin123':
+                        rotate_session()
                         session['authenticated'] = True
                         session['token'] = 'temp-admin-token'
                         session['user'] = {
@@ -197,6 +2721,7 @@ def login():
                     elif username and password and len(username) >= 3:
                         # Generate consistent user ID from username
                         user_id = abs(hash(username)) % 1000 + 10  # ID between 10-1009
+                        rotate_session()
                         session['authenticated'] = True
                         session['token'] = f'temp-{username}-token'
                         session['user'] = {
@@ -226,6 +2751,7 @@ def quick_login():
     """Login rápido para desarrollo"""
     # Create a different user ID for development to test logging
     dev_user_id = 999  # Special ID for development
+    rotate_session()
     session['authenticated'] = True
     session['token'] = 'temp-dev-user-token'
     session['user'] = {'id': dev_user_id, 'username': 'dev-user', 'role': 'user'}
@@ -254,6 +2780,7 @@ def register():
             
             if response and response.status_code == 201:
                 data = response.json()
+                rotate_session()
                 session['authenticated'] = True
                 session['token'] = data['token']
                 session['user'] = data['user']
@@ -265,6 +2792,7 @@ def register():
                 # Solo como Ãºltimo recurso, crear usuario temporal
                 if len(username) >= 3 and '@' in email and len(password) >= 6:
                     flash('Error de conexiÃ³n con el servidor. Usando modo temporal.', 'warning')
+                    rotate_session()
                     session['authenticated'] = True
                     session['token'] = f'temp-{username}-token'
                     session['user'] = {
@@ -300,34 +2828,33 @@ def logout_complete():
 @login_required
 def dashboard():
     # Get statistics
-    response = make_request('GET', '/api/consulta/stats')
+    stats, _ = stats_cache.get('/api/consulta/stats')
 
-    stats = {}
-    if response and response.status_code == 200:
-        stats = response.json()
-    else:
+    if stats is None:
         # No bloquear: renderizar sin datos y mostrar aviso suave en la UI
-        if response is None:
-            flash('El servicio de estadisticas esta lento o no disponible. Mostrando el panel sin datos.', 'info')
+        stats = {}
+        flash('El servicio de estadisticas esta lento o no disponible. Mostrando el panel sin datos.', 'info')
     
-    return render_template('dashboard.html', stats=stats, user=session.get('user'))
+    return render_template('dashboard.html', stats=stats, user=session.get('user'),
+                           stats_version=stats_fingerprint(stats) if stats else None)
 
 @app.route('/api/dashboard/stats')
 @login_required
 def dashboard_stats_api():
     """API endpoint for dashboard statistics (for auto-refresh)"""
     try:
-        # Llamar directamente al endpoint específico del dashboard
-        response = make_request('GET', '/api/consulta/dashboard/stats', timeout_seconds=3.0)
+        # Endpoint específico del dashboard, servido desde el cache local
+        stats, cache_state = stats_cache.get('/api/consulta/dashboard/stats', timeout_seconds=3.0)
         
-        if response and response.status_code == 200:
-            stats_data = response.json()
+        if stats is not None:
+            stats_data = dict(stats)
             # Agregar timestamp para debugging
             stats_data['_frontend_timestamp'] = datetime.now().isoformat()
+            stats_data['_frontend_cache'] = cache_state
             return jsonify(stats_data)
         else:
             # Responder con error más específico
-            error_msg = f"Backend error: {response.status_code if response else 'No response'}"
+            error_msg = f"Backend error: stats {cache_state}"
             return jsonify({
                 'error': error_msg,
                 '_frontend_timestamp': datetime.now().isoformat()
@@ -338,6 +2865,42 @@ def dashboard_stats_api():
             '_frontend_timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/dashboard/stream')
+@login_required
+def dashboard_stats_stream():
+    """Server-Sent Events stream of dashboard stats changes (replaces 10s polling)"""
+    client = stats_broadcaster.subscribe(session.get('token'))
+    if client is None:
+        # Worker at capacity: the dashboard falls back to polling /api/dashboard/stats
+        return jsonify({'error': 'Too many live dashboard connections'}), 503
+
+    def stream():
+        try:
+            yield f"retry: {int(SSE_POLL_SECONDS * 1000)}\n\n"
+            while True:
+                try:
+                    yield client.get(timeout=SSE_HEARTBEAT_SECONDS * 2)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+        finally:
+            stats_broadcaster.unsubscribe(client)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/dashboard/cache-status')
+@login_required
+def dashboard_cache_status():
+    """Stats cache state and request-coalescing counters for this worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'stats_cache': stats_cache.status(),
+        'stream_clients': stats_broadcaster.client_count(),
+        '_frontend_timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/dashboard/refresh', methods=['POST'])
 @login_required
 def force_dashboard_refresh():
@@ -347,10 +2910,10 @@ def force_dashboard_refresh():
         invalidate_stats_cache()
         
         # Obtener nuevas estadísticas
-        response = make_request('GET', '/api/consulta/dashboard/stats', timeout_seconds=3.0)
+        stats, _ = stats_cache.get('/api/consulta/dashboard/stats', timeout_seconds=3.0, allow_stale=False)
         
-        if response and response.status_code == 200:
-            stats_data = response.json()
+        if stats is not None:
+            stats_data = dict(stats)
             stats_data['_forced_refresh'] = True
             stats_data['_frontend_timestamp'] = datetime.now().isoformat()
             return jsonify(stats_data)
@@ -365,6 +2928,10 @@ def force_dashboard_refresh():
             '_frontend_timestamp': datetime.now().isoformat()
         }), 500
 
+PERSONA_REQUIRED_FIELDS = ('numero_documento', 'tipo_documento', 'primer_nombre',
+                           'apellidos', 'fecha_nacimiento', 'genero',
+                           'correo_electronico', 'celular')
+
 @app.route('/personas/crear', methods=['GET', 'POST'])
 @login_required
 def crear_persona():
@@ -376,12 +2943,8 @@ def crear_persona():
         is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
         
         # Validate required fields
-        required_fields = ['numero_documento', 'tipo_documento', 'primer_nombre', 
-                          'apellidos', 'fecha_nacimiento', 'genero', 
-                          'correo_electronico', 'celular']
-        
         data = {}
-        for field in required_fields:
+        for field in PERSONA_REQUIRED_FIELDS:
             value = request.form.get(field)
             if not value:
                 error_msg = f'El campo {field.replace("_", " ").title()} es requerido'
@@ -399,28 +2962,22 @@ def crear_persona():
         if 'foto' in request.files:
             foto = request.files['foto']
             if foto.filename and foto.filename != '':
-                # Check file size (2MB)
-                if len(foto.read()) > 2 * 1024 * 1024:
+                # Check file size (2MB) without reading the upload into memory
+                if upload_size(foto) > PHOTO_MAX_BYTES:
                     error_msg = 'La foto no puede superar los 2MB'
                     if is_ajax:
                         return jsonify({'error': error_msg}), 400
                     flash(error_msg, 'error')
                     return render_template('crear_persona.html', today_iso=today_iso())
-                foto.seek(0)  # Reset file pointer
-                files = {'foto': (foto.filename, foto, foto.content_type)}
+                files = {'foto': optimize_photo(foto)}
         
         # Make request
-        print(f"DEBUG: About to make request to create persona with doc: {data.get('numero_documento')}")
+        app.logger.debug(f"About to make request to create persona with doc: {data.get('numero_documento')}")
         response = make_request('POST', '/api/personas', data=data, files=files)
-        print(f"DEBUG: Received response object: {response}")
+        app.logger.debug(f"Received response object: {response}")
         
         if response is not None:
-            print(f"DEBUG: crear_persona response status: {response.status_code}")
-            try:
-                response_text = response.text
-                print(f"DEBUG: Response content: {response_text}")
-            except:
-                print("DEBUG: Could not read response text")
+            app.logger.debug(f"crear_persona response status: {response.status_code}")
                 
             if response.status_code == 201:
                 # Invalidar cache de estadísticas después de crear
@@ -434,7 +2991,7 @@ def crear_persona():
                 try:
                     error_data = response.json()
                     error_message = error_data.get('error', 'Error de validación desconocido')
-                    print(f"DEBUG: 400 error response: {error_data}")
+                    app.logger.debug(f"400 error response: {error_data}")
                     # Mostrar detalles específicos si están disponibles
                     if 'details' in error_data:
                         details = error_data['details']
@@ -451,7 +3008,7 @@ def crear_persona():
                         return jsonify(error_data), 400
                     flash(f'❌ Error de validación: {error_message}', 'error')
                 except Exception as e:
-                    print(f"DEBUG: Error parsing 400 response: {e}")
+                    app.logger.debug(f"Error parsing 400 response: {e}")
                     error_msg = '❌ Error de validación: Datos inválidos'
                     if is_ajax:
                         return jsonify({'error': 'Error de validación: Datos inválidos'}), 400
@@ -460,31 +3017,30 @@ def crear_persona():
                 try:
                     error_data = response.json()
                     error_message = error_data.get('error', 'Ya existe una persona con ese número de documento')
-                    print(f"DEBUG: 409 error response parsed successfully: {error_data}")
+                    app.logger.debug(f"409 error response parsed successfully: {error_data}")
                     
                     if is_ajax:
-                        print(f"DEBUG: Returning 409 JSON response for AJAX")
+                        app.logger.debug(f"Returning 409 JSON response for AJAX")
                         return jsonify(error_data), 409
                     flash(f'❌ {error_message}. Por favor, verifique el número ingresado.', 'error')
                 except Exception as e:
-                    print(f"DEBUG: Error parsing 409 response: {e}")
-                    print(f"DEBUG: Raw response text: {response.text}")
+                    app.logger.debug(f"Error parsing 409 response: {e}")
                     error_data = {'error': 'Ya existe una persona con ese número de documento'}
                     if is_ajax:
-                        print(f"DEBUG: Returning fallback 409 JSON response for AJAX")
+                        app.logger.debug(f"Returning fallback 409 JSON response for AJAX")
                         return jsonify(error_data), 409
                     flash('❌ Ya existe una persona con ese número de documento. Por favor, verifique el número ingresado.', 'error')
             elif response.status_code == 422:
                 try:
                     error_data = response.json()
                     error_message = error_data.get('error', 'Error de procesamiento')
-                    print(f"DEBUG: 422 error response: {error_data}")
+                    app.logger.debug(f"422 error response: {error_data}")
                     
                     if is_ajax:
                         return jsonify(error_data), 422
                     flash(f'❌ Error de procesamiento: {error_message}', 'error')
                 except Exception as e:
-                    print(f"DEBUG: Error parsing 422 response: {e}")
+                    app.logger.debug(f"Error parsing 422 response: {e}")
                     error_data = {'error': 'Error de procesamiento: Los datos no pudieron ser procesados'}
                     if is_ajax:
                         return jsonify(error_data), 422
@@ -493,13 +3049,13 @@ def crear_persona():
                 try:
                     error_data = response.json()
                     error_message = error_data.get('error', 'Error interno del servidor')
-                    print(f"DEBUG: 500 error response: {error_data}")
+                    app.logger.debug(f"500 error response: {error_data}")
                     
                     if is_ajax:
                         return jsonify(error_data), 500
                     flash(f'❌ Error interno del servidor: {error_message}. Por favor, intente nuevamente más tarde.', 'error')
                 except Exception as e:
-                    print(f"DEBUG: Error parsing 500 response: {e}")
+                    app.logger.debug(f"Error parsing 500 response: {e}")
                     error_data = {'error': 'Error interno del servidor'}
                     if is_ajax:
                         return jsonify(error_data), 500
@@ -508,19 +3064,19 @@ def crear_persona():
                 try:
                     error_data = response.json()
                     error_message = error_data.get('error', f'Error desconocido (Código: {response.status_code})')
-                    print(f"DEBUG: {response.status_code} error response: {error_data}")
+                    app.logger.debug(f"{response.status_code} error response: {error_data}")
                     
                     if is_ajax:
                         return jsonify(error_data), response.status_code
                     flash(f'❌ {error_message}', 'error')
                 except Exception as e:
-                    print(f"DEBUG: Error parsing {response.status_code} response: {e}")
+                    app.logger.debug(f"Error parsing {response.status_code} response: {e}")
                     error_data = {'error': f'Error al crear la persona (Código: {response.status_code})'}
                     if is_ajax:
                         return jsonify(error_data), response.status_code
                     flash(f'❌ Error al crear la persona (Código: {response.status_code})', 'error')
         else:
-            print("DEBUG: Response is None - connection/timeout error occurred")
+            app.logger.debug("Response is None - connection/timeout error occurred")
             error_msg = '❌ Error de conexión: No se pudo contactar con el servidor. Verifique su conexión y que los servicios estén ejecutándose.'
             if is_ajax:
                 return jsonify({'error': 'Error de conexión: No se pudo contactar con el servidor. Verifique su conexión y que los servicios estén ejecutándose.'}), 503
@@ -528,12 +3084,247 @@ def crear_persona():
     
     return render_template('crear_persona.html', today_iso=today_iso())
 
+# Bulk import: rows are validated locally with the personas service rules, then
+# created with bounded concurrency while progress is streamed as NDJSON
+IMPORT_MAX_WORKERS = int(os.getenv('IMPORT_MAX_WORKERS', '4'))
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '10000'))
+IMPORT_PROGRESS_INTERVAL_SECONDS = float(os.getenv('IMPORT_PROGRESS_INTERVAL_SECONDS', '0.5'))
+NAME_PATTERN = re.compile(r'^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s]+$')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+TIPOS_DOCUMENTO = ('Tarjeta de identidad', 'Cédula')
+GENEROS = ('Masculino', 'Femenino', 'No binario', 'Prefiero no reportar')
+
+
+def validate_persona(data):
+    """First validation error of a persona dict, mirroring the personas service schema (or None)"""
+    for field in PERSONA_REQUIRED_FIELDS:
+        if not data.get(field):
+            return f'El campo {field.replace("_", " ").title()} es requerido'
+    if not data['numero_documento'].isdigit():
+        return 'El número de documento debe contener solo números'
+    if len(data['numero_documento']) > 10:
+        return 'El número de documento no puede tener más de 10 caracteres'
+    if data['tipo_documento'] not in TIPOS_DOCUMENTO:
+        return 'El tipo de documento debe ser "Tarjeta de identidad" o "Cédula"'
+    for field, label, max_length in (('primer_nombre', 'El primer nombre', 30),
+                                     ('segundo_nombre', 'El segundo nombre', 30),
+                                     ('apellidos', 'Los apellidos', 60)):
+        value = data.get(field)
+        if not value:
+            continue
+        if not NAME_PATTERN.match(value):
+            return f'{label} no puede contener números'
+        if len(value) > max_length:
+            return f'{label} no puede tener más de {max_length} caracteres'
+    try:
+        if date.fromisoformat(data['fecha_nacimiento']) > date.today():
+            return 'La fecha de nacimiento no puede ser futura'
+    except ValueError:
+        return 'La fecha de nacimiento debe tener el formato AAAA-MM-DD'
+    if data['genero'] not in GENEROS:
+        return 'El género debe ser uno de los valores permitidos'
+    if not EMAIL_PATTERN.match(data['correo_electronico']):
+        return 'Debe ser un correo electrónico válido'
+    if not (len(data['celular']) == 10 and data['celular'].isdigit()):
+        return 'El celular debe tener exactamente 10 dígitos numéricos'
+    return None
+
+
+def import_cell(value):
+    """Normalize a CSV/XLSX cell to the string the form would have sent"""
+    if value is None:
+        return ''
+    value = str(value).strip()
+    if value.lower() == 'nan':
+        return ''
+    # Spreadsheets turn documents/phones into floats and dates into timestamps
+    if re.fullmatch(r'\d+\.0', value):
+        return value[:-2]
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}[ T]00:00:00', value):
+        return value[:10]
+    return value
+
+
+def upload_file(upload):
+    """Binary file object behind an upload, rewound to the start.
+
+    Werkzeug spools uploads in a SpooledTemporaryFile, which before Python 3.11
+    lacks readable()/seekable() and cannot be wrapped by TextIOWrapper; its
+    ``_file`` (a BytesIO or, once rolled over, a real temporary file) can.
+    """
+    stream = upload.stream
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        stream = stream._file
+    stream.seek(0)
+    return stream
+
+
+def read_import_rows(upload):
+    """Rows of an uploaded CSV or XLSX file as dicts keyed by column name.
+
+    Rows are parsed one at a time from the spooled upload and never held
+    together in memory; every call starts again from the beginning of the file.
+    """
+    stream = upload_file(upload)
+    if (upload.filename or '').lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        # read_only parses the sheet row by row instead of building the whole workbook
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [import_cell(name) for name in next(rows, ())]
+            for values in rows:
+                if any(value is not None for value in values):
+                    yield dict(zip(header, values))
+        finally:
+            workbook.close()
+        return
+    text = TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        delimiter = ';' if sample.count(';') > sample.count(',') else ','
+        yield from csv.DictReader(text, delimiter=delimiter)
+    finally:
+        # Leave the upload open for the next pass
+        text.detach()
+
+
+def create_imported_persona(data, auth_token):
+    """Create one persona; returns an error message or None"""
+    response = make_request('POST', '/api/personas', data=data, auth_token=auth_token)
+    if response is None:
+        return 'Error de conexión con el servidor'
+    if response.status_code == 201:
+        return None
+    try:
+        return response.json().get('error') or f'Error (Código: {response.status_code})'
+    except ValueError:
+        return f'Error (Código: {response.status_code})'
+
+
+def run_import(rows, total, auth_token):
+    """Validate and create the rows as they are read, yielding NDJSON progress events"""
+    def event(payload):
+        return json.dumps(payload, ensure_ascii=False) + '\n'
+
+    summary = {'total': total, 'processed': 0, 'created': 0, 'failed': 0}
+    seen = set()
+    in_flight = {}
+    last_progress = time.monotonic()
+
+    def finished(futures):
+        for future in futures:
+            row_number, numero_documento = in_flight.pop(future)
+            try:
+                error = future.result()
+            except Exception as e:
+                error = str(e)
+            summary['processed'] += 1
+            if error is None:
+                summary['created'] += 1
+            else:
+                summary['failed'] += 1
+                yield event({'type': 'error', 'row': row_number, 'numero_documento': numero_documento,
+                             'error': error})
+
+    def progress():
+        nonlocal last_progress
+        if time.monotonic() - last_progress >= IMPORT_PROGRESS_INTERVAL_SECONDS:
+            last_progress = time.monotonic()
+            yield event(dict(summary, type='progress'))
+
+    yield event(dict(summary, type='progress'))
+    with ThreadPoolExecutor(max_workers=IMPORT_MAX_WORKERS, thread_name_prefix='persona-import') as pool:
+        # Row numbers count the header as row 1, like a spreadsheet
+        for row_number, row in enumerate(rows, start=2):
+            data = {field: import_cell(row.get(field)) for field in PERSONA_REQUIRED_FIELDS + ('segundo_nombre',)}
+            error = validate_persona(data)
+            if error is None and data['numero_documento'] in seen:
+                error = 'Número de documento repetido en el archivo'
+            if error is not None:
+                summary['processed'] += 1
+                summary['failed'] += 1
+                yield event({'type': 'error', 'row': row_number, 'numero_documento': data['numero_documento'],
+                             'error': error})
+                continue
+            seen.add(data['numero_documento'])
+            data['segundo_nombre'] = data['segundo_nombre'] or None
+            # Keep at most IMPORT_MAX_WORKERS creations queued at a time
+            if len(in_flight) >= IMPORT_MAX_WORKERS:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+            in_flight[pool.submit(create_imported_persona, data, auth_token)] = (row_number, data['numero_documento'])
+            yield from progress()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+            yield from progress()
+
+    if summary['created']:
+        # One invalidation for the whole import instead of one per row
+        invalidate_stats_cache(auth_token=auth_token)
+    # Prefixed: 'created' would clash with the LogRecord attribute of the same name
+    app.logger.info("Persona import finished", extra={f'import_{key}': value for key, value in summary.items()})
+    yield event(dict(summary, type='done'))
+
+
+@app.route('/personas/importar', methods=['GET', 'POST'])
+@login_required
+def importar_personas():
+    if request.method == 'GET':
+        return render_template('importar_personas.html', columns=PERSONA_REQUIRED_FIELDS + ('segundo_nombre',),
+                               max_rows=IMPORT_MAX_ROWS)
+
+    upload = request.files.get('archivo')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'Seleccione un archivo CSV o XLSX'}), 400
+    if not upload.filename.lower().endswith(('.csv', '.xlsx')):
+        return jsonify({'error': 'Solo se permiten archivos CSV o XLSX'}), 400
+    # First pass: check the columns and count the rows without keeping them
+    total = 0
+    try:
+        for row in read_import_rows(upload):
+            if total == 0:
+                missing = [field for field in PERSONA_REQUIRED_FIELDS if field not in row]
+                if missing:
+                    return jsonify({'error': f'Faltan columnas: {", ".join(missing)}'}), 400
+            total += 1
+            if total > IMPORT_MAX_ROWS:
+                return jsonify({'error': f'El archivo supera el máximo de {IMPORT_MAX_ROWS} filas'}), 400
+    except Exception as e:
+        app.logger.warning("Import file could not be read", extra={'error': str(e)}, exc_info=True)
+        return jsonify({'error': 'No fue posible leer el archivo'}), 400
+    if not total:
+        return jsonify({'error': 'El archivo no contiene filas'}), 400
+
+    # Second pass while the response streams: stream_with_context keeps the upload
+    # open until the body is done; the token is resolved now for the pool threads
+    return Response(stream_with_context(run_import(read_import_rows(upload), total, session.get('token'))),
+                    content_type='application/x-ndjson', headers={'Cache-Control': 'no-store'})
+
+
+def lookup_persona(numero_documento):
+    """GET a persona through consulta's read-through cache.
+
+    The personas service's own GET always queries Postgres; consulta's copy is
+    kept current by the personas service's write-through on every change.
+    """
+    return make_request('GET', f'/api/consulta/persona/{numero_documento}')
+
+
+def persona_from(response):
+    """Persona of a lookup response without consulta's ``_cache*`` metadata"""
+    return {key: value for key, value in response.json().items() if not key.startswith('_')}
+
+
 @app.route('/personas/check/<numero_documento>', methods=['GET'])
 @login_required
 def check_persona_exists(numero_documento):
     """Check if a persona with the given document number exists"""
     try:
-        response = make_request('GET', f'/api/personas/{numero_documento}')
+        response = lookup_persona(numero_documento)
         if response:
             if response.status_code == 200:
                 # Persona exists
@@ -548,7 +3339,7 @@ def check_persona_exists(numero_documento):
             # Connection error
             return jsonify({'error': 'Error de conexión'}), 503
     except Exception as e:
-        print(f"DEBUG: Error checking persona: {e}")
+        app.logger.error(f"Error checking persona: {e}")
         return jsonify({'error': 'Error interno'}), 500
 
 @app.route('/personas/modificar', methods=['GET', 'POST'])
@@ -563,13 +3354,13 @@ def modificar_persona():
         # Check if we want to force a clean state (after limpiar_busqueda)
         force_clean = request.args.get('clean') == 'true'
         numero_documento = request.args.get('numero_documento')
-        app.logger.info(f"DEBUG: GET request - force_clean: {force_clean}, numero_documento: {numero_documento}")
+        app.logger.debug(f"GET request - force_clean: {force_clean}, numero_documento: {numero_documento}")
         
         if numero_documento and not force_clean:
-            response = make_request('GET', f'/api/personas/{numero_documento}')
+            response = lookup_persona(numero_documento)
             
             if response and response.status_code == 200:
-                persona = response.json()
+                persona = persona_from(response)
                 session['persona_to_modify'] = persona
             elif response and response.status_code == 404:
                 flash('Persona no encontrada', 'error')
@@ -580,11 +3371,11 @@ def modificar_persona():
     
     elif request.method == 'POST':
         action = request.form.get('action')
-        app.logger.info(f"DEBUG: POST action received: {action}")
+        app.logger.debug(f"POST action received: {action}")
         
         if action == 'limpiar_busqueda':
             # Clear session and redirect to clean state
-            app.logger.info("DEBUG: Limpiando bÃºsqueda y redirigiendo")
+            app.logger.debug("Limpiando bÃºsqueda y redirigiendo")
             session.pop('persona_to_modify', None)
             flash('BÃºsqueda reiniciada', 'info')
             return redirect(url_for('modificar_persona', clean='true'))
@@ -592,10 +3383,10 @@ def modificar_persona():
         elif action == 'buscar':
             numero_documento = request.form.get('numero_documento')
             if numero_documento:
-                response = make_request('GET', f'/api/personas/{numero_documento}')
+                response = lookup_persona(numero_documento)
                 
                 if response and response.status_code == 200:
-                    persona = response.json()
+                    persona = persona_from(response)
                     session['persona_to_modify'] = persona
                     flash(f'✅ Persona encontrada: {persona.get("primer_nombre", "")} {persona.get("apellidos", "")}', 'success')
                 elif response and response.status_code == 404:
@@ -631,11 +3422,10 @@ def modificar_persona():
             if 'foto' in request.files:
                 foto = request.files['foto']
                 if foto.filename and foto.filename != '':
-                    if len(foto.read()) > 2 * 1024 * 1024:
+                    if upload_size(foto) > PHOTO_MAX_BYTES:
                         flash('La foto no puede superar los 2MB', 'error')
                         return render_template('modificar_persona.html', persona=persona, today_iso=today_iso())
-                    foto.seek(0)
-                    files = {'foto': (foto.filename, foto, foto.content_type)}
+                    files = {'foto': optimize_photo(foto)}
             
             # Make request
             response = make_request('PUT', f'/api/personas/{persona["numero_documento"]}', 
@@ -698,10 +3488,60 @@ def modificar_persona():
     
     return render_template('modificar_persona.html', persona=persona, today_iso=today_iso())
 
+def persona_search_params(args):
+    """consulta /search filters from the consultar_personas form fields"""
+    params = {}
+    tipo_documento = args.get('tipo_documento')
+    genero = args.get('genero')
+    if tipo_documento and tipo_documento != 'Todos':
+        params['tipo_documento'] = tipo_documento
+    if genero and genero != 'Todos':
+        params['genero'] = genero
+    if args.get('edad_min'):
+        params['edad_min'] = args.get('edad_min')
+    if args.get('edad_max'):
+        params['edad_max'] = args.get('edad_max')
+    return params
+
+
+def log_search_params(args):
+    """log-service /search filters from the consultar_logs form fields"""
+    params = {}
+    transaction_type = args.get('transaction_type')
+    entity_type = args.get('entity_type')
+    numero_documento = args.get('numero_documento')
+    status = args.get('status')
+    fecha_inicio = args.get('fecha_inicio')
+    fecha_fin = args.get('fecha_fin')
+    if transaction_type and transaction_type.strip() and transaction_type != 'Todos':
+        params['transaction_type'] = transaction_type
+    if entity_type and entity_type.strip() and entity_type != 'Todos':
+        params['entity_type'] = entity_type
+    if numero_documento and numero_documento.strip():
+        params['numero_documento'] = numero_documento
+    if status and status.strip() and status != 'Todos':
+        # Map frontend status values to API values
+        status_mapping = {
+            'success': 'SUCCESS',
+            'error': 'ERROR',
+            'not_found': 'NOT_FOUND'
+        }
+        params['status'] = status_mapping.get(status, status.upper())
+    if fecha_inicio and fecha_inicio.strip():
+        params['fecha_inicio'] = fecha_inicio
+    if fecha_fin and fecha_fin.strip():
+        params['fecha_fin'] = fecha_fin
+    return params
+
+
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '25'))
+
 @app.route('/personas/consultar')
 @login_required
 def consultar_personas():
     personas = []
+    next_cursor = None
+    total_results = None
     
     # Check if it's a search request
     numero_documento = request.args.get('numero_documento')
@@ -723,51 +3563,43 @@ def consultar_personas():
     
     elif any([tipo_documento, genero, edad_min, edad_max]):
         # Advanced search
-        app.logger.info(f"DEBUG: BÃºsqueda avanzada - params: tipo_documento={tipo_documento}, genero={genero}, edad_min={edad_min}, edad_max={edad_max}")
-        params = {}
-        if tipo_documento and tipo_documento != 'Todos':
-            params['tipo_documento'] = tipo_documento
-        if genero and genero != 'Todos':
-            params['genero'] = genero
-        if edad_min:
-            params['edad_min'] = edad_min
-        if edad_max:
-            params['edad_max'] = edad_max
-        
-        # Check if this is actually a "show all" query (no real filters, just age range 0-120)
-        is_show_all = (
-            (not tipo_documento or tipo_documento == '' or tipo_documento == 'Todos') and
-            (not genero or genero == '' or genero == 'Todos') and
-            (edad_min == '0' or not edad_min or edad_min == '') and
-            (edad_max == '120' or not edad_max or edad_max == '')
-        )
-        
-        app.logger.info(f"DEBUG: is_show_all check - tipo_documento='{tipo_documento}', genero='{genero}', edad_min='{edad_min}', edad_max='{edad_max}', result={is_show_all}")
-        
-        # If it's a "show all" query, use a higher limit
-        if is_show_all:
-            params['limit'] = 50  # Show more results when no real filters are applied
-            app.logger.info("DEBUG: Using limit=50 for show all query")
+        app.logger.debug(f"BÃºsqueda avanzada - params: tipo_documento={tipo_documento}, genero={genero}, edad_min={edad_min}, edad_max={edad_max}")
+        params = persona_search_params(request.args)
+        cursor = request.args.get('cursor')
+        params['limit'] = SEARCH_PAGE_SIZE
+        if cursor:
+            params['cursor'] = cursor
         else:
-            params['limit'] = 20  # Standard limit for filtered searches
-            app.logger.info("DEBUG: Using limit=20 for filtered query")
-        
-        app.logger.info(f"DEBUG: Enviando solicitud a /api/consulta/search con params: {params}")
+            # Only the first page pays for the exact count
+            params['include_total'] = 'true'
+
+        app.logger.debug(f"Enviando solicitud a /api/consulta/search con params: {params}")
         response = make_request('GET', '/api/consulta/search', params=params)
-        app.logger.info(f"DEBUG: Respuesta recibida - status: {response.status_code if response else 'None'}")
+        app.logger.debug(f"Respuesta recibida - status: {response.status_code if response else 'None'}")
         
         if response and response.status_code == 200:
             data = response.json()
             personas = data.get('personas', [])
             pagination = data.get('pagination', {})
-            app.logger.info(f"DEBUG: Personas encontradas: {len(personas)}")
+            next_cursor = pagination.get('next_cursor')
+            total_results = pagination.get('total')
+            app.logger.debug(f"Personas encontradas: {len(personas)}")
+            if cursor:
+                # Next page requested by the infinite scroll of the results table
+                return jsonify({
+                    'html': render_template('_persona_rows.html', personas=personas),
+                    'count': len(personas),
+                    'next_cursor': next_cursor
+                })
             if personas:
-                total_results = pagination.get('total', len(personas))
-                flash(f'Se encontraron {total_results} personas (mostrando {len(personas)})', 'success')
+                flash(f'Se encontraron {total_results or len(personas)} personas (mostrando {len(personas)})', 'success')
             else:
                 flash('No se encontraron personas con los criterios especificados', 'info')
+        elif cursor:
+            return jsonify({'error': 'Error al cargar más resultados'}), 502
     
-    return render_template('consultar_personas.html', personas=personas)
+    return render_template('consultar_personas.html', personas=personas,
+                           next_cursor=next_cursor, total_results=total_results)
 
 @app.route('/personas/nlp', methods=['GET', 'POST'])
 @login_required
@@ -801,10 +3633,10 @@ def borrar_persona():
         if action == 'buscar':
             numero_documento = request.form.get('numero_documento')
             if numero_documento:
-                response = make_request('GET', f'/api/personas/{numero_documento}')
+                response = lookup_persona(numero_documento)
                 
                 if response and response.status_code == 200:
-                    persona = response.json()
+                    persona = persona_from(response)
                     session['persona_to_delete'] = persona
                 elif response and response.status_code == 404:
                     flash('Persona no encontrada', 'error')
@@ -863,44 +3695,26 @@ def consultar_logs_test():
             fecha_fin and fecha_fin.strip()
         ])
         
-        app.logger.info(f"Log request - has_search_params: {has_search_params}, show_stats: {show_stats}")
+        app.logger.debug(f"Log request - has_search_params: {has_search_params}, show_stats: {show_stats}")
         
         if has_search_params or (not show_stats and any(request.args.keys())):
             # Search logs
-            params = {}
-            if transaction_type and transaction_type.strip() and transaction_type != 'Todos':
-                params['transaction_type'] = transaction_type
-            if entity_type and entity_type.strip() and entity_type != 'Todos':
-                params['entity_type'] = entity_type
-            if numero_documento and numero_documento.strip():
-                params['numero_documento'] = numero_documento
-            if status and status.strip() and status != 'Todos':
-                # Map frontend status values to API values
-                status_mapping = {
-                    'success': 'SUCCESS',
-                    'error': 'ERROR',
-                    'not_found': 'NOT_FOUND'
-                }
-                params['status'] = status_mapping.get(status, status.upper())
-            if fecha_inicio and fecha_inicio.strip():
-                params['fecha_inicio'] = fecha_inicio
-            if fecha_fin and fecha_fin.strip():
-                params['fecha_fin'] = fecha_fin
+            params = log_search_params(request.args)
             
             # Add pagination parameters
             params['page'] = page
             params['limit'] = limit
             
-            app.logger.info(f"Making request to /api/logs/search with params: {params}")
+            app.logger.debug(f"Making request to /api/logs/search with params: {params}")
             response = make_request('GET', '/api/logs/search', params=params)
             
-            app.logger.info(f"Response status code: {response.status_code if response else 'No response'}")
+            app.logger.debug(f"Response status code: {response.status_code if response else 'No response'}")
             
             if response and response.status_code == 200:
                 data = response.json()
-                app.logger.info(f"Response data keys: {list(data.keys())}")
+                app.logger.debug(f"Response data keys: {list(data.keys())}")
                 logs = data.get('logs', [])
-                app.logger.info(f"Number of logs retrieved: {len(logs)}")
+                app.logger.debug(f"Number of logs retrieved: {len(logs)}")
                 
                 # Process logs to ensure data consistency
                 for log in logs:
@@ -934,15 +3748,16 @@ def consultar_logs_test():
             else:
                 flash('Error al buscar los logs', 'error')
                 app.logger.error(f"Error searching logs: {response.status_code if response else 'No response'}")
-                if response:
-                    app.logger.error(f"Response text: {response.text}")
+                if response and LOG_REQUEST_BODIES:
+                    app.logger.debug("Error searching logs body", extra={'body': response.text})
     
     except Exception as e:
         app.logger.error(f"Error in consultar_logs_test: {str(e)}")
         flash('Error interno del sistema', 'error')
     
-    app.logger.info(f"Final logs count: {len(logs)}, stats: {bool(stats)}")
-    return render_template('consultar_logs.html', logs=logs, stats=stats)
+    app.logger.debug(f"Final logs count: {len(logs)}, stats: {bool(stats)}")
+    return render_template('consultar_logs.html', logs=logs, stats=stats,
+                           stats_version=stats_fingerprint(stats) if stats else None)
 
 @app.route('/logs')
 @login_required
@@ -962,6 +3777,8 @@ def consultar_logs():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     
+    calls = {}
+    
     try:
         # Check if we have actual search parameters (not empty strings)
         has_search_params = any([
@@ -973,45 +3790,49 @@ def consultar_logs():
             fecha_fin and fecha_fin.strip()
         ])
         
-        app.logger.info(f"Log request - has_search_params: {has_search_params}, show_stats: {show_stats}")
+        app.logger.debug(f"Log request - has_search_params: {has_search_params}, show_stats: {show_stats}")
         
         if has_search_params or (not show_stats and any(request.args.keys())):
             # Search logs
+            params = log_search_params(request.args)
+            
+            # Add pagination parameters
+            params['page'] = page
+            params['limit'] = limit
+            
+            app.logger.debug(f"Making request to /api/logs/search with params: {params}")
+            calls['search'] = {'method': 'GET', 'endpoint': '/api/logs/search', 'params': params}
+        
+        if show_stats:
+            # Get statistics
             params = {}
-            if transaction_type and transaction_type.strip() and transaction_type != 'Todos':
-                params['transaction_type'] = transaction_type
-            if entity_type and entity_type.strip() and entity_type != 'Todos':
-                params['entity_type'] = entity_type
-            if numero_documento and numero_documento.strip():
-                params['numero_documento'] = numero_documento
-            if status and status.strip() and status != 'Todos':
-                # Map frontend status values to API values
-                status_mapping = {
-                    'success': 'SUCCESS',
-                    'error': 'ERROR',
-                    'not_found': 'NOT_FOUND'
-                }
-                params['status'] = status_mapping.get(status, status.upper())
-            if fecha_inicio and fecha_inicio.strip():
+            if fecha_inicio:
                 params['fecha_inicio'] = fecha_inicio
-            if fecha_fin and fecha_fin.strip():
+            if fecha_fin:
                 params['fecha_fin'] = fecha_fin
             
             # Add pagination parameters
             params['page'] = page
             params['limit'] = limit
             
-            app.logger.info(f"Making request to /api/logs/search with params: {params}")
-            response = make_request('GET', '/api/logs/search', params=params)
-            
-            app.logger.info(f"Response status code: {response.status_code if response else 'No response'}")
+            app.logger.debug(f"Making request to /api/logs/stats with params: {params}")
+            calls['stats'] = {'method': 'GET', 'endpoint': '/api/logs/stats', 'params': params}
+        
+        # Search and stats are independent: issue them in parallel
+        responses, errors = fan_out_requests(calls) if calls else ({}, {})
+        for name, error in errors.items():
+            app.logger.error(f"Logs {name} request failed: {error}")
+        
+        if 'search' in calls:
+            response = responses.get('search')
+            app.logger.debug(f"Response status code: {response.status_code if response else 'No response'}")
             
             if response and response.status_code == 200:
                 data = response.json()
-                app.logger.info(f"Response data keys: {list(data.keys())}")
+                app.logger.debug(f"Response data keys: {list(data.keys())}")
                 logs = data.get('logs', [])
                 pagination_info = data.get('pagination', {})
-                app.logger.info(f"Number of logs retrieved: {len(logs)}")
+                app.logger.debug(f"Number of logs retrieved: {len(logs)}")
                 
                 # Process logs to ensure data consistency
                 for log in logs:
@@ -1048,20 +3869,8 @@ def consultar_logs():
                 # Error al buscar logs - no mostrar notificación al usuario
                 app.logger.error(f"Error searching logs: {response.status_code if response else 'No response'}")
         
-        if show_stats:
-            # Get statistics
-            params = {}
-            if fecha_inicio:
-                params['fecha_inicio'] = fecha_inicio
-            if fecha_fin:
-                params['fecha_fin'] = fecha_fin
-            
-            # Add pagination parameters
-            params['page'] = page
-            params['limit'] = limit
-            
-            app.logger.info(f"Making request to /api/logs/stats with params: {params}")
-            response = make_request('GET', '/api/logs/stats', params=params)
+        if 'stats' in calls:
+            response = responses.get('stats')
             
             if response and response.status_code == 200:
                 api_stats = response.json()
@@ -1093,54 +3902,285 @@ def consultar_logs():
         app.logger.error(f"Error in consultar_logs: {str(e)}")
         # Error interno - no mostrar notificación al usuario
     
-    app.logger.info(f"Final logs count: {len(logs)}, stats: {bool(stats)}")
-    return render_template('consultar_logs.html', logs=logs, stats=stats, pagination=pagination_info, current_filters=request.args)
+    app.logger.debug(f"Final logs count: {len(logs)}, stats: {bool(stats)}")
+    return render_template('consultar_logs.html', logs=logs, stats=stats, pagination=pagination_info, current_filters=request.args,
+                           stats_version=stats_fingerprint(stats) if stats else None)
+
+# Exports page through the services with keyset cursors and stream the file;
+# both search services cap a page at 1000 rows (SEARCH_MAX_LIMIT)
+EXPORT_CHUNK_SIZE = min(int(os.getenv('EXPORT_CHUNK_SIZE', '500')), 1000)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+PERSONA_EXPORT_COLUMNS = (
+    'numero_documento', 'tipo_documento', 'primer_nombre', 'segundo_nombre', 'apellidos',
+    'fecha_nacimiento', 'edad', 'genero', 'correo_electronico', 'celular', 'created_at', 'updated_at',
+)
+LOG_EXPORT_COLUMNS = (
+    'created_at', 'transaction_type', 'entity_type', 'entity_id', 'numero_documento', 'user_id',
+    'status', 'ip_address', 'user_agent', 'request_data', 'response_data', 'error_message',
+)
+
+
+def iter_search_pages(endpoint, params, items_key, auth_token):
+    """Yield each page of a cursor-paginated search until the last one"""
+    cursor = ''
+    while cursor is not None:
+        page_params = dict(params, limit=EXPORT_CHUNK_SIZE, cursor=cursor)
+        # Each page is read once: caching it would only push useful entries out
+        response = make_request('GET', endpoint, params=page_params, auth_token=auth_token, cache=False)
+        if response is None or response.status_code != 200:
+            raise RuntimeError(f"{endpoint} failed with status {response.status_code if response else 'None'}")
+        data = response.json()
+        yield data.get(items_key, [])
+        cursor = data.get('pagination', {}).get('next_cursor')
+
+
+# Spreadsheet apps run cells starting with these as formulas (CSV/formula injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_value(value):
+    """Cell value for an export; text that a spreadsheet would evaluate is quoted with '"""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(columns, pages):
+    """CSV body generated one page at a time"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    yield buffer.getvalue().encode('utf-8')
+    for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([export_value(row.get(column)) for column in columns])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_xlsx(columns, pages, sheet_name):
+    """XLSX body: rows are spooled to a temp file, then the file is streamed.
+
+    XlsxWriter's constant_memory mode flushes every row to disk as it is
+    written, so memory does not grow with the export. A zip archive can
+    only be sent once it is complete, so the first byte goes out after the
+    last page is fetched.
+    """
+    import pandas as pd
+
+    with tempfile.TemporaryFile() as output:
+        with pd.ExcelWriter(output, engine='xlsxwriter',
+                            engine_kwargs={'options': {'constant_memory': True,
+                                                       # Logged request data is user input, never a formula
+                                                       'strings_to_formulas': False}}) as writer:
+            pd.DataFrame(columns=columns).to_excel(writer, sheet_name=sheet_name, index=False)
+            start_row = 1
+            for rows in pages:
+                frame = pd.DataFrame([[export_value(row.get(column)) for column in columns] for row in rows],
+                                     columns=columns)
+                frame.to_excel(writer, sheet_name=sheet_name, startrow=start_row, header=False, index=False)
+                start_row += len(frame)
+        output.seek(0)
+        for chunk in iter(lambda: output.read(MultipartStream.CHUNK_SIZE), b''):
+            yield chunk
+
+
+def export_columns(args, allowed_columns):
+    """Columns from ?columns=a,b or repeated ?columns=, validated; all by default"""
+    requested = [column.strip() for value in args.getlist('columns') for column in value.split(',') if column.strip()]
+    if not requested:
+        return list(allowed_columns)
+    if any(column not in allowed_columns for column in requested):
+        return None
+    return requested
+
+
+def export_search(endpoint, items_key, params, allowed_columns, name, back_endpoint):
+    """Streamed CSV/XLSX download of every result of a search"""
+    export_format = request.args.get('format', 'csv').lower()
+    columns = export_columns(request.args, allowed_columns)
+    if export_format not in EXPORT_FORMATS or columns is None:
+        return jsonify({'error': 'Formato o columnas no válidos',
+                        'formats': list(EXPORT_FORMATS), 'columns': list(allowed_columns)}), 400
+
+    # The body is generated after the view returns: resolve the token now
+    pages = iter_search_pages(endpoint, params, items_key, session.get('token'))
+    try:
+        # Fetch the first page up front so an unavailable service still gets a proper error page
+        first_page = next(pages)
+    except Exception as e:
+        app.logger.error(f"Export of {endpoint} failed: {e}")
+        flash('No fue posible generar la exportación', 'error')
+        back_args = {key: value for key, value in request.args.items() if key not in ('format', 'columns')}
+        return redirect(url_for(back_endpoint, **back_args))
+
+    all_pages = itertools.chain([first_page], pages)
+    content_type, extension = EXPORT_FORMATS[export_format]
+    if export_format == 'csv':
+        body = stream_csv(columns, all_pages)
+    else:
+        body = stream_xlsx(columns, all_pages, sheet_name=name)
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    app.logger.info("Export started", extra={'endpoint': endpoint, 'format': export_format, 'columns': len(columns)})
+    return Response(body, content_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
+
+
+@app.route('/personas/exportar')
+@login_required
+def exportar_personas():
+    return export_search('/api/consulta/search', 'personas', persona_search_params(request.args),
+                         PERSONA_EXPORT_COLUMNS, 'personas', 'consultar_personas')
+
+
+@app.route('/logs/exportar')
+@login_required
+def exportar_logs():
+    return export_search('/api/logs/search', 'logs', log_search_params(request.args),
+                         LOG_EXPORT_COLUMNS, 'logs', 'consultar_logs')
+
+
+# Dashboard chart specs: (stats key, plotly trace type, title)
+CHART_DEFINITIONS = {
+    'gender': ('por_genero', 'pie', 'Distribución por Género'),
+    'document': ('por_tipo_documento', 'bar', 'Distribución por Tipo de Documento'),
+    'age': ('por_grupo_edad', 'bar', 'Distribución por Grupo de Edad'),
+}
+CHART_CACHE_SIZE = 8
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+def stats_fingerprint(stats):
+    """Hash of a stats payload, ignoring per-response metadata such as _cache or _responseTime"""
+    payload = {key: value for key, value in stats.items() if not key.startswith('_')}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def build_chart_figure(stats, chart_type):
+    """Build the plotly figure JSON for one chart directly as a dict"""
+    stats_key, trace_type, title = CHART_DEFINITIONS[chart_type]
+    data = stats.get(stats_key) or {}
+    labels, values = list(data.keys()), list(data.values())
+    if trace_type == 'pie':
+        trace = {'type': 'pie', 'labels': labels, 'values': values}
+    else:
+        trace = {'type': 'bar', 'x': labels, 'y': values}
+    return {'data': [trace], 'layout': {'title': {'text': title}}}
+
+def build_chart_specs(stats):
+    """Return all dashboard chart figures for a stats payload, memoized by its fingerprint"""
+    fingerprint = stats_fingerprint(stats)
+    with _chart_cache_lock:
+        charts = _chart_cache.get(fingerprint)
+        if charts is not None:
+            _chart_cache.move_to_end(fingerprint)
+            metrics.inc('frontend_cache_requests_total', ('charts', 'hit'))
+            return fingerprint, charts
+
+    metrics.inc('frontend_cache_requests_total', ('charts', 'miss'))
+    charts = {chart_type: build_chart_figure(stats, chart_type) for chart_type in CHART_DEFINITIONS}
+    with _chart_cache_lock:
+        _chart_cache[fingerprint] = charts
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return fingerprint, charts
 
 @app.route('/api/chart/<chart_type>')
 @login_required
 def get_chart_data(chart_type):
     """API endpoint to generate chart data for dashboard"""
-    response = make_request('GET', '/api/consulta/stats')
-    
-    if not response or response.status_code != 200:
-        return jsonify({'error': 'No data available'}), 404
+    if chart_type not in CHART_DEFINITIONS:
+        return jsonify({'error': 'Chart type not found'}), 404
     
-    stats = response.json()
+    stats, _ = stats_cache.get('/api/consulta/stats')
     
-    if chart_type == 'gender':
-        data = list(stats.get('por_genero', {}).items())
-        fig = px.pie(
-            values=[item[1] for item in data],
-            names=[item[0] for item in data],
-            title='DistribuciÃ³n por GÃ©nero'
-        )
-        return jsonify(fig.to_json())
-    
-    elif chart_type == 'document':
-        data = list(stats.get('por_tipo_documento', {}).items())
-        fig = px.bar(
-            x=[item[0] for item in data],
-            y=[item[1] for item in data],
-            title='DistribuciÃ³n por Tipo de Documento'
-        )
-        return jsonify(fig.to_json())
-    
-    elif chart_type == 'age':
-        data = list(stats.get('por_grupo_edad', {}).items())
-        fig = px.bar(
-            x=[item[0] for item in data],
-            y=[item[1] for item in data],
-            title='DistribuciÃ³n por Grupo de Edad'
-        )
-        return jsonify(fig.to_json())
+    if stats is None:
+        return jsonify({'error': 'No data available'}), 404
     
-    return jsonify({'error': 'Chart type not found'}), 404
+    _, charts = build_chart_specs(stats)
+    return jsonify(charts[chart_type])
+
+@app.route('/media/personas/<int:size>/<filename>')
+def persona_photo(size, filename):
+    """Sized rendition of a persona photo, cached on disk and by the browser.
+
+    Public like the gateway's /uploads, so <img> tags do not need a session.
+    """
+    if size not in THUMBNAIL_SIZES or secure_filename(filename) != filename:
+        abort(404)
+
+    etag = thumbnail_cache.key_for(filename, size)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        try:
+            path, etag = thumbnail_cache.render(filename, size)
+        except FileNotFoundError:
+            abort(404)
+        except Exception as e:
+            app.logger.warning("Thumbnail could not be rendered, serving original",
+                               extra={'photo': filename, 'size': size, 'error': str(e)})
+            return redirect(f"{BROWSER_API_BASE_URL}/uploads/{filename}")
+        response = send_file(path, mimetype=thumbnail_cache.content_type, conditional=False, etag=False,
+                             max_age=THUMBNAIL_MAX_AGE_SECONDS)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = THUMBNAIL_MAX_AGE_SECONDS
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Fingerprinted static file, precompressed in the best encoding the browser accepts"""
+    variant = asset_pipeline.negotiate(filename, request.accept_encodings)
+    if variant is None:
+        abort(404)
+    path, encoding, mimetype = variant
+
+    # One strong ETag per representation: the fingerprint plus the encoding
+    etag = f"{filename}:{encoding or 'identity'}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=False, etag=False,
+                             max_age=STATIC_ASSETS_MAX_AGE_SECONDS)
+        if encoding:
+            response.content_encoding = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_ASSETS_MAX_AGE_SECONDS
+    response.cache_control.immutable = True
+    return response
+
 
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Uploads above the route's limit are rejected before their body is read"""
+    if request.endpoint == 'importar_personas':
+        return jsonify({'error': f'El archivo no puede superar los {IMPORT_MAX_BYTES // (1024 * 1024)}MB'}), 413
+    error_msg = 'La foto no puede superar los 2MB'
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'error': error_msg}), 413
+    flash(error_msg, 'error')
+    return redirect(request.url)
+
 @app.errorhandler(500)
 def internal_error(error):
     return render_template('500.html'), 500
@@ -1176,6 +4216,7 @@ def auth_callback():
         
         if response and response.status_code == 200:
             user_data = response.json()
+            rotate_session()
             session['authenticated'] = True
             session['token'] = token
             session['user'] = user_data['user']
@@ -1196,5 +4237,11 @@ def auth0_logout():
     # Render cleanup page first, then redirect to Auth0 logout
     return render_template('logout_cleanup.html', auth0_logout=True)
 
+if TEMPLATE_PRECOMPILE:
+    # Last, once every filter and global the templates use is registered
+    for template_name in app.jinja_env.list_templates(extensions=('html',)):
+        app.jinja_env.get_template(template_name)
+
 if __name__ == '__main__':
+    # Development only: production runs under gunicorn (see gunicorn.conf.py)
     app.run(host='0.0.0.0', port=5000, debug=True)
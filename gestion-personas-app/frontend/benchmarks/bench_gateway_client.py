@@ -0,0 +1,67 @@
+"""Benchmark: per-call requests.get() vs the pooled keep-alive GatewayClient.
+
+Starts the stub gateway locally and hammers /api/consulta/stats from a pool
+of threads, first with a fresh connection per call (the old make_request
+behaviour) and then through ``app.gateway_client``.
+
+Usage:
+    python benchmarks/bench_gateway_client.py --requests 2000 --threads 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_gateway import start_stub_gateway  # noqa: E402
+
+ENDPOINT = '/api/consulta/stats'
+
+
+def run(label, call, total, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(lambda _: call(), range(total)))
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for status in statuses if status != 200)
+    print(f"{label:<28} {total / elapsed:10.1f} req/s   ({elapsed:.2f}s, errors={errors})")
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_stub_gateway(latency_ms=args.latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ['API_GATEWAY_URL'] = base_url
+
+    from app import GatewayClient
+
+    client = GatewayClient(base_url, pool_maxsize=max(args.threads, 1))
+    headers = {'Cache-Control': 'no-cache, no-store, must-revalidate', 'Pragma': 'no-cache'}
+
+    def per_call():
+        return requests.get(f"{base_url}{ENDPOINT}", headers=headers, timeout=6).status_code
+
+    def pooled():
+        return client.request('GET', ENDPOINT, headers=headers).status_code
+
+    print(f"{args.requests} GET {ENDPOINT}, {args.threads} threads, stub latency {args.latency_ms}ms")
+    before = run('requests.get (no pool)', per_call, args.requests, args.threads)
+    after = run('GatewayClient (keep-alive)', pooled, args.requests, args.threads)
+    print(f"speedup: {after / before:.2f}x")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: tail latency of gateway GETs with and without hedging.
+
+Runs the same GET workload (a log search, one of HEDGE_ENDPOINTS) through
+``make_request`` against a stub gateway where a small fraction of responses
+is slow, once with hedging disabled and once enabled, and reports
+p50/p95/p99 plus how many extra upstream requests the hedges cost.
+
+Usage:
+    python benchmarks/bench_hedging.py --calls 400 --threads 8 --slow-rate 0.03 --slow-ms 400
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FRONTEND_DIR)
+
+from benchmarks.stub_gateway import start_stub_gateway  # noqa: E402
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def run(app, calls, threads):
+    def call(_):
+        started = time.perf_counter()
+        response = app.make_request('GET', '/api/logs/search', params={'limit': 20}, auth_token='bench')
+        assert response is not None and response.status_code == 200
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(call, range(calls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--slow-rate', type=float, default=0.03)
+    parser.add_argument('--slow-ms', type=float, default=400.0)
+    args = parser.parse_args()
+
+    server = start_stub_gateway(latency_ms=args.latency_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    os.environ['API_GATEWAY_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import app
+
+    print(f"{args.calls} GETs, {args.threads} threads, {args.slow_rate:.0%} of responses take {args.slow_ms:.0f} ms")
+    for label, enabled in (('no hedging', False), ('hedged', True)):
+        app.HEDGE_ENABLED = enabled
+        app.latency_tracker = app.LatencyTracker()
+        app.retry_budget = app.RetryBudget()
+        # Warm up the pool and the latency histogram
+        run(app, app.HEDGE_MIN_SAMPLES * 2, args.threads)
+        served_before = server.RequestHandlerClass.requests_served
+        samples = run(app, args.calls, args.threads)
+        upstream = server.RequestHandlerClass.requests_served - served_before
+        print(f"{label:<12} p50 {statistics.median(samples):7.1f} ms   p95 {percentile(samples, 95):7.1f} ms   "
+              f"p99 {percentile(samples, 99):7.1f} ms   upstream requests {upstream} "
+              f"(+{(upstream - args.calls) / args.calls:.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark: logging cost per upstream call on the request thread.
+
+Compares the old synchronous ``print()`` lines of make_request with the
+queue-backed structured logger, at development settings (every debug line
+kept) and production defaults (INFO, sampled debug). Each mode runs in a
+child process whose stdout is a pipe drained by the parent, as under
+Docker's log collector. ``calls/s`` is the request threads' rate;
+``written/s`` also waits for the listener to write every kept line.
+
+With every debug line kept the queue logger is not faster than print: the
+request thread still builds a LogRecord, the listener's formatting competes
+for the same GIL, and a burst larger than LOG_QUEUE_SIZE drops lines. The
+gain at production defaults comes from the INFO level and debug sampling,
+which discard the per-call lines before a record is built or queued.
+
+Usage:
+    python benchmarks/bench_logging.py --calls 20000 --threads 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'print (before)': {},
+    'queue logger, debug': {'LOG_LEVEL': 'DEBUG', 'LOG_DEBUG_SAMPLE_RATE': '1', 'LOG_REQUEST_BODIES': 'false'},
+    'queue logger, prod defaults': {'LOG_LEVEL': 'INFO', 'LOG_DEBUG_SAMPLE_RATE': '0.01', 'LOG_REQUEST_BODIES': 'false'},
+}
+
+SAMPLE_DATA = {'numero_documento': '1000000001', 'primer_nombre': 'Persona', 'apellidos': 'Prueba',
+               'correo_electronico': 'persona@example.com', 'celular': '3000000000'}
+
+
+def child(mode, calls, threads):
+    sys.path.insert(0, FRONTEND_DIR)
+    os.environ.setdefault('API_GATEWAY_URL', 'http://127.0.0.1:9')
+    import app
+
+    def old_lines():
+        url = f"{app.API_BASE_URL}/api/personas"
+        print(f"DEBUG: Making POST request to {url}")
+        print(f"DEBUG: Request data: {SAMPLE_DATA}")
+        print("DEBUG: Response status: 201")
+        print("DEBUG: Response success")
+
+    def new_lines():
+        app.app.logger.debug("Gateway response", extra={'method': 'POST', 'endpoint': '/api/personas',
+                                                        'status': 201, 'duration_ms': 4.2, 'sampled': True})
+
+    emit = old_lines if mode == 'print (before)' else new_lines
+
+    def worker(count):
+        for _ in range(count):
+            emit()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, [calls // threads] * threads))
+    elapsed = time.perf_counter() - start
+    # Until every kept line is on stdout: the listener drains the queue before stopping
+    app.log_handler.close()
+    sys.stdout.flush()
+    written = time.perf_counter() - start
+    print(json.dumps({'elapsed': elapsed, 'written': written, 'dropped': app.log_handler.dropped}),
+          file=sys.stderr)
+
+
+def run_mode(mode, calls, threads):
+    env = dict(os.environ, **MODES[mode])
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, '--calls', str(calls), '--threads', str(threads)],
+        cwd=FRONTEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    drained = {'bytes': 0}
+
+    def drain():
+        for chunk in iter(lambda: proc.stdout.read(65536), b''):
+            drained['bytes'] += len(chunk)
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    stderr = proc.stderr.read().decode()
+    proc.wait()
+    reader.join()
+    result = json.loads(stderr.strip().splitlines()[-1])
+    result['stdout_mb'] = drained['bytes'] / (1024 * 1024)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--child', default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.calls, args.threads)
+        return
+
+    print(f"{args.calls} simulated upstream calls, {args.threads} request threads")
+    for mode in MODES:
+        result = run_mode(mode, args.calls, args.threads)
+        print(f"{mode:<30} {args.calls / result['elapsed']:10.0f} calls/s   "
+              f"{args.calls / result['written']:10.0f} written/s   "
+              f"stdout {result['stdout_mb']:6.2f} MB   dropped {result['dropped']}")
+
+
+if __name__ == '__main__':
+    main()
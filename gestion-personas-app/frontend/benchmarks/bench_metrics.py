@@ -0,0 +1,83 @@
+"""Benchmark: cost of recording request and upstream metrics.
+
+Times what the metrics add to one request (the WSGI middleware
+plus the bookkeeping of one gateway call in ``make_request``) with several
+threads recording at once, a Flask request with and without the metrics
+middleware, and the cost of a /metrics scrape.
+
+Usage:
+    python benchmarks/bench_metrics.py --requests 200000 --threads 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.test import EnvironBuilder
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FRONTEND_DIR)
+
+
+def record_requests(app, count):
+    """What METRICS_ENABLED adds to ``count`` requests that each make one gateway call"""
+    metrics = app.metrics
+    middleware = app.RequestMetricsMiddleware(lambda environ, start_response: start_response('200 OK', []) or [b''])
+    environ = EnvironBuilder(path='/dashboard').get_environ()
+    start = time.perf_counter()
+    for _ in range(count):
+        # The upstream bookkeeping of make_request around one gateway call
+        upstream = app.endpoint_key('/api/consulta/dashboard/stats')
+        metrics.add('frontend_upstream_requests_in_flight', (upstream,))
+        metrics.add('frontend_upstream_requests_in_flight', (upstream,), -1)
+        metrics.inc('frontend_upstream_requests_total', (upstream, 'GET', '200'))
+        metrics.observe('frontend_upstream_request_duration_seconds', (upstream, 'GET'), 0.012)
+        middleware(environ, lambda status, headers, exc_info=None: None)
+    return time.perf_counter() - start
+
+
+def flask_requests(wsgi_app, count):
+    """Seconds to serve ``count`` GET /health through ``wsgi_app``"""
+    environ = EnvironBuilder(path='/health').get_environ()
+    start = time.perf_counter()
+    for _ in range(count):
+        b''.join(wsgi_app(dict(environ), lambda status, headers, exc_info=None: None))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault('API_GATEWAY_URL', 'http://127.0.0.1:9')
+    import app
+
+    per_thread = args.requests // args.threads
+    for threads in sorted({1, args.threads}):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda _: record_requests(app, per_thread), range(threads)))
+            wall = time.perf_counter() - start
+        recorded = per_thread * threads
+        print(f"recording, {threads} thread(s): {wall / recorded * 1e6:6.2f} us per request "
+              f"({recorded / wall:.0f} requests/s)")
+
+    # The same Flask request with and without the middleware; best of 5 to cut noise
+    count = min(args.requests, 20000)
+    plain = min(flask_requests(app.app.wsgi_app.wsgi_app, count) for _ in range(5)) / count
+    measured = min(flask_requests(app.app.wsgi_app, count) for _ in range(5)) / count
+    print(f"GET /health: {plain * 1e6:.1f} us without metrics, {measured * 1e6:.1f} us with "
+          f"(+{(measured - plain) * 1e6:.1f} us)")
+
+    scrapes = 50
+    start = time.perf_counter()
+    for _ in range(scrapes):
+        text = app.metrics.render(app.metrics.collect())
+    print(f"scrape: {(time.perf_counter() - start) / scrapes * 1000:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == '__main__':
+    main()
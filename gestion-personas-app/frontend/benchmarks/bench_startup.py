@@ -0,0 +1,80 @@
+"""Benchmark: cold import time and RSS of one frontend worker.
+
+Imports ``app`` in fresh interpreters (what each preforked worker or
+container restart pays) and reports the median import time, the peak RSS
+and the heaviest modules that got loaded. Exit status is 1 when a budget
+is exceeded, so it can run in CI to catch startup regressions.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 800 --max-rss-mb 80
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in ('pandas', 'numpy', 'PIL') if name in sys.modules)
+print(json.dumps({
+    'import_ms': elapsed * 1000,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'heavy_modules': heavy,
+}))
+'''
+
+
+def measure_once():
+    env = dict(os.environ, API_GATEWAY_URL=os.getenv('API_GATEWAY_URL', 'http://127.0.0.1:9'))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=FRONTEND_DIR, env=env,
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=None)
+    parser.add_argument('--max-rss-mb', type=float, default=None)
+    parser.add_argument('--json', action='store_true', help='print the result as JSON')
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    result = {
+        'runs': args.runs,
+        'import_ms_median': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'import_ms_max': round(max(s['import_ms'] for s in samples), 1),
+        'max_rss_mb_median': round(statistics.median(s['max_rss_mb'] for s in samples), 1),
+        'modules': samples[-1]['modules'],
+        'heavy_modules': samples[-1]['heavy_modules'],
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"import app: {result['import_ms_median']} ms median ({result['import_ms_max']} ms max, {args.runs} runs)")
+        print(f"peak RSS:   {result['max_rss_mb_median']} MB per worker")
+        print(f"modules:    {result['modules']} loaded, heavy: {', '.join(result['heavy_modules']) or 'none'}")
+
+    failed = False
+    if args.max_import_ms is not None and result['import_ms_median'] > args.max_import_ms:
+        print(f"FAIL: import time above budget of {args.max_import_ms} ms", file=sys.stderr)
+        failed = True
+    if args.max_rss_mb is not None and result['max_rss_mb_median'] > args.max_rss_mb:
+        print(f"FAIL: RSS above budget of {args.max_rss_mb} MB", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark: template compilation and per-request render time.
+
+Times what a cold worker spends compiling every template from source
+against loading them from the Jinja bytecode cache, and the render time of
+the dashboard, logs and personas pages with and without the fragment cache
+(the same data on every render, as between two stats refreshes).
+
+Usage:
+    python benchmarks/bench_templates.py --renders 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FRONTEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_gateway import STATS, make_log, make_persona  # noqa: E402
+
+LOG_STATS = {
+    'total_logs': 3000,
+    'por_tipo': {'CREATE': 400, 'READ': 1800, 'UPDATE': 300, 'DELETE': 100, 'SEARCH': 400},
+    'por_estado': {'success': 2850, 'error': 100, 'not_found': 50},
+}
+
+PAGES = {
+    'dashboard': ('/dashboard', 'dashboard.html', lambda app: {
+        'stats': STATS, 'user': {'username': 'bench'}, 'stats_version': app.stats_fingerprint(STATS)}),
+    'logs': ('/logs?show_stats=true&transaction_type=CREATE', 'consultar_logs.html', lambda app: {
+        'logs': [make_log(i) for i in range(20)], 'stats': LOG_STATS,
+        'stats_version': app.stats_fingerprint(LOG_STATS)}),
+    'personas': ('/personas/consultar?genero=Femenino', 'consultar_personas.html', lambda app: {
+        'personas': [make_persona(i) for i in range(10)], 'next_cursor': '10', 'total_results': None}),
+}
+
+
+def compile_all(app, bytecode_cache):
+    """Seconds to load every template into a fresh environment (as a new worker would)"""
+    env = app.app.jinja_env.overlay(cache_size=400)
+    env.bytecode_cache = bytecode_cache
+    start = time.perf_counter()
+    for name in env.list_templates(extensions=('html',)):
+        env.get_template(name)
+    return time.perf_counter() - start
+
+
+def render_time(app, page, renders):
+    """Seconds per render of one page inside a request context"""
+    path, template, context = PAGES[page]
+    values = context(app)
+    with app.app.test_request_context(path):
+        app.session['user'] = {'username': 'bench'}
+        app.render_template(template, **values)
+        start = time.perf_counter()
+        for _ in range(renders):
+            app.render_template(template, **values)
+        return (time.perf_counter() - start) / renders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('API_GATEWAY_URL', 'http://127.0.0.1:9')
+    os.environ.setdefault('SESSION_FILE_DIR', tempfile.mkdtemp())
+    import app
+    from jinja2 import FileSystemBytecodeCache
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FileSystemBytecodeCache(directory)
+        source = min(compile_all(app, None) for _ in range(5))
+        compile_all(app, cache)
+        cached = min(compile_all(app, cache) for _ in range(5))
+    print(f"cold worker, all templates: {source * 1000:.1f} ms from source, "
+          f"{cached * 1000:.1f} ms from bytecode cache")
+
+    # Alternate uncached and cached rounds so machine noise hits both alike; best of 5 each
+    fragments = app.fragment_cache
+    max_entries = fragments.max_entries
+    for page in PAGES:
+        plain, cached = [], []
+        for _ in range(5):
+            fragments.max_entries = 0
+            plain.append(render_time(app, page, args.renders))
+            fragments.max_entries = max_entries
+            cached.append(render_time(app, page, args.renders))
+        plain, cached = min(plain), min(cached)
+        print(f"{page:>9}: {plain * 1e6:7.1f} us per render without fragments, {cached * 1e6:7.1f} us with "
+              f"({(plain - cached) * 1e6:+.1f} us saved)")
+    print(fragments.status())
+
+
+if __name__ == '__main__':
+    main()
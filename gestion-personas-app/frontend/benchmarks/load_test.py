@@ -0,0 +1,340 @@
+"""Benchmark: load test of the key frontend flows against the stub gateway.
+
+Starts the stub gateway (configurable latency, error rate and payload
+sizes) and the frontend under gunicorn with gunicorn.conf.py, each in its
+own process. Virtual users then log in and run a weighted mix of flows
+at a fixed concurrency:
+
+- login
+- dashboard (charts are rendered into the page)
+- dashboard stats polling
+- consultar_personas search
+- crear_persona with a photo
+- consultar_logs
+
+The report gives, per flow, the throughput, the p50/p95/p99 latency and
+the error count, plus the RSS of the gunicorn workers. With ``--output``
+the results are written as JSON. With ``--baseline`` they are compared
+with an earlier run.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 16 --duration 30 --latency-ms 20 \\
+        --error-rate 0.01 --item-bytes 512 --output results.json
+    python benchmarks/load_test.py --duration 30 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+import requests
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = 'login=1,dashboard=3,stats_poll=6,search=4,create=1,logs=2'
+
+PERSONA_FORM = {
+    'tipo_documento': 'Cédula',
+    'primer_nombre': 'Carga',
+    'apellidos': 'Prueba',
+    'fecha_nacimiento': '1990-05-17',
+    'genero': 'Femenino',
+    'correo_electronico': 'carga@example.com',
+    'celular': '3001234567',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def make_photo(pixels):
+    """A JPEG upload like a phone photo, ``pixels`` wide"""
+    from PIL import Image
+
+    output = BytesIO()
+    Image.linear_gradient('L').resize((pixels, pixels * 3 // 4)).convert('RGB').save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+
+class VirtualUser:
+    """One browser session running flows; each flow returns the status that failed it, or None"""
+
+    def __init__(self, base_url, photo):
+        self.base_url = base_url
+        self.photo = photo
+        self.http = requests.Session()
+
+    def get(self, path, expected=(200,), **kwargs):
+        response = self.http.get(self.base_url + path, allow_redirects=False, timeout=30, **kwargs)
+        response.content
+        return None if response.status_code in expected else response.status_code
+
+    def login(self):
+        self.http = requests.Session()
+        response = self.http.post(self.base_url + '/login', allow_redirects=False, timeout=30, data={
+            'login_method': 'local', 'username': 'bench', 'password': 'bench-password'})
+        return None if response.status_code == 302 and 'dashboard' in response.headers.get('Location', '') \
+            else response.status_code
+
+    def dashboard(self):
+        return self.get('/dashboard')
+
+    def stats_poll(self):
+        return self.get('/api/dashboard/stats')
+
+    def search(self):
+        return self.get('/personas/consultar', params={'tipo_documento': 'Cédula', 'genero': 'Todos'})
+
+    def create(self):
+        form = dict(PERSONA_FORM, numero_documento=str(random.randint(10 ** 9, 2 * 10 ** 9)))
+        response = self.http.post(self.base_url + '/personas/crear', data=form, timeout=30,
+                                  files={'foto': ('foto.jpg', self.photo, 'image/jpeg')},
+                                  headers={'X-Requested-With': 'XMLHttpRequest'})
+        return None if response.status_code == 201 else response.status_code
+
+    def logs(self):
+        return self.get('/logs', params={'transaction_type': 'SEARCH', 'show_stats': '1'})
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields after it are space separated
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler(threading.Thread):
+    """Samples the RSS of every gunicorn worker while the load runs"""
+
+    def __init__(self, master_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peak_per_worker = 0.0
+        self.peak_total = 0.0
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            values = [value for value in map(rss_mb, worker_pids(self.master_pid)) if value is not None]
+            if values:
+                self.peak_per_worker = max(self.peak_per_worker, max(values))
+                self.peak_total = max(self.peak_total, sum(values))
+                self.samples.append(sum(values) / len(values))
+
+    def summary(self):
+        return {
+            'peak_worker_mb': round(self.peak_per_worker, 1),
+            'mean_worker_mb': round(sum(self.samples) / len(self.samples), 1) if self.samples else None,
+            'peak_total_mb': round(self.peak_total, 1),
+        }
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def parse_mix(raw):
+    mix = {}
+    for part in raw.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(VirtualUser, name.strip()):
+            raise SystemExit(f"unknown flow in --mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_load(base_url, args, photo):
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    records = []
+    records_lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration
+
+    def virtual_user(index):
+        rng = random.Random(args.seed + index)
+        user = VirtualUser(base_url, photo)
+        local = []
+        user.login()
+        while time.monotonic() < stop_at:
+            flow = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                failure = getattr(user, flow)()
+            except requests.RequestException as e:
+                failure = type(e).__name__
+            local.append((flow, time.perf_counter() - started, failure))
+        with records_lock:
+            records.extend(local)
+
+    threads = [threading.Thread(target=virtual_user, args=(index,)) for index in range(args.concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records, time.monotonic() - started
+
+
+def summarize(records, elapsed):
+    def stats(rows):
+        durations = [duration * 1000 for _, duration, _ in rows]
+        failures = {}
+        for _, _, failure in rows:
+            if failure is not None:
+                failures[str(failure)] = failures.get(str(failure), 0) + 1
+        return {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / elapsed, 1),
+            'p50_ms': round(percentile(durations, 50), 1),
+            'p95_ms': round(percentile(durations, 95), 1),
+            'p99_ms': round(percentile(durations, 99), 1),
+            'max_ms': round(max(durations), 1),
+            'errors': sum(failures.values()),
+            'error_statuses': failures,
+        }
+
+    flows = {}
+    for record in records:
+        flows.setdefault(record[0], []).append(record)
+    return {name: stats(rows) for name, rows in sorted(flows.items())}, stats(records) if records else {}
+
+
+def print_report(result, baseline=None):
+    header = f"{'flow':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    print(header)
+    print('-' * len(header))
+    rows = dict(result['flows'], total=result['total'])
+    for name, row in rows.items():
+        line = (f"{name:<12} {row['throughput_rps']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+                f"{row['p99_ms']:>8} {row['errors']:>7}")
+        before = baseline and (baseline['total'] if name == 'total' else baseline['flows'].get(name))
+        if before:
+            line += (f"   vs baseline: req/s {row['throughput_rps'] - before['throughput_rps']:+.1f}, "
+                     f"p95 {row['p95_ms'] - before['p95_ms']:+.1f} ms")
+        print(line)
+    rss = result['rss']
+    print(f"worker RSS: peak {rss['peak_worker_mb']} MB, mean {rss['mean_worker_mb']} MB, "
+          f"all workers peak {rss['peak_total_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=16, help='virtual users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='flow weights, e.g. ' + DEFAULT_MIX)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='stub gateway latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of gateway calls failing with 503')
+    parser.add_argument('--item-bytes', type=int, default=0, help='padding per search result row')
+    parser.add_argument('--photo-px', type=int, default=1200, help='width of the uploaded photo')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='frontend-load-')
+    gateway_port, frontend_port = free_port(), free_port()
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(FRONTEND_DIR, 'benchmarks', 'stub_gateway.py'), '--port', str(gateway_port),
+         '--latency-ms', str(args.latency_ms), '--error-rate', str(args.error_rate), '--item-bytes', str(args.item_bytes)],
+        stdout=subprocess.DEVNULL)
+    env = dict(
+        os.environ,
+        API_GATEWAY_URL=f'http://127.0.0.1:{gateway_port}',
+        GUNICORN_BIND=f'127.0.0.1:{frontend_port}',
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_ACCESS_LOG='/dev/null',
+        LOG_LEVEL='WARNING',
+        SESSION_TYPE='filesystem',
+        SESSION_FILE_DIR=os.path.join(workdir, 'sessions'),
+        THUMBNAIL_CACHE_DIR=os.path.join(workdir, 'thumbnails'),
+    )
+    frontend = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                cwd=FRONTEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{frontend_port}'
+    try:
+        wait_until_up(f'http://127.0.0.1:{gateway_port}/health')
+        wait_until_up(f'{base_url}/health')
+        sampler = RssSampler(frontend.pid)
+        sampler.start()
+        records, elapsed = run_load(base_url, args, make_photo(args.photo_px))
+        sampler.stopped.set()
+        sampler.join()
+    finally:
+        frontend.terminate()
+        stub.terminate()
+        frontend.wait(timeout=30)
+        stub.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    flows, total = summarize(records, elapsed)
+    result = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'environment': {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()},
+        'elapsed_seconds': round(elapsed, 2),
+        'flows': flows,
+        'total': total,
+        'rss': sampler.summary(),
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""Local stand-in for the API gateway used by the frontend benchmarks.
+
+Serves canned JSON for the gateway routes the Flask frontend calls, over
+HTTP/1.1 with keep-alive, so benchmarks can run without Docker, Postgres or
+the Node services.
+
+Usage:
+    python benchmarks/stub_gateway.py --port 8099 --latency-ms 5 --slow-rate 0.02 --slow-ms 500 \
+        --error-rate 0.01 --item-bytes 512
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STATS = {
+    'total_personas': 1250,
+    'por_genero': {'Masculino': 610, 'Femenino': 590, 'No binario': 30, 'Prefiero no reportar': 20},
+    'por_tipo_documento': {'Cédula': 1000, 'Tarjeta de identidad': 250},
+    'por_grupo_edad': {'Menor de edad': 250, '18-30': 400, '31-50': 420, 'Mayor de 50': 180},
+    'estadisticas_edad': {'minima': 7, 'maxima': 88, 'promedio': 34.2},
+    'persona_mas_joven': {'primer_nombre': 'Ana', 'segundo_nombre': None, 'apellidos': 'Pérez',
+                          'fecha_nacimiento': '2018-03-02', 'edad': 7},
+}
+
+
+_upload_image = None
+
+
+def upload_image():
+    """A 300x300 JPEG like the ones the personas service stores"""
+    global _upload_image
+    if _upload_image is None:
+        from io import BytesIO
+        from PIL import Image
+
+        output = BytesIO()
+        Image.linear_gradient('L').resize((300, 300)).convert('RGB').save(output, format='JPEG', quality=80)
+        _upload_image = output.getvalue()
+    return _upload_image
+
+
+def make_persona(index):
+    return {
+        'id': index,
+        'numero_documento': str(1000000000 + index),
+        'tipo_documento': 'Cédula',
+        'primer_nombre': 'Persona',
+        'segundo_nombre': None,
+        'apellidos': f'Prueba {index}',
+        'fecha_nacimiento': '1990-01-01',
+        'genero': 'Femenino' if index % 2 else 'Masculino',
+        'correo_electronico': f'persona{index}@example.com',
+        'celular': '3000000000',
+        'foto_url': None,
+        'edad': 35,
+        'created_at': '2025-01-01T00:00:00.000Z',
+        'updated_at': '2025-01-01T00:00:00.000Z',
+    }
+
+
+# Every stub persona has the same updated_at (see make_persona)
+PERSONA_ETAG = 'W/"persona-1-1735689600000"'
+PERSONA_LAST_MODIFIED = 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+LOG_COUNT = 3000
+
+
+def make_log(index):
+    return {
+        'id': index,
+        'transaction_type': 'SEARCH',
+        'entity_type': 'PERSONA',
+        'entity_id': None,
+        'numero_documento': None,
+        'user_id': 1,
+        'ip_address': '172.18.0.5',
+        'user_agent': 'python-requests/2.31.0',
+        'request_data': {'limit': '25', 'tipo_documento': 'Cédula'},
+        'response_data': {'count': 25},
+        'status': 'SUCCESS',
+        'error_message': None,
+        'created_at': '2025-01-01T00:00:00.000Z',
+    }
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    # Tail latency: this fraction of requests takes slow_latency instead
+    slow_rate = 0.0
+    slow_latency = 0.0
+    # This fraction of API requests fails with 503, as when a service is down
+    error_rate = 0.0
+    # Extra text added to every search result row, to vary payload sizes
+    item_padding = ''
+    requests_served = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self._send_trace_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self._send_trace_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_trace_headers(self):
+        # Like the real gateway: echo the trace id and report time spent as Server-Timing
+        if self.headers.get('X-Trace-Id'):
+            self.send_header('X-Trace-Id', self.headers['X-Trace-Id'])
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        self.send_header('Server-Timing', f'gateway;dur={elapsed_ms:.1f}')
+
+    def _read_body(self):
+        # Discard the body in chunks so large uploads do not inflate the stub's memory
+        remaining = int(self.headers.get('Content-Length') or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+    def _route(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/api/auth/login':
+            return {'token': 'bench-token', 'user': {'id': 1, 'username': 'bench', 'email': 'bench@example.com'}}, 200
+        if path in ('/api/consulta/stats', '/api/consulta/dashboard/stats'):
+            return STATS, 200
+        if path == '/api/consulta/search':
+            return self._search('personas', STATS['total_personas'], make_persona), 200
+        if path.rstrip('/') == '/api/personas':
+            return {'message': 'Persona creada exitosamente', 'persona': make_persona(1)}, 200
+        if path == '/api/consulta/cache/invalidate-stats':
+            return {'message': 'Stats cache invalidated successfully'}, 200
+        if path.startswith('/api/consulta/persona/'):
+            # Like consulta: the persona plus where its cache found it
+            return dict(make_persona(1), _cache=True, _cacheTier='l1', _responseTime=0), 200
+        if path.startswith('/api/personas/'):
+            return make_persona(1), 200
+        if path == '/api/logs/search':
+            return self._search('logs', LOG_COUNT, make_log), 200
+        if path == '/api/logs/stats':
+            return {'total_transactions': 0, 'by_transaction_type': {}, 'by_status': {}}, 200
+        if path == '/health':
+            return {'status': 'OK'}, 200
+        return {'error': 'Route not found'}, 404
+
+    def _search(self, items_key, total, make_item):
+        """Keyset-style pages over ``total`` rows; the cursor is an opaque offset"""
+        query = parse_qs(urlsplit(self.path).query)
+        limit = int(query.get('limit', ['10'])[0])
+        start = int(query.get('cursor', ['0'])[0] or 0)
+        end = min(start + limit, total)
+        items = [make_item(i) for i in range(start, end)]
+        if self.item_padding:
+            for item in items:
+                item['notas'] = self.item_padding
+        pagination = {'limit': limit, 'has_more': end < total, 'next_cursor': str(end) if end < total else None}
+        if query.get('include_total') == ['true']:
+            pagination.update(total=total, totalPages=-(-total // limit))
+        return {items_key: items, 'pagination': pagination}
+
+    def _handle(self, created=False):
+        self.started = time.perf_counter()
+        self._read_body()
+        type(self).requests_served += 1
+        if self.slow_rate and random.random() < self.slow_rate:
+            time.sleep(self.slow_latency)
+        elif self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self.path != '/health' and random.random() < self.error_rate:
+            return self._send_json({'error': 'Service unavailable'}, 503)
+        if self.path.startswith('/uploads/'):
+            if self.path.startswith('/uploads/missing'):
+                return self._send_json({'error': 'Not found'}, 404)
+            return self._send_bytes(upload_image(), 'image/jpeg')
+        payload, status = self._route()
+        if created and status == 200:
+            status = 201
+        if self.command == 'GET' and status == 200 and self._is_persona_lookup():
+            # Like the personas/consulta services: validators from updated_at, 304 when unchanged
+            if self.headers.get('If-None-Match') == PERSONA_ETAG:
+                self.send_response(304)
+                self.send_header('ETag', PERSONA_ETAG)
+                self.send_header('Content-Length', '0')
+                self._send_trace_headers()
+                self.end_headers()
+                return
+            return self._send_json(payload, status, {'ETag': PERSONA_ETAG, 'Last-Modified': PERSONA_LAST_MODIFIED,
+                                                     'Cache-Control': 'private, no-cache'})
+        self._send_json(payload, status)
+
+    def _is_persona_lookup(self):
+        path = self.path.split('?', 1)[0]
+        return path.startswith('/api/consulta/persona/') or (
+            path.startswith('/api/personas/') and path.rstrip('/') != '/api/personas')
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle(created=self.path.rstrip('/') == '/api/personas')
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+
+def start_stub_gateway(port=0, latency_ms=0.0, slow_rate=0.0, slow_ms=0.0, error_rate=0.0, item_bytes=0):
+    """Start the stub in a daemon thread and return the server (``server.server_port``).
+
+    ``server.RequestHandlerClass.requests_served`` counts the requests it answered.
+    """
+    handler = type('ConfiguredStubGatewayHandler', (StubGatewayHandler,), {
+        'latency': latency_ms / 1000.0, 'slow_rate': slow_rate, 'slow_latency': slow_ms / 1000.0,
+        'error_rate': error_rate, 'item_padding': 'x' * item_bytes,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub API gateway for frontend benchmarks')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='fraction of requests that are slow')
+    parser.add_argument('--slow-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of API requests answered with 503')
+    parser.add_argument('--item-bytes', type=int, default=0, help='padding added to every search result row')
+    args = parser.parse_args()
+
+    server = start_stub_gateway(args.port, args.latency_ms, args.slow_rate, args.slow_ms,
+                                args.error_rate, args.item_bytes)
+    print(f"Stub gateway listening on http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Local stand-in for a trace collector.
+
+Accepts the batches the frontend exports with ``TRACE_EXPORT=http://...``
+(``POST /traces`` with ``{"traces": [...]}``), keeps them in memory and
+serves a per-endpoint, per-hop latency summary at ``GET /summary``.
+
+Usage:
+    python benchmarks/trace_collector.py --port 9411
+    TRACE_EXPORT=http://127.0.0.1:9411/traces gunicorn -c gunicorn.conf.py app:app
+    curl http://127.0.0.1:9411/summary
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def summarize(traces):
+    """{endpoint: {hop: {count, p50_ms, p95_ms}}} where hops are the request, its spans and upstream Server-Timing"""
+    durations = {}
+    for trace in traces:
+        hops = durations.setdefault(trace.get('endpoint') or 'unmatched', {})
+        hops.setdefault('request', []).append(trace['duration_ms'])
+        for span in trace['spans']:
+            hops.setdefault(f"{span['kind']} {span['name']}", []).append(span['duration_ms'])
+            for name, duration in (span.get('server_timing') or {}).items():
+                hops.setdefault(f"hop {name}", []).append(duration)
+    return {
+        endpoint: {
+            hop: {'count': len(samples), 'p50_ms': percentile(samples, 50), 'p95_ms': percentile(samples, 95)}
+            for hop, samples in hops.items()
+        }
+        for endpoint, hops in durations.items()
+    }
+
+
+class TraceCollectorHandler(BaseHTTPRequestHandler):
+    traces = []
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            traces = json.loads(body)['traces']
+        except (ValueError, KeyError):
+            return self._send_json({'error': 'expected {"traces": [...]}'}, 400)
+        with self.lock:
+            self.traces.extend(traces)
+        self._send_json({'received': len(traces)})
+
+    def do_GET(self):
+        with self.lock:
+            traces = list(self.traces)
+        if self.path.startswith('/summary'):
+            return self._send_json(summarize(traces))
+        if self.path.startswith('/traces'):
+            return self._send_json({'traces': traces[-100:]})
+        self._send_json({'error': 'Route not found'}, 404)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trace collector stand-in for the frontend')
+    parser.add_argument('--port', type=int, default=9411)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), TraceCollectorHandler)
+    print(f"Trace collector listening on http://127.0.0.1:{args.port} (POST /traces, GET /summary)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
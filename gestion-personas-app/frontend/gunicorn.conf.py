@@ -0,0 +1,76 @@
+"""Gunicorn configuration for the production frontend container.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be tuned through environment variables. The Werkzeug
+debug server (``python app.py``) is only used by Dockerfile.dev.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Preforked workers, each with a thread pool: the frontend mostly waits on the
+# gateway, and live dashboard streams (/api/dashboard/stream) hold a thread each
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Each open live dashboard (/api/dashboard/stream) holds one of those threads for
+# as long as the tab stays open. Streams are capped per worker so two threads are
+# always left for every other request; past the cap the stream answers 503 and
+# the dashboard falls back to polling /api/dashboard/stats. Exported before the
+# app is imported so app.py uses the same value.
+sse_max_clients = int(os.getenv('SSE_MAX_CLIENTS') or max(threads - 2, 0))
+os.environ['SSE_MAX_CLIENTS'] = str(sse_max_clients)
+
+# Import the app once in the master so workers share its modules copy-on-write.
+# Connection pools and thread pools in app.py are created lazily per worker pid.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers after N requests (with jitter so they do not restart together)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# Graceful restarts: on SIGHUP/SIGTERM workers get this long to finish in-flight requests
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '20'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    server.log.info(f"Frontend worker {worker.pid} started")
+
+
+# With METRICS_DIR set, workers write their metrics there and /metrics sums them
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+
+
+def on_starting(server):
+    if sse_max_clients > threads - 2:
+        server.log.warning(f"SSE_MAX_CLIENTS={sse_max_clients} leaves fewer than 2 of {threads} threads "
+                           "per worker for requests other than dashboard streams")
+    # Snapshots of a previous run would be added to the new counters
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        for name in os.listdir(METRICS_DIR):
+            if name.endswith('.json'):
+                os.remove(os.path.join(METRICS_DIR, name))
+
+
+def worker_exit(server, worker):
+    if METRICS_DIR:
+        from app import metrics
+        metrics.flush()
+
+
+def child_exit(server, worker):
+    # Recycled workers (max_requests) keep contributing their counters
+    if METRICS_DIR:
+        from app import metrics
+        metrics.archive(worker.pid)
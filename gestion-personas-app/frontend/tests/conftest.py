@@ -0,0 +1,33 @@
+"""Shared test setup: the frontend importable as ``app``, with the stub gateway from benchmarks/."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [FRONTEND_DIR, os.path.join(FRONTEND_DIR, 'benchmarks')]
+# Read when app is imported: no real gateway, sessions in a throwaway directory
+os.environ.setdefault('API_GATEWAY_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SESSION_FILE_DIR', tempfile.mkdtemp())
+
+from stub_gateway import start_stub_gateway  # noqa: E402
+
+import app as frontend  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def gateway():
+    """Stub gateway the frontend's gateway client points at"""
+    server = start_stub_gateway()
+    frontend.gateway_client.base_url = f'http://127.0.0.1:{server.server_port}'
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope='module')
+def client(gateway):
+    """Test client logged in through the local login form"""
+    client = frontend.app.test_client()
+    client.post('/login', data={'login_method': 'local', 'username': 'test', 'password': 'test'})
+    return client
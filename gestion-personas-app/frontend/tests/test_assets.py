@@ -0,0 +1,105 @@
+"""Static asset pipeline: content fingerprints and precompressed variants."""
+import gzip
+import json
+import os
+
+import pytest
+from werkzeug.datastructures import Accept
+
+import app as frontend
+
+STYLE = b'body { color: #333; }\n' * 50
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    # gzip only, so the variants don't depend on whether Brotli is installed
+    gzip_only = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    monkeypatch.setattr(frontend.AssetPipeline, 'compressors', staticmethod(lambda: gzip_only))
+    source = tmp_path / 'static'
+    (source / 'css').mkdir(parents=True)
+    (source / 'css' / 'style.css').write_bytes(STYLE)
+    (source / 'img.png').write_bytes(b'\x89PNG' + bytes(range(256)) * 4)
+    (source / '.hidden').write_bytes(b'x')
+    return frontend.AssetPipeline(str(source), str(tmp_path / 'assets'))
+
+
+def test_build_names_files_by_content_hash(pipeline):
+    manifest = pipeline.build()
+
+    assert set(manifest) == {'css/style.css', 'img.png'}
+    style = manifest['css/style.css']
+    assert style.startswith('css/style.') and style.endswith('.css')
+    path = os.path.join(pipeline.directory, *style.split('/'))
+    with open(path, 'rb') as f:
+        assert f.read() == STYLE
+    with open(os.path.join(pipeline.directory, 'manifest.json')) as f:
+        assert json.load(f) == manifest
+
+
+def test_editing_a_file_changes_its_url(pipeline):
+    before = pipeline.build()['css/style.css']
+    with open(os.path.join(pipeline.source_dir, 'css', 'style.css'), 'ab') as f:
+        f.write(b'a { color: red; }\n')
+
+    assert pipeline.build()['css/style.css'] != before
+
+
+def test_text_formats_get_a_gzip_variant(pipeline):
+    manifest = pipeline.build()
+    mimetype, variants = pipeline.assets[manifest['css/style.css']]
+
+    assert mimetype == 'text/css'
+    with open(variants['gzip'], 'rb') as f:
+        assert gzip.decompress(f.read()) == STYLE
+    # Images are already compressed
+    assert set(pipeline.assets[manifest['img.png']][1]) == {'identity'}
+
+
+def test_variant_that_saves_too_little_is_not_written(pipeline):
+    with open(os.path.join(pipeline.source_dir, 'tiny.js'), 'wb') as f:
+        f.write(b'x()')
+    manifest = pipeline.build()
+
+    assert set(pipeline.assets[manifest['tiny.js']][1]) == {'identity'}
+
+
+def test_rebuild_reuses_the_files_already_written(pipeline, monkeypatch):
+    pipeline.build()
+    monkeypatch.setattr(frontend.AssetPipeline, 'compressors', staticmethod(
+        lambda: [('gzip', '.gz', lambda data: pytest.fail('compressed again'))]))
+
+    manifest = pipeline.build()
+
+    assert 'gzip' in pipeline.assets[manifest['css/style.css']][1]
+
+
+def test_negotiate_prefers_the_accepted_encoding(pipeline):
+    hashed = pipeline.build()['css/style.css']
+
+    assert pipeline.negotiate(hashed, Accept([('gzip', 1)]))[1] == 'gzip'
+    assert pipeline.negotiate(hashed, Accept([('gzip', 0)]))[1] is None
+    assert pipeline.negotiate(hashed, Accept())[1] is None
+    assert pipeline.negotiate('css/style.000000000000.css', Accept()) is None
+
+
+def test_route_serves_immutable_precompressed_assets(pipeline, monkeypatch):
+    hashed = pipeline.build()['css/style.css']
+    monkeypatch.setattr(frontend, 'asset_pipeline', pipeline)
+    client = frontend.app.test_client()
+
+    response = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.content_encoding == 'gzip'
+    assert gzip.decompress(response.data) == STYLE
+    assert 'Accept-Encoding' in response.vary
+    assert response.cache_control.immutable
+
+    revalidated = client.get(f'/assets/{hashed}', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    # The identity representation has its own ETag
+    plain = client.get(f'/assets/{hashed}', headers={'If-None-Match': response.headers['ETag']})
+    assert plain.status_code == 200 and plain.data == STYLE
+
+    assert client.get('/assets/css/missing.css').status_code == 404
@@ -0,0 +1,133 @@
+"""Circuit breakers per upstream and the stale-response fallback of make_request."""
+import time
+
+import pytest
+import requests
+
+import app as frontend
+
+
+def response(status, body=b'{}'):
+    result = requests.Response()
+    result.status_code = status
+    result._content = body
+    result.headers['Content-Type'] = 'application/json'
+    return result
+
+
+def test_breaker_opens_probes_once_and_closes():
+    breaker = frontend.CircuitBreaker('/api/consulta', failure_threshold=3, recovery_seconds=0.05)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+
+    assert breaker.state == 'closed'
+    assert breaker.status()['consecutive_failures'] == 0
+    assert breaker.status()['short_circuited'] == 2
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = frontend.CircuitBreaker('/api/consulta', failure_threshold=1, recovery_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.status()['times_opened'] == 2
+
+
+def test_success_resets_the_failure_count():
+    breaker = frontend.CircuitBreaker('/api/consulta', failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == 'closed'
+
+
+def test_breakers_are_per_upstream_prefix():
+    registry = frontend.CircuitBreakerRegistry()
+
+    assert registry.for_endpoint('/api/consulta/persona/1') is registry.for_endpoint('/api/consulta/stats')
+    assert registry.for_endpoint('/api/consulta/stats') is not registry.for_endpoint('/api/logs/stats')
+
+
+class FakeGateway:
+    """Answers gateway requests from ``answers`` (responses or exceptions to raise)"""
+
+    def __init__(self):
+        self.answers = []
+        self.sent = []
+
+    def request(self, method, endpoint, **kwargs):
+        self.sent.append(endpoint)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fresh breakers and caches in front of a FakeGateway"""
+    monkeypatch.setattr(frontend, 'circuit_breakers', frontend.CircuitBreakerRegistry())
+    monkeypatch.setattr(frontend, 'stale_responses', frontend.StaleResponseCache())
+    monkeypatch.setattr(frontend, 'response_cache', frontend.ConditionalResponseCache())
+    gateway = FakeGateway()
+    monkeypatch.setattr(frontend.gateway_client, 'request', gateway.request)
+    return gateway
+
+
+def test_failing_upstream_serves_the_last_good_response(upstream):
+    upstream.answers.append(response(200, b'{"total_personas": 4}'))
+    assert frontend.make_request('GET', '/api/consulta/stats', auth_token='t').json() == {'total_personas': 4}
+
+    upstream.answers.append(requests.exceptions.ConnectionError('refused'))
+    stale = frontend.make_request('GET', '/api/consulta/stats', auth_token='t')
+    assert stale.json() == {'total_personas': 4}
+    assert stale.headers['X-Frontend-Stale'] == 'true'
+
+    upstream.answers.append(response(503))
+    assert frontend.make_request('GET', '/api/consulta/stats', auth_token='t').headers['X-Frontend-Stale'] == 'true'
+    # Stale copies are per token: another user gets nothing
+    upstream.answers.append(response(503))
+    assert frontend.make_request('GET', '/api/consulta/stats', auth_token='other').status_code == 503
+
+
+def test_open_circuit_fails_fast_without_calling_the_upstream(upstream):
+    threshold = frontend.CIRCUIT_FAILURE_THRESHOLD
+    upstream.answers.extend(requests.exceptions.ConnectionError('refused') for _ in range(threshold))
+    for _ in range(threshold):
+        assert frontend.make_request('GET', '/api/consulta/stats', auth_token='t') is None
+
+    assert frontend.make_request('GET', '/api/consulta/search', auth_token='t') is None
+    assert len(upstream.sent) == threshold
+    assert frontend.circuit_breakers.for_endpoint('/api/consulta/stats').state == 'open'
+
+
+def test_stale_cache_expires_and_stays_within_its_byte_budget():
+    cache = frontend.StaleResponseCache(max_bytes=800, max_age_seconds=0.05)
+    for index in range(10):
+        cache.put(f'key-{index}', response(200, b'x' * 100))
+
+    assert cache.status()['bytes'] <= 800
+    assert cache.get('key-0') is None
+    assert cache.get('key-9') is not None
+    # Larger than an eighth of the budget: never stored
+    cache.put('big', response(200, b'x' * 200))
+    assert cache.get('big') is None
+    time.sleep(0.06)
+    assert cache.get('key-9') is None
@@ -0,0 +1,109 @@
+"""Conditional GETs: stored responses revalidated with If-None-Match / If-Modified-Since."""
+import pytest
+import requests
+
+import app as frontend
+
+ENDPOINT = '/api/consulta/persona/1001'
+
+
+def response(status, body=b'', **headers):
+    result = requests.Response()
+    result.status_code = status
+    result._content = body
+    result.headers.update(headers)
+    return result
+
+
+class RevalidatingGateway:
+    """Answers 304 when the request's If-None-Match matches the current ETag"""
+
+    def __init__(self, body=b'{"primer_nombre": "Ana"}', etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+        self.evict_before_answer = None
+
+    def request(self, method, endpoint, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        if self.evict_before_answer:
+            self.evict_before_answer()
+            self.evict_before_answer = None
+        if headers and headers.get('If-None-Match') == self.etag:
+            return response(304, ETag=self.etag, **{'X-Trace-Id': f'trace-{len(self.requests)}'})
+        return response(200, self.body, ETag=self.etag, **{'Content-Type': 'application/json'})
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setattr(frontend, 'circuit_breakers', frontend.CircuitBreakerRegistry())
+    monkeypatch.setattr(frontend, 'stale_responses', frontend.StaleResponseCache())
+    monkeypatch.setattr(frontend, 'response_cache', frontend.ConditionalResponseCache())
+    fake = RevalidatingGateway()
+    monkeypatch.setattr(frontend.gateway_client, 'request', fake.request)
+    return fake
+
+
+def test_unchanged_record_is_served_from_the_304(gateway):
+    first = frontend.make_request('GET', ENDPOINT, auth_token='t')
+    second = frontend.make_request('GET', ENDPOINT, auth_token='t')
+
+    assert 'If-None-Match' not in gateway.requests[0]
+    assert gateway.requests[1]['If-None-Match'] == '"v1"'
+    # The no-cache request headers would make the upstream ignore the validators
+    assert 'Cache-Control' not in gateway.requests[1] and 'Pragma' not in gateway.requests[1]
+    assert second.status_code == 200
+    assert second.json() == first.json() == {'primer_nombre': 'Ana'}
+    assert second.headers['X-Trace-Id'] == 'trace-2'
+    assert frontend.response_cache.status()['revalidated'] == 1
+
+
+def test_changed_record_replaces_the_stored_response(gateway):
+    frontend.make_request('GET', ENDPOINT, auth_token='t')
+    gateway.body, gateway.etag = b'{"primer_nombre": "Eva"}', '"v2"'
+
+    assert frontend.make_request('GET', ENDPOINT, auth_token='t').json() == {'primer_nombre': 'Eva'}
+    assert frontend.make_request('GET', ENDPOINT, auth_token='t').json() == {'primer_nombre': 'Eva'}
+    assert gateway.requests[2]['If-None-Match'] == '"v2"'
+
+
+def test_304_for_an_evicted_entry_refetches_the_body(gateway):
+    frontend.make_request('GET', ENDPOINT, auth_token='t')
+    key = frontend.stale_responses.key_for('t', ENDPOINT, None)
+    gateway.evict_before_answer = lambda: frontend.response_cache.put(key, response(404))
+
+    refetched = frontend.make_request('GET', ENDPOINT, auth_token='t')
+
+    assert refetched.json() == {'primer_nombre': 'Ana'}
+    assert len(gateway.requests) == 3
+    assert 'If-None-Match' not in gateway.requests[2]
+
+
+def test_only_200s_with_validators_are_kept():
+    cache = frontend.ConditionalResponseCache()
+    cache.put('a', response(200, b'{}', ETag='"1"'))
+    cache.put('b', response(200, b'{}'))
+    cache.put('c', response(200, b'{}', **{'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}))
+
+    assert cache.validators('a') == {'If-None-Match': '"1"'}
+    assert cache.validators('b') == {}
+    assert cache.validators('c') == {'If-Modified-Since': 'Wed, 01 Jan 2025 00:00:00 GMT'}
+    # An error for a key drops what was stored for it
+    cache.put('a', response(404))
+    assert cache.validators('a') == {}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = frontend.ConditionalResponseCache(max_bytes=800, max_entries=3)
+    for key in 'abc':
+        cache.put(key, response(200, b'x' * 10, ETag=f'"{key}"'))
+    cache.get_revalidated('a', response(304))
+    cache.put('d', response(200, b'x' * 10, ETag='"d"'))
+
+    assert cache.validators('b') == {}
+    assert all(cache.validators(key) for key in 'acd')
+
+    for index in range(10):
+        cache.put(f'big-{index}', response(200, b'x' * 100, ETag='"big"'))
+    assert cache.status()['bytes'] <= 800
+    assert cache.status()['entries'] <= 3
@@ -0,0 +1,60 @@
+"""Streamed exports (/personas/exportar) against the stub gateway from benchmarks/."""
+import csv
+import io
+
+from stub_gateway import STATS
+
+import app as frontend
+
+
+def test_export_pages_bypass_the_response_caches(client, monkeypatch):
+    limits = []
+    make_request = frontend.make_request
+
+    def recording(method, endpoint, *args, **kwargs):
+        limits.append(kwargs['params']['limit'])
+        return make_request(method, endpoint, *args, **kwargs)
+
+    monkeypatch.setattr(frontend, 'make_request', recording)
+    stale_before = frontend.stale_responses.status()['entries']
+    conditional_before = frontend.response_cache.status()['entries']
+
+    response = client.get('/personas/exportar?format=csv')
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('﻿'))))
+
+    assert len(rows) == STATS['total_personas'] + 1
+    assert limits == [frontend.EXPORT_CHUNK_SIZE] * 3
+    assert frontend.stale_responses.status()['entries'] == stale_before
+    assert frontend.response_cache.status()['entries'] == conditional_before
+
+
+FORMULA = '=HYPERLINK("http://x","a")'
+
+
+def test_export_value_quotes_formulas():
+    assert frontend.export_value(FORMULA) == "'" + FORMULA
+    assert frontend.export_value('@SUM(A1)') == "'@SUM(A1)"
+    assert frontend.export_value('\tcmd') == "'\tcmd"
+    assert frontend.export_value({'q': 1}) == '{"q": 1}'
+    assert frontend.export_value('Ana') == 'Ana'
+    assert frontend.export_value(-5) == -5
+
+
+def xlsx_sheet(rows, columns):
+    import zipfile
+
+    xlsx = b''.join(frontend.stream_xlsx(columns, [rows], sheet_name='logs'))
+    return zipfile.ZipFile(io.BytesIO(xlsx)).read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+
+def test_xlsx_writes_formula_text_as_strings(monkeypatch):
+    monkeypatch.setattr(frontend, 'export_value', lambda value: value)
+
+    assert '<f>' not in xlsx_sheet([{'user_agent': FORMULA}], ['user_agent'])
+
+
+def test_exports_never_write_live_formulas():
+    rows = [{'user_agent': FORMULA, 'error_message': '+1+1'}]
+    body = b''.join(frontend.stream_csv(['user_agent', 'error_message'], [rows])).decode('utf-8')
+    assert next(csv.reader(io.StringIO(body.splitlines()[1]))) == ["'" + FORMULA, "'+1+1"]
+    assert '<f>' not in xlsx_sheet(rows, ['user_agent', 'error_message'])
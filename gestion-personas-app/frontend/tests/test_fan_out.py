@@ -0,0 +1,44 @@
+"""fan_out_requests: parallel gateway calls under one deadline."""
+import time
+
+import app as frontend
+
+
+def fake_gateway(monkeypatch, delays):
+    """make_request that sleeps ``delays[endpoint]`` and answers with the endpoint"""
+    def make_request(method, endpoint, timeout_seconds=None, **kwargs):
+        delay = delays[endpoint]
+        if isinstance(delay, Exception):
+            raise delay
+        time.sleep(delay)
+        return None if endpoint == '/none' else endpoint
+
+    monkeypatch.setattr(frontend, 'make_request', make_request)
+
+
+def test_calls_run_in_parallel(monkeypatch):
+    fake_gateway(monkeypatch, {'/a': 0.2, '/b': 0.2, '/c': 0.2})
+    calls = {name: {'method': 'GET', 'endpoint': f'/{name}'} for name in 'abc'}
+
+    started = time.monotonic()
+    with frontend.app.test_request_context():
+        responses, errors = frontend.fan_out_requests(calls, deadline_seconds=2.0)
+
+    assert time.monotonic() - started < 0.5
+    assert responses == {'a': '/a', 'b': '/b', 'c': '/c'}
+    assert errors == {}
+
+
+def test_slow_and_failed_calls_become_errors(monkeypatch):
+    fake_gateway(monkeypatch, {'/fast': 0.0, '/slow': 1.0, '/none': 0.0, '/boom': RuntimeError('boom')})
+    calls = {name: {'method': 'GET', 'endpoint': f'/{name}'} for name in ('fast', 'slow', 'none', 'boom')}
+
+    started = time.monotonic()
+    with frontend.app.test_request_context():
+        responses, errors = frontend.fan_out_requests(calls, deadline_seconds=0.3)
+
+    assert time.monotonic() - started < 0.8
+    assert responses == {'fast': '/fast'}
+    assert errors['slow'].startswith('Deadline')
+    assert errors['none'] == 'No response from gateway'
+    assert errors['boom'] == 'Unexpected error: boom'
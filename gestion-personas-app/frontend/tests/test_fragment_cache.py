@@ -0,0 +1,101 @@
+"""Template fragment cache: keyed by (name, data version), LRU-bounded."""
+import app as frontend
+
+TEMPLATE = ("{% call cache('stats', version) %}<b>{{ label }}</b> {{ total }}{% endcall %}")
+
+
+def render(cache, **context):
+    return frontend.app.jinja_env.from_string(TEMPLATE).render(cache=cache.render, **context)
+
+
+def counting_caller(markup):
+    calls = []
+
+    def caller():
+        calls.append(1)
+        return markup
+    return caller, calls
+
+
+def test_same_version_reuses_the_rendered_markup():
+    cache = frontend.FragmentCache()
+
+    first = render(cache, version='v1', label='Total', total=10)
+    # Anything the version doesn't cover is not re-read for a cached block
+    second = render(cache, version='v1', label='Otro', total=99)
+
+    assert first == second == '<b>Total</b> 10'
+    assert cache.status()['hits'] == 1 and cache.status()['misses'] == 1
+
+
+def test_new_version_renders_again():
+    cache = frontend.FragmentCache()
+    render(cache, version='v1', label='Total', total=10)
+
+    assert render(cache, version='v2', label='Total', total=11) == '<b>Total</b> 11'
+    assert cache.status()['entries'] == 2
+
+
+def test_cached_markup_is_not_escaped_twice():
+    cache = frontend.FragmentCache()
+    render(cache, version='v1', label='<i>', total=1)
+
+    assert render(cache, version='v1', label='<i>', total=1) == '<b>&lt;i&gt;</b> 1'
+
+
+def test_none_version_or_disabled_cache_renders_every_time():
+    for cache, version in ((frontend.FragmentCache(), None), (frontend.FragmentCache(max_entries=0), 'v1')):
+        caller, calls = counting_caller('x')
+        cache.render('stats', version, caller)
+        cache.render('stats', version, caller)
+        assert len(calls) == 2
+        assert cache.status()['entries'] == 0
+
+
+def test_same_version_under_another_name_is_a_separate_entry():
+    cache = frontend.FragmentCache()
+    cache.render('dashboard-stats', 'v1', lambda: 'stats')
+
+    assert cache.render('dashboard-charts', 'v1', lambda: 'charts') == 'charts'
+
+
+def test_least_recently_used_fragments_are_evicted():
+    cache = frontend.FragmentCache(max_entries=2, max_bytes=10)
+    cache.render('a', 1, lambda: 'aaa')
+    cache.render('b', 1, lambda: 'bbb')
+    cache.render('a', 1, lambda: 'unused')
+    cache.render('c', 1, lambda: 'ccc')
+
+    caller, calls = counting_caller('bbb')
+    cache.render('b', 1, caller)
+    assert calls == [1]
+    assert cache.status()['evictions'] >= 1
+
+    cache.render('d', 1, lambda: 'd' * 8)
+    assert cache.status()['bytes'] <= 10
+    # Larger than the whole cache: returned but never stored
+    caller, calls = counting_caller('e' * 11)
+    cache.render('e', 1, caller)
+    cache.render('e', 1, caller)
+    assert len(calls) == 2
+
+
+def test_stats_fingerprint_ignores_response_metadata():
+    stats = {'total_personas': 3, 'por_genero': {'F': 2, 'M': 1}}
+
+    assert frontend.stats_fingerprint(stats) == frontend.stats_fingerprint(
+        {**stats, '_cache': 'hit', '_responseTime': 12})
+    assert frontend.stats_fingerprint(stats) != frontend.stats_fingerprint({**stats, 'total_personas': 4})
+
+
+def test_dashboard_reuses_its_fragments(client, monkeypatch):
+    cache = frontend.FragmentCache()
+    monkeypatch.setitem(frontend.app.jinja_env.globals, 'cache_fragment', cache.render)
+
+    first = client.get('/dashboard')
+    misses = cache.status()['misses']
+    second = client.get('/dashboard')
+
+    assert first.status_code == second.status_code == 200
+    assert misses >= 2
+    assert cache.status()['hits'] == misses
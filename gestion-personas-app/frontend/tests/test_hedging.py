@@ -0,0 +1,60 @@
+"""Hedges and retries only for side-effect-free gateway GETs."""
+import pytest
+import requests
+
+import app as frontend
+
+
+def unavailable_attempts(monkeypatch):
+    """Make every upstream GET answer 503 and record the endpoints attempted"""
+    attempts = []
+
+    def timed_get(endpoint, histogram, timeout_seconds=None, **kwargs):
+        attempts.append(endpoint)
+        response = requests.Response()
+        response.status_code = 503
+        return response
+
+    monkeypatch.setattr(frontend, 'timed_get', timed_get)
+    monkeypatch.setattr(frontend, 'retry_budget', frontend.RetryBudget())
+    monkeypatch.setattr(frontend.time, 'sleep', lambda seconds: None)
+    return attempts
+
+
+def test_logged_lookups_are_attempted_once(monkeypatch):
+    attempts = unavailable_attempts(monkeypatch)
+    for endpoint in ('/api/consulta/persona/123', '/api/consulta/search', '/api/personas/123'):
+        frontend.conditional_get(None, endpoint, {})
+
+    assert attempts == ['/api/consulta/persona/123', '/api/consulta/search', '/api/personas/123']
+
+
+def test_log_reads_are_retried(monkeypatch):
+    attempts = unavailable_attempts(monkeypatch)
+    frontend.conditional_get(None, '/api/logs/search', {})
+
+    assert attempts == ['/api/logs/search', '/api/logs/search']
+
+
+def test_hedged_wait_gives_up_at_the_deadline(monkeypatch):
+    release = frontend.threading.Event()
+
+    def stuck(endpoint, histogram, timeout_seconds=None, **kwargs):
+        release.wait(5)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    monkeypatch.setattr(frontend, 'timed_get', stuck)
+    monkeypatch.setattr(frontend, 'retry_budget', frontend.RetryBudget())
+    histogram = frontend.latency_tracker.for_endpoint('/api/logs/stats')
+    for _ in range(frontend.HEDGE_MIN_SAMPLES):
+        histogram.observe(0.01)
+
+    started = frontend.time.perf_counter()
+    try:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            frontend.hedged_get('/api/logs/stats', timeout_seconds=0.3)
+    finally:
+        release.set()
+    assert frontend.time.perf_counter() - started < 1.0
@@ -0,0 +1,82 @@
+"""Bulk import (/personas/importar) against the stub gateway from benchmarks/."""
+import json
+import tempfile
+from io import BytesIO
+
+import app as frontend
+
+HEADER = 'numero_documento,tipo_documento,primer_nombre,segundo_nombre,apellidos,fecha_nacimiento,genero,correo_electronico,celular\n'
+
+
+def persona_row(documento):
+    return f'{documento},Cédula,Ana,,Pérez,1990-01-01,Femenino,ana{documento}@example.com,3000000000\n'
+
+
+def import_events(client, content, filename='personas.csv'):
+    response = client.post('/personas/importar', data={'archivo': (BytesIO(content), filename)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_import_runs_to_completion(client):
+    content = HEADER + persona_row(1001) + persona_row(1002) + persona_row(1001) + 'x,Cédula,,,,,,,\n'
+    events = import_events(client, content.encode('utf-8'))
+
+    assert events[-1] == {'type': 'done', 'total': 4, 'processed': 4, 'created': 2, 'failed': 2}
+    errors = [event for event in events if event['type'] == 'error']
+    assert sorted(event['row'] for event in errors) == [4, 5]
+
+
+def test_import_streams_xlsx(client):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER.strip().split(','))
+    sheet.append([3001, 'Cédula', 'Ana', None, 'Pérez', '1990-01-01', 'Femenino', 'ana@example.com', 3000000000])
+    output = BytesIO()
+    workbook.save(output)
+    events = import_events(client, output.getvalue(), 'personas.xlsx')
+
+    assert events[-1] == {'type': 'done', 'total': 1, 'processed': 1, 'created': 1, 'failed': 0}
+
+
+def test_import_is_not_limited_to_the_photo_size(client):
+    rows = ''.join(persona_row(2000000 + index) for index in range(40000))
+    content = (HEADER + rows).encode('utf-8')
+    assert len(content) > frontend.app.config['MAX_CONTENT_LENGTH']
+    response = client.post('/personas/importar', data={'archivo': (BytesIO(content), 'personas.csv')},
+                           content_type='multipart/form-data')
+
+    # Read past the photo limit and rejected by the row limit instead
+    assert response.status_code == 400
+    assert 'filas' in response.get_json()['error']
+
+
+def test_import_too_large_has_its_own_message(client, monkeypatch):
+    monkeypatch.setattr(frontend, 'IMPORT_MAX_BYTES', 1024)
+    content = (HEADER + persona_row(1001) * 100).encode('utf-8')
+    response = client.post('/personas/importar', data={'archivo': (BytesIO(content), 'personas.csv')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 413
+    assert 'archivo' in response.get_json()['error']
+
+
+class LegacySpooledFile(tempfile.SpooledTemporaryFile):
+    """SpooledTemporaryFile as on Python 3.10 (the image's version): no readable()/seekable()"""
+
+    def __getattribute__(self, name):
+        if name in ('readable', 'seekable', 'writable'):
+            raise AttributeError(name)
+        return super().__getattribute__(name)
+
+
+def test_import_reads_a_spooled_upload_without_readable(client, monkeypatch):
+    import werkzeug.formparser
+
+    monkeypatch.setattr(werkzeug.formparser, 'SpooledTemporaryFile', LegacySpooledFile)
+    events = import_events(client, (HEADER + persona_row(4001)).encode('utf-8'))
+
+    assert events[-1] == {'type': 'done', 'total': 1, 'processed': 1, 'created': 1, 'failed': 0}
@@ -0,0 +1,47 @@
+"""Queue-backed log handler: formatting on the listener thread, nothing lost at shutdown."""
+import io
+import json
+import logging
+
+import app as frontend
+
+
+def make_handler(maxsize=10000):
+    stream = io.StringIO()
+    target = frontend.BatchedStreamHandler(stream)
+    target.setFormatter(frontend.StructuredFormatter(json_output=True))
+    return frontend.AsyncLogHandler(target, maxsize=maxsize), stream
+
+
+def record(msg, *args, **extra):
+    return logging.makeLogRecord({'name': 'test', 'levelno': logging.INFO, 'levelname': 'INFO',
+                                  'msg': msg, 'args': args, **extra})
+
+
+def test_message_with_immutable_args_is_formatted_by_the_listener():
+    handler, _ = make_handler()
+    prepared = handler.prepare(record('persona %s status %d', '1001', 200))
+
+    assert prepared.args == ('1001', 200)
+    assert prepared.getMessage() == 'persona 1001 status 200'
+
+
+def test_mutable_args_are_interpolated_before_queueing():
+    handler, _ = make_handler()
+    data = {'estado': 'activo'}
+    prepared = handler.prepare(record('persona %s', data))
+    data['estado'] = 'eliminado'
+
+    assert prepared.args is None
+    assert prepared.getMessage() == "persona {'estado': 'activo'}"
+
+
+def test_close_writes_every_queued_record_with_its_extra_fields():
+    handler, stream = make_handler(maxsize=50)
+    for index in range(200):
+        handler.handle(record('call %d', index, endpoint='/api/personas'))
+    handler.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) + handler.dropped == 200
+    assert lines[0]['msg'] == 'call 0' and lines[0]['endpoint'] == '/api/personas'
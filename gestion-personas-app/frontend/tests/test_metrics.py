@@ -0,0 +1,93 @@
+"""Metrics: per-thread shards and totals merged across gunicorn workers."""
+import multiprocessing
+import threading
+
+import pytest
+
+import app as frontend
+
+
+def test_thread_per_request_shards_do_not_pile_up():
+    metrics = frontend.Metrics(directory=None)
+    requests_sent = 200
+    for _ in range(requests_sent):
+        thread = threading.Thread(target=metrics.inc, args=('frontend_requests_total', ('GET',)))
+        thread.start()
+        thread.join()
+
+    # Only the last request's thread can still be registered: nobody scraped in between
+    assert len(metrics._shards) <= 1
+    counters = metrics.snapshot()['counters']
+    assert counters[('frontend_requests_total', ('GET',))] == requests_sent
+
+
+def test_requests_from_many_threads_are_all_counted():
+    key = ('frontend_http_requests_total', ('login', 'GET', '200'))
+    before = frontend.metrics.snapshot()['counters'].get(key, 0)
+    requests_sent = 8 * 25
+
+    def send():
+        client = frontend.app.test_client()
+        for _ in range(25):
+            client.get('/login')
+
+    threads = [threading.Thread(target=send) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert frontend.metrics.snapshot()['counters'][key] - before == requests_sent
+
+
+def record(metrics, requests_sent, seconds):
+    for _ in range(requests_sent):
+        metrics.inc('frontend_http_requests_total', ('login', 'GET', '200'))
+        metrics.observe('frontend_http_request_duration_seconds', ('login',), seconds)
+    metrics.add('frontend_http_requests_in_flight', (), 1)
+
+
+def forked_worker(directory, requests_sent):
+    """Body of a forked worker: record, then flush for the others to read"""
+    # Reset at fork: the samples the parent recorded must not be reported again
+    metrics = frontend.metrics
+    metrics.directory = directory
+    record(metrics, requests_sent, 0.2)
+    metrics.flush()
+
+
+def test_collect_merges_every_worker(tmp_path):
+    metrics = frontend.Metrics(directory=str(tmp_path))
+    metrics.definitions = frontend.metrics.definitions
+    record(metrics, 3, 0.004)
+    fork = multiprocessing.get_context('fork')
+    for requests_sent in (5, 7):
+        worker = fork.Process(target=forked_worker, args=(str(tmp_path), requests_sent))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+
+    totals = metrics.collect()
+
+    assert totals['counters'][('frontend_http_requests_total', ('login', 'GET', '200'))] == 15
+    assert totals['gauges'][('frontend_http_requests_in_flight', ())] == 3
+    histogram = totals['histograms'][('frontend_http_request_duration_seconds', ('login',))]
+    assert sum(histogram[:-1]) == 15
+    assert histogram[-1] == pytest.approx(3 * 0.004 + 12 * 0.2)
+    rendered = metrics.render(totals)
+    assert 'frontend_http_request_duration_seconds_count{endpoint="login"} 15' in rendered
+    assert 'frontend_http_request_duration_seconds_bucket{endpoint="login",le="0.005"} 3' in rendered
+
+
+def test_archived_workers_keep_counters_but_not_gauges(tmp_path):
+    metrics = frontend.Metrics(directory=str(tmp_path))
+    exited = frontend.Metrics(directory=None)
+    record(exited, 4, 0.01)
+    metrics._write(metrics._path_for(999999), exited.snapshot())
+
+    metrics.archive(999999)
+    totals = metrics.collect()
+
+    assert not (tmp_path / 'worker-999999.json').exists()
+    assert totals['counters'][('frontend_http_requests_total', ('login', 'GET', '200'))] == 4
+    assert ('frontend_http_requests_in_flight', ()) not in totals['gauges']
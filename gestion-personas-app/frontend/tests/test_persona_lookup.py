@@ -0,0 +1,39 @@
+"""Persona lookups of the check/modify/delete pages go through consulta's cache."""
+import pytest
+
+from stub_gateway import make_persona
+
+import app as frontend
+
+
+@pytest.fixture
+def gets(monkeypatch):
+    """Endpoints of the GETs sent to the gateway"""
+    endpoints = []
+    make_request = frontend.make_request
+
+    def recording(method, endpoint, *args, **kwargs):
+        if method == 'GET':
+            endpoints.append(endpoint)
+        return make_request(method, endpoint, *args, **kwargs)
+
+    monkeypatch.setattr(frontend, 'make_request', recording)
+    return endpoints
+
+
+def test_check_uses_consulta(client, gets):
+    response = client.get('/personas/check/1001')
+
+    assert response.status_code == 200
+    assert gets == ['/api/consulta/persona/1001']
+
+
+@pytest.mark.parametrize('path, session_key', [('/personas/modificar', 'persona_to_modify'),
+                                               ('/personas/borrar', 'persona_to_delete')])
+def test_search_uses_consulta_without_cache_metadata(client, gets, path, session_key):
+    client.post(path, data={'action': 'buscar', 'numero_documento': '1001'})
+
+    assert gets == ['/api/consulta/persona/1001']
+    with client.session_transaction() as session:
+        persona = session[session_key]
+    assert persona == make_persona(1)
@@ -0,0 +1,42 @@
+"""Server-side sessions: lazy loading and a new id on login."""
+import threading
+import time
+
+import app as frontend
+
+
+def test_concurrent_first_access_sees_the_loaded_data():
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'token': 'abc'}
+
+    session = frontend.LazyServerSideSession('sid', loader=slow_loader)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(session.get('token'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == ['abc'] * 8
+    assert len(calls) == 1
+
+
+def test_login_rotates_the_session_id(gateway):
+    client = frontend.app.test_client()
+    cookie_name = frontend.app.config['SESSION_COOKIE_NAME']
+    # Anything that stores the session before login (here a flash) hands out an id
+    client.get('/logout/complete')
+    planted = client.get_cookie(cookie_name).value
+    planted_sid = frontend.app.session_interface._get_signer(frontend.app).unsign(planted).decode()
+    store = frontend.app.session_interface.cache
+    assert store.get(frontend.SESSION_KEY_PREFIX + planted_sid) is not None
+
+    client.post('/login', data={'login_method': 'local', 'username': 'test', 'password': 'test'})
+
+    assert client.get_cookie(cookie_name).value != planted
+    assert store.get(frontend.SESSION_KEY_PREFIX + planted_sid) is None
+    assert client.get('/dashboard').status_code == 200
@@ -0,0 +1,110 @@
+"""SingleFlight: concurrent calls for one key share a single execution."""
+import threading
+import time
+
+import pytest
+
+import app as frontend
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Call ``flight.do(key, fn)`` from ``callers`` threads; returns results and errors"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_until_queued(flight, callers):
+    while True:
+        counters = flight.counters()
+        if counters['executed'] + counters['coalesced'] >= callers:
+            return
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = frontend.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'total_personas': 7}
+
+    threads, results, errors = run_concurrently(flight, 'stats', fetch, 10)
+    wait_until_queued(flight, 10)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'total_personas': 7}] * 10 and not errors
+    assert flight.counters() == {'executed': 1, 'coalesced': 9, 'in_flight': 0}
+
+
+def test_waiters_get_the_leaders_exception():
+    flight = frontend.SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    threads, results, errors = run_concurrently(flight, 'stats', fail, 5)
+    wait_until_queued(flight, 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert [str(error) for error in errors] == ['upstream down'] * 5
+
+
+def test_keys_are_independent_and_finished_calls_run_again():
+    flight = frontend.SingleFlight()
+
+    assert flight.do(('stats', 1), lambda: 'a') == 'a'
+    assert flight.do(('stats', 2), lambda: 'b') == 'b'
+    assert flight.do(('stats', 1), lambda: 'c') == 'c'
+    with pytest.raises(KeyError):
+        flight.do(('stats', 1), lambda: {}['missing'])
+    assert flight.counters() == {'executed': 4, 'coalesced': 0, 'in_flight': 0}
+
+
+def test_stats_cache_misses_are_coalesced(monkeypatch):
+    release = threading.Event()
+    fetches = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {'total_personas': 3}
+
+    def make_request(method, endpoint, **kwargs):
+        fetches.append(endpoint)
+        release.wait(5)
+        return Response()
+
+    monkeypatch.setattr(frontend, 'make_request', make_request)
+    cache = frontend.StatsCache()
+    threads = [threading.Thread(target=cache.get, args=('/api/consulta/stats',), kwargs={'auth_token': 't'})
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_until_queued(cache.flight, 8)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert fetches == ['/api/consulta/stats']
@@ -0,0 +1,123 @@
+"""StatsCache: stale-while-revalidate snapshots of the consulta stats and their versioning."""
+import time
+
+import app as frontend
+
+ENDPOINT = '/api/consulta/dashboard/stats'
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return dict(self.data)
+
+
+def consulta_stats(monkeypatch, consulta):
+    """Serve ``consulta`` to stats fetches (no response while it has ``down``); returns the fetch log"""
+    fetches = []
+
+    def make_request(method, endpoint, **kwargs):
+        fetches.append(endpoint)
+        if consulta.get('down'):
+            return None
+        return FakeResponse({key: value for key, value in consulta.items() if key != 'down'})
+
+    monkeypatch.setattr(frontend, 'make_request', make_request)
+    return fetches
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        time.sleep(0.01)
+
+
+def test_fresh_snapshot_is_served_without_fetching(monkeypatch):
+    fetches = consulta_stats(monkeypatch, {'total_personas': 1})
+    cache = frontend.StatsCache(ttl=60)
+
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 1}, 'miss')
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 1}, 'fresh')
+    assert fetches == [ENDPOINT]
+
+
+def test_expired_snapshot_is_served_while_one_refresh_runs(monkeypatch):
+    consulta = {'total_personas': 1}
+    fetches = consulta_stats(monkeypatch, consulta)
+    cache = frontend.StatsCache(ttl=0.05, max_stale=60)
+    cache.get(ENDPOINT, auth_token='t')
+    time.sleep(0.1)
+    consulta['total_personas'] = 2
+
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 1}, 'stale')
+    wait_for(lambda: cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 2}, 'fresh'))
+    assert len(fetches) == 2
+
+
+def test_snapshot_past_max_stale_is_fetched_synchronously(monkeypatch):
+    consulta = {'total_personas': 1}
+    consulta_stats(monkeypatch, consulta)
+    cache = frontend.StatsCache(ttl=0.01, max_stale=0.01)
+    cache.get(ENDPOINT, auth_token='t')
+    time.sleep(0.05)
+    consulta['total_personas'] = 2
+
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 2}, 'miss')
+
+
+def test_invalidate_refetches_and_falls_back_to_the_last_snapshot(monkeypatch):
+    consulta = {'total_personas': 1}
+    fetches = consulta_stats(monkeypatch, consulta)
+    cache = frontend.StatsCache(ttl=60)
+    cache.get(ENDPOINT, auth_token='t')
+
+    cache.invalidate()
+    consulta['down'] = True
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 1}, 'stale')
+    assert cache.get('/api/consulta/stats', auth_token='t') == (None, 'unavailable')
+
+    consulta.pop('down')
+    consulta['total_personas'] = 2
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 2}, 'miss')
+    assert cache.status()['snapshots'][ENDPOINT]['current']
+    assert fetches.count(ENDPOINT) == 3
+
+
+def test_fetch_from_before_an_invalidation_does_not_replace_a_newer_snapshot(monkeypatch):
+    consulta = {'total_personas': 2}
+    consulta_stats(monkeypatch, consulta)
+    cache = frontend.StatsCache(ttl=60)
+    cache.invalidate()
+    cache.get(ENDPOINT, auth_token='t')
+
+    consulta['total_personas'] = 1
+    # A fetch that started under the previous version finishes last
+    cache._fetch_uncoalesced(ENDPOINT, 0, None, 't')
+
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 2}, 'fresh')
+
+
+def test_read_during_remote_invalidation_is_not_kept(monkeypatch):
+    cache = frontend.StatsCache()
+    monkeypatch.setattr(frontend, 'stats_cache', cache)
+    consulta = {'total_personas': 1}
+
+    def make_request(method, endpoint, **kwargs):
+        if method == 'POST':
+            # Another request misses while consulta still has the old numbers
+            assert cache.get(ENDPOINT, auth_token='t')[0] == {'total_personas': 1}
+            consulta['total_personas'] = 2
+            return FakeResponse({})
+        return FakeResponse(consulta)
+
+    monkeypatch.setattr(frontend, 'make_request', make_request)
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 1}, 'miss')
+
+    frontend.invalidate_stats_cache(auth_token='t')
+
+    assert cache.get(ENDPOINT, auth_token='t') == ({'total_personas': 2}, 'miss')
@@ -0,0 +1,119 @@
+"""StatsBroadcaster: the dashboard stats Server-Sent Events producer."""
+import json
+
+import app as frontend
+
+
+def fetch_tokens(monkeypatch, results):
+    """Patch the stats cache to record each token and answer from ``results``"""
+    tokens = []
+
+    def get(endpoint, timeout_seconds=None, allow_stale=True, auth_token=None):
+        tokens.append(auth_token)
+        return results.pop(0) if results else {'total_personas': 1}, 'fresh'
+
+    monkeypatch.setattr(frontend.stats_cache, 'get', get)
+    return tokens
+
+
+def test_producer_drops_the_token_of_a_subscriber_that_left(monkeypatch):
+    tokens = fetch_tokens(monkeypatch, [])
+    broadcaster = frontend.StatsBroadcaster(max_clients=5)
+    monkeypatch.setattr(broadcaster, '_run', lambda: None)
+    first = broadcaster.subscribe('token-a')
+    broadcaster.subscribe('token-b')
+
+    fetcher, token = next(iter(broadcaster._clients.items()))
+    broadcaster._check(token)
+    broadcaster.unsubscribe(first)
+    fetcher, token = next(iter(broadcaster._clients.items()))
+    broadcaster._check(token)
+
+    assert tokens == ['token-a', 'token-b']
+
+
+def test_failed_fetch_moves_on_to_another_subscriber(monkeypatch):
+    fetch_tokens(monkeypatch, [None])
+    broadcaster = frontend.StatsBroadcaster(max_clients=5)
+    monkeypatch.setattr(broadcaster, '_run', lambda: None)
+    broadcaster.subscribe('expired')
+    broadcaster.subscribe('valid')
+
+    fetcher, token = next(iter(broadcaster._clients.items()))
+    assert broadcaster._check(token) is False
+    broadcaster._rotate(fetcher)
+
+    assert next(iter(broadcaster._clients.values())) == 'valid'
+
+
+def stats_event(message):
+    """Payload of a ``stats`` SSE message"""
+    event, data = message.strip().split('\n')
+    assert event == 'event: stats'
+    return json.loads(data[len('data: '):])
+
+
+def test_subscribers_beyond_capacity_are_turned_away(monkeypatch):
+    broadcaster = frontend.StatsBroadcaster(max_clients=2)
+    monkeypatch.setattr(broadcaster, '_run', lambda: None)
+
+    assert broadcaster.subscribe('a') is not None
+    assert broadcaster.subscribe('b') is not None
+    assert broadcaster.subscribe('c') is None
+    assert broadcaster.client_count() == 2
+
+
+def test_only_changed_keys_are_published(monkeypatch):
+    fetch_tokens(monkeypatch, [{'total_personas': 1, 'por_genero': {'F': 1}, '_cache': True},
+                               {'total_personas': 2, 'por_genero': {'F': 1}},
+                               {'total_personas': 2, 'por_genero': {'F': 1}},
+                               {'total_personas': 2}])
+    broadcaster = frontend.StatsBroadcaster(max_clients=5)
+    monkeypatch.setattr(broadcaster, '_run', lambda: None)
+    client = broadcaster.subscribe('t')
+    for _ in range(4):
+        broadcaster._check('t')
+
+    events = [stats_event(client.get_nowait()) for _ in range(client.qsize())]
+    assert events == [
+        {'full': True, 'version': 1, 'changes': {'total_personas': 1, 'por_genero': {'F': 1}}, 'removed': []},
+        {'full': False, 'version': 2, 'changes': {'total_personas': 2}, 'removed': []},
+        {'full': False, 'version': 3, 'changes': {}, 'removed': ['por_genero']},
+    ]
+    # A late subscriber starts from the full current snapshot
+    late = broadcaster.subscribe('t')
+    assert stats_event(late.get_nowait()) == {'full': True, 'version': 3, 'changes': {'total_personas': 2},
+                                              'removed': []}
+
+
+def test_slow_client_is_resynced_with_one_full_snapshot(monkeypatch):
+    fetch_tokens(monkeypatch, [{'total_personas': n} for n in range(1, 5)])
+    broadcaster = frontend.StatsBroadcaster(max_clients=5, client_buffer=2)
+    monkeypatch.setattr(broadcaster, '_run', lambda: None)
+    client = broadcaster.subscribe('t')
+    for _ in range(4):
+        broadcaster._check('t')
+
+    assert client.qsize() <= 2
+    latest = [stats_event(client.get_nowait()) for _ in range(client.qsize())][-1]
+    assert latest['changes'] == {'total_personas': 4}
+
+
+def test_producer_pushes_on_notify_and_stops_with_the_last_client(monkeypatch):
+    results = [{'total_personas': 1}]
+    fetch_tokens(monkeypatch, results)
+    broadcaster = frontend.StatsBroadcaster(max_clients=5, heartbeat_seconds=0.05, poll_seconds=60)
+    client = broadcaster.subscribe('t')
+    assert stats_event(client.get(timeout=2))['changes'] == {'total_personas': 1}
+
+    results.append({'total_personas': 5})
+    broadcaster.notify()
+    message = client.get(timeout=2)
+    while message.startswith(': heartbeat'):
+        message = client.get(timeout=2)
+    assert stats_event(message)['changes'] == {'total_personas': 5}
+
+    producer = broadcaster._producer
+    broadcaster.unsubscribe(client)
+    producer.join(2)
+    assert not producer.is_alive()
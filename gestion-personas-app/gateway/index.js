@@ -5,6 +5,7 @@ const helmet = require('helmet');
 const morgan = require('morgan');
 const rateLimit = require('express-rate-limit');
 const axios = require('axios');
+const crypto = require('crypto');
 require('dotenv').config();
 
 console.log('🚀 Iniciando API Gateway en modo desarrollo con hot reload...');
@@ -12,6 +13,31 @@ console.log('🚀 Iniciando API Gateway en modo desarrollo con hot reload...');
 const app = express();
 const PORT = process.env.PORT || 8001;
 
+// IDs de traza entrantes que se reutilizan tal cual (el resto se reemplaza)
+const TRACE_ID_PATTERN = /^[A-Za-z0-9-]{8,64}$/;
+
+// Trazas: cada request recibe un x-trace-id (el del frontend o uno nuevo) que se
+// reenvía a los servicios, y la respuesta agrega al Server-Timing de los servicios
+// el tiempo de la verificación de auth y el total dentro del gateway
+app.use((req, res, next) => {
+  const incoming = req.headers['x-trace-id'];
+  req.traceId = TRACE_ID_PATTERN.test(incoming || '') ? incoming : crypto.randomUUID().replace(/-/g, '');
+  req.headers['x-trace-id'] = req.traceId;
+  req.timings = {};
+  res.setHeader('X-Trace-Id', req.traceId);
+
+  const started = process.hrtime.bigint();
+  const writeHead = res.writeHead;
+  res.writeHead = function (...args) {
+    const entries = Object.entries(req.timings).map(([name, ms]) => `${name};dur=${ms.toFixed(1)}`);
+    entries.push(`gateway;dur=${(Number(process.hrtime.bigint() - started) / 1e6).toFixed(1)}`);
+    const upstream = res.getHeader('Server-Timing');
+    res.setHeader('Server-Timing', [upstream, ...entries].filter(Boolean).join(', '));
+    return writeHead.apply(this, args);
+  };
+  next();
+});
+
 // Middleware de seguridad con CSP personalizada para permitir imágenes
 app.use(helmet({
   contentSecurityPolicy: {
@@ -38,9 +64,12 @@ app.use(cors({
   ],
   credentials: true,
   methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-  allowedHeaders: ['Content-Type', 'Authorization', 'X-Requested-With', 'x-user-id']
+  allowedHeaders: ['Content-Type', 'Authorization', 'X-Requested-With', 'x-user-id', 'x-trace-id'],
+  exposedHeaders: ['X-Trace-Id', 'Server-Timing']
 }));
-app.use(morgan('combined'));
+// Formato "combined" más el ID de traza
+morgan.token('trace-id', (req) => req.traceId);
+app.use(morgan(':remote-addr - :remote-user [:date[clf]] ":method :url HTTP/:http-version" :status :res[content-length] ":referrer" ":user-agent" trace=:trace-id'));
 
 // Rate limiting
 const limiter = rateLimit({
@@ -101,10 +130,12 @@ const authMiddleware = async (req, res, next) => {
   }
 
   // Para tokens reales, verificar con el servicio de autenticación
+  const verifyStarted = process.hrtime.bigint();
   try {
     const authResponse = await axios.get(`${process.env.AUTH_SERVICE_URL || 'http://auth-service:3001'}/verify`, {
-      headers: { Authorization: `Bearer ${token}` }
+      headers: { Authorization: `Bearer ${token}`, 'x-trace-id': req.traceId }
     });
+    req.timings.auth = Number(process.hrtime.bigint() - verifyStarted) / 1e6;
     
     if (authResponse.status === 200) {
       req.headers['x-user-id'] = String(authResponse.data.user.id);
@@ -113,7 +144,8 @@ const authMiddleware = async (req, res, next) => {
       return res.status(401).json({ error: 'Invalid token' });
     }
   } catch (error) {
-    console.error('Token verification error:', error.message);
+    req.timings.auth = Number(process.hrtime.bigint() - verifyStarted) / 1e6;
+    console.error('Token verification error:', error.message, 'trace:', req.traceId);
     return res.status(401).json({ error: 'Token verification failed' });
   }
 };
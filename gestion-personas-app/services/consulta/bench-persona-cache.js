@@ -0,0 +1,73 @@
+// Benchmark: hot-key persona lookup latency per tier (Postgres, Redis, local L1).
+//
+// Needs DATABASE_URL and REDIS_URL, so run it next to the service:
+//   docker exec consulta_service_dev node bench-persona-cache.js [numero_documento] [iterations]
+require('dotenv').config();
+const { Pool } = require('pg');
+const redis = require('redis');
+const { PersonaCache } = require('./personaCache');
+
+function summarize(label, samples) {
+  const ordered = [...samples].sort((a, b) => a - b);
+  const at = (percent) => ordered[Math.min(ordered.length - 1, Math.floor(ordered.length * percent / 100))];
+  const mean = ordered.reduce((sum, value) => sum + value, 0) / ordered.length;
+  console.log(`${label.padEnd(10)} mean ${(mean * 1000).toFixed(1).padStart(8)} us   ` +
+    `p50 ${(at(50) * 1000).toFixed(1).padStart(8)} us   p99 ${(at(99) * 1000).toFixed(1).padStart(8)} us`);
+}
+
+async function time(iterations, lookup) {
+  const samples = [];
+  for (let i = 0; i < iterations; i++) {
+    const started = process.hrtime.bigint();
+    await lookup();
+    samples.push(Number(process.hrtime.bigint() - started) / 1e6);
+  }
+  return samples;
+}
+
+async function main() {
+  const pool = new Pool({ connectionString: process.env.DATABASE_URL, max: 4 });
+  const redisClient = redis.createClient({ url: process.env.REDIS_URL });
+  await redisClient.connect();
+
+  let numeroDocumento = process.argv[2];
+  if (!numeroDocumento) {
+    const result = await pool.query('SELECT numero_documento FROM personas LIMIT 1');
+    if (result.rows.length === 0) {
+      throw new Error('No hay personas registradas; pase un numero_documento');
+    }
+    numeroDocumento = result.rows[0].numero_documento;
+  }
+  const iterations = parseInt(process.argv[3]) || 2000;
+  const load = async () => {
+    const result = await pool.query('SELECT * FROM personas WHERE numero_documento = $1', [numeroDocumento]);
+    return result.rows[0] || null;
+  };
+
+  // Warm up connections and make sure the Redis key exists
+  const redisOnly = new PersonaCache(redisClient, { l1TtlMs: 0 });
+  const withL1 = new PersonaCache(redisClient);
+  for (let i = 0; i < 50; i++) {
+    await load();
+    await redisOnly.get(numeroDocumento, load);
+  }
+
+  console.log(`Hot key ${numeroDocumento}, ${iterations} sequential lookups per tier`);
+  summarize('postgres', await time(iterations, load));
+  summarize('redis', await time(iterations, () => redisOnly.get(numeroDocumento, load)));
+  summarize('l1', await time(iterations, () => withL1.get(numeroDocumento, load)));
+
+  // Many concurrent lookups of one cold key share a single Redis/database round trip
+  const cold = new PersonaCache(redisClient);
+  const started = process.hrtime.bigint();
+  await Promise.all(Array.from({ length: 100 }, () => cold.get(numeroDocumento, load)));
+  console.log(`100 concurrent cold lookups: ${(Number(process.hrtime.bigint() - started) / 1e6).toFixed(2)} ms`, cold.stats());
+
+  await redisClient.quit();
+  await pool.end();
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -5,6 +5,9 @@ const helmet = require('helmet');
 const cors = require('cors');
 const compression = require('compression');
 const axios = require('axios');
+const { AsyncLocalStorage } = require('async_hooks');
+const { PersonaCache } = require('./personaCache');
+const { setPersonaValidators } = require('../shared/personaContract');
 require('dotenv').config();
 
 const app = express();
@@ -16,6 +19,22 @@ app.use(cors());
 app.use(compression());
 app.use(express.json());
 
+// Per-request query timing, reported as Server-Timing so the gateway and the
+// frontend can tell database time apart from the rest of the request
+const requestTimings = new AsyncLocalStorage();
+
+app.use((req, res, next) => {
+  const timing = { started: process.hrtime.bigint(), dbMs: 0, queries: 0 };
+  const writeHead = res.writeHead;
+  res.writeHead = function (...args) {
+    const totalMs = Number(process.hrtime.bigint() - timing.started) / 1e6;
+    res.setHeader('Server-Timing',
+      `db;dur=${timing.dbMs.toFixed(1)};desc="${timing.queries} queries", consulta;dur=${totalMs.toFixed(1)}`);
+    return writeHead.apply(this, args);
+  };
+  requestTimings.run(timing, next);
+});
+
 // Database connection with connection pooling
 const pool = new Pool({
   connectionString: process.env.DATABASE_URL,
@@ -24,6 +43,20 @@ const pool = new Pool({
   connectionTimeoutMillis: 2000,
 });
 
+// Time every query of the current request (summed, so parallel queries may exceed wall time)
+const poolQuery = pool.query.bind(pool);
+pool.query = (...args) => {
+  const timing = requestTimings.getStore();
+  if (!timing) {
+    return poolQuery(...args);
+  }
+  const started = process.hrtime.bigint();
+  return poolQuery(...args).finally(() => {
+    timing.dbMs += Number(process.hrtime.bigint() - started) / 1e6;
+    timing.queries += 1;
+  });
+};
+
 // Redis connection for caching
 const redisClient = redis.createClient({
   url: process.env.REDIS_URL
@@ -35,6 +68,15 @@ redisClient.connect();
 // Cache TTL in seconds
 const CACHE_TTL = 300; // 5 minutes
 
+// Persona lookups by documento: local L1 + Redis, kept current by the personas service
+const personaCache = new PersonaCache(redisClient, {
+  ttlSeconds: CACHE_TTL,
+  notFoundTtlSeconds: parseInt(process.env.PERSONA_CACHE_NOT_FOUND_TTL_SECONDS) || 30,
+  l1TtlMs: parseInt(process.env.PERSONA_CACHE_L1_TTL_MS) || 5000,
+  l1MaxEntries: parseInt(process.env.PERSONA_CACHE_L1_MAX_ENTRIES) || 1000
+});
+personaCache.subscribe().catch((err) => console.error('Persona cache subscribe error', err));
+
 // Helper function to generate cache key
 function getCacheKey(type, params) {
   return `consulta:${type}:${JSON.stringify(params)}`;
@@ -56,7 +98,7 @@ async function logTransaction(type, entityId, numeroDocumento, status, req, resp
       response_data: responseData,
       status: status,
       error_message: error
-    });
+    }, { headers: { 'x-trace-id': req.headers['x-trace-id'] } });
   } catch (error) {
     console.error('Error logging transaction:', error);
   }
@@ -95,48 +137,33 @@ app.get('/persona/:numero_documento', async (req, res) => {
   try {
     const { numero_documento } = req.params;
     
-    // Disable caching for real-time updates
-    // const cacheKey = getCacheKey('persona', { numero_documento });
-    // const cachedData = await redisClient.get(cacheKey);
-    // if (cachedData) {
-    //   const persona = JSON.parse(cachedData);
-    //   await logTransaction('QUERY_CACHED', persona.id, numero_documento, 'SUCCESS', req, persona);
-    //   return res.json({
-    //     ...persona,
-    //     _cache: true,
-    //     _responseTime: Date.now() - startTime
-    //   });
-    // }
-
-    // Query database
-    const result = await pool.query(
-      'SELECT * FROM personas WHERE numero_documento = $1',
-      [numero_documento]
-    );
+    const { persona, source } = await personaCache.get(numero_documento, async () => {
+      const result = await pool.query(
+        'SELECT * FROM personas WHERE numero_documento = $1',
+        [numero_documento]
+      );
+      return result.rows[0] || null;
+    });
+    const cached = source !== 'db';
 
-    if (result.rows.length === 0) {
-      await logTransaction('QUERY', null, numero_documento, 'NOT_FOUND', req);
+    if (!persona) {
+      await logTransaction(cached ? 'QUERY_CACHED' : 'QUERY', null, numero_documento, 'NOT_FOUND', req);
       return res.status(404).json({ error: 'Persona no encontrada' });
     }
 
-    const persona = result.rows[0];
-
-    // Disable caching for real-time updates
-    // await redisClient.setEx(cacheKey, CACHE_TTL, JSON.stringify(persona));
-
     // Log successful query
-    await logTransaction('QUERY', persona.id, numero_documento, 'SUCCESS', req, persona);
+    await logTransaction(cached ? 'QUERY_CACHED' : 'QUERY', persona.id, numero_documento, 'SUCCESS', req, persona);
 
-    // Add headers to prevent caching
-    res.set({
-      'Cache-Control': 'no-cache, no-store, must-revalidate',
-      'Pragma': 'no-cache',
-      'Expires': '0'
-    });
+    // Unchanged since the caller's copy: answer 304 without a body
+    setPersonaValidators(res, persona);
+    if (req.fresh) {
+      return res.status(304).end();
+    }
 
     res.json({
       ...persona,
-      _cache: false,
+      _cache: cached,
+      _cacheTier: source,
       _responseTime: Date.now() - startTime
     });
   } catch (error) {
@@ -147,6 +174,27 @@ app.get('/persona/:numero_documento', async (req, res) => {
 });
 
 // Search personas with filters and caching
+// Keyset pagination: the cursor is the (created_at, id) of the last row of the
+// previous page, so every page is an index range scan no matter how deep it is.
+// Same ceiling as the log service so exports can page in large chunks
+const SEARCH_MAX_LIMIT = 1000;
+
+function encodeCursor(row) {
+  return Buffer.from(JSON.stringify([row.cursor_created_at, row.id])).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+  try {
+    const [createdAt, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+    if (typeof createdAt !== 'string' || !Number.isInteger(id)) {
+      return null;
+    }
+    return { createdAt, id };
+  } catch (error) {
+    return null;
+  }
+}
+
 app.get('/search', async (req, res) => {
   const startTime = Date.now();
   try {
@@ -155,8 +203,10 @@ app.get('/search', async (req, res) => {
       genero,
       edad_min,
       edad_max,
-      page = 1,
-      limit = 10
+      cursor,
+      page,
+      limit = 10,
+      include_total
     } = req.query;
 
     // Disable caching for real-time updates
@@ -172,63 +222,95 @@ app.get('/search', async (req, res) => {
     //   });
     // }
 
-    // Build query
-    let query = 'SELECT * FROM personas_con_edad WHERE 1=1';
+    // Build filters
+    let where = ' WHERE 1=1';
     const params = [];
     let paramCount = 1;
 
     if (tipo_documento) {
-      query += ` AND tipo_documento = $${paramCount}`;
+      where += ` AND tipo_documento = $${paramCount}`;
       params.push(tipo_documento);
       paramCount++;
     }
 
     if (genero) {
-      query += ` AND genero = $${paramCount}`;
+      where += ` AND genero = $${paramCount}`;
       params.push(genero);
       paramCount++;
     }
 
     if (edad_min) {
-      query += ` AND edad >= $${paramCount}`;
+      where += ` AND edad >= $${paramCount}`;
       params.push(parseInt(edad_min));
       paramCount++;
     }
 
     if (edad_max) {
-      query += ` AND edad <= $${paramCount}`;
+      where += ` AND edad <= $${paramCount}`;
       params.push(parseInt(edad_max));
       paramCount++;
     }
 
-    // Count total results
-    const countQuery = query.replace('SELECT *', 'SELECT COUNT(*)');
-    const countResult = await pool.query(countQuery, params);
-    const totalCount = parseInt(countResult.rows[0].count);
+    const pageLimit = Math.min(Math.max(parseInt(limit) || 10, 1), SEARCH_MAX_LIMIT);
+    // Legacy offset paging is only used when a caller asks for page > 1 without a cursor
+    const legacyPage = !cursor && parseInt(page) > 1 ? parseInt(page) : null;
+    // The exact count scans every matching row: only computed on request (always for legacy paging)
+    const wantTotal = include_total === 'true' || legacyPage !== null || (page !== undefined && !cursor);
 
-    // Add pagination
-    const offset = (parseInt(page) - 1) * parseInt(limit);
-    query += ` ORDER BY created_at DESC LIMIT $${paramCount} OFFSET $${paramCount + 1}`;
-    params.push(parseInt(limit), offset);
+    let totalCount = null;
+    if (wantTotal) {
+      const countResult = await pool.query(`SELECT COUNT(*) FROM personas_con_edad${where}`, params);
+      totalCount = parseInt(countResult.rows[0].count);
+    }
 
-    // Execute query
-    const result = await pool.query(query, params);
-
-    const response = {
-      personas: result.rows,
-      pagination: {
-        page: parseInt(page),
-        limit: parseInt(limit),
-        total: totalCount,
-        totalPages: Math.ceil(totalCount / parseInt(limit))
+    const pageParams = [...params];
+    let pageWhere = where;
+    if (cursor) {
+      const position = decodeCursor(cursor);
+      if (!position) {
+        return res.status(400).json({ error: 'Cursor inválido' });
       }
+      pageWhere += ` AND (created_at, id) < ($${paramCount}::timestamp, $${paramCount + 1})`;
+      pageParams.push(position.createdAt, position.id);
+      paramCount += 2;
+    }
+
+    // One extra row tells whether there is a next page without counting
+    let query = `SELECT *, created_at::text AS cursor_created_at FROM personas_con_edad${pageWhere}` +
+      ` ORDER BY created_at DESC, id DESC LIMIT $${paramCount}`;
+    pageParams.push(pageLimit + 1);
+    if (legacyPage !== null) {
+      query += ` OFFSET $${paramCount + 1}`;
+      pageParams.push((legacyPage - 1) * pageLimit);
+    }
+
+    // Execute query
+    const result = await pool.query(query, pageParams);
+    const hasMore = result.rows.length > pageLimit;
+    const rows = result.rows.slice(0, pageLimit);
+    const nextCursor = hasMore ? encodeCursor(rows[rows.length - 1]) : null;
+    const personas = rows.map(({ cursor_created_at, ...persona }) => persona);
+
+    const pagination = {
+      limit: pageLimit,
+      next_cursor: nextCursor,
+      has_more: hasMore
     };
+    if (legacyPage !== null || page !== undefined) {
+      pagination.page = legacyPage || 1;
+    }
+    if (totalCount !== null) {
+      pagination.total = totalCount;
+      pagination.totalPages = Math.ceil(totalCount / pageLimit);
+    }
+
+    const response = { personas, pagination };
 
     // Disable caching for real-time updates
     // await redisClient.setEx(cacheKey, CACHE_TTL, JSON.stringify(response));
 
     // Log search
-    await logTransaction('SEARCH', null, null, 'SUCCESS', req, { count: result.rows.length, filters: req.query });
+    await logTransaction('SEARCH', null, null, 'SUCCESS', req, { count: personas.length, filters: req.query });
 
     // Add headers to prevent caching
     res.set({
@@ -459,6 +541,14 @@ app.post('/cache/invalidate-stats', async (req, res) => {
   }
 });
 
+// Persona cache hit/miss counters for this instance
+app.get('/cache/stats', (req, res) => {
+  res.json({
+    persona: personaCache.stats(),
+    instance: process.env.HOSTNAME || 'unknown'
+  });
+});
+
 // Graceful shutdown
 process.on('SIGTERM', async () => {
   console.log('SIGTERM signal received: closing HTTP server');
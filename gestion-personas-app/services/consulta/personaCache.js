@@ -0,0 +1,126 @@
+// Persona entity cache: a small in-process LRU (L1) in front of Redis (L2) in
+// front of Postgres, keyed by numero_documento.
+//
+// The personas service owns writes: after every create/update it writes the
+// RETURNING row to the Redis key, after a delete it writes a tombstone, and in
+// both cases it publishes the numero_documento on PERSONA_CACHE_CHANNEL so every
+// consulta replica drops its L1 copy. Lookups here only fill the cache with
+// SET NX, so a slow read that raced a write can never overwrite what the
+// personas service wrote. The L1 TTL bounds staleness if a message is missed.
+
+// Key format and channel are shared with the personas service's write-through
+const { PERSONA_CACHE_CHANNEL, personaCacheKey } = require('../shared/personaContract');
+
+// A cached "no such persona": lookups for documents that do not exist yet
+// (the create form checks every document before submitting) skip the database too
+const TOMBSTONE = 'null';
+
+class PersonaCache {
+  constructor(redisClient, { ttlSeconds = 300, notFoundTtlSeconds = 30, l1TtlMs = 5000, l1MaxEntries = 1000 } = {}) {
+    this.redis = redisClient;
+    this.ttlSeconds = ttlSeconds;
+    this.notFoundTtlSeconds = notFoundTtlSeconds;
+    this.l1TtlMs = l1TtlMs;
+    this.l1MaxEntries = l1MaxEntries;
+    // Map keeps insertion order: re-inserting on a hit makes the first key the least recently used
+    this.l1 = new Map();
+    // Concurrent misses for one document share a single Redis/database round trip
+    this.inflight = new Map();
+    this.counters = { l1_hits: 0, redis_hits: 0, misses: 0, coalesced: 0, redis_errors: 0, invalidations: 0 };
+  }
+
+  // Resolves to { persona, source } where persona is null when it does not
+  // exist and source is 'l1', 'redis' or 'db'. load() queries the database.
+  async get(numeroDocumento, load) {
+    const entry = this.l1.get(numeroDocumento);
+    if (entry && entry.expires > Date.now()) {
+      this.l1.delete(numeroDocumento);
+      this.l1.set(numeroDocumento, entry);
+      this.counters.l1_hits++;
+      return { persona: entry.persona, source: 'l1' };
+    }
+
+    let pending = this.inflight.get(numeroDocumento);
+    if (pending) {
+      this.counters.coalesced++;
+    } else {
+      pending = this._fetch(numeroDocumento, load).finally(() => this.inflight.delete(numeroDocumento));
+      this.inflight.set(numeroDocumento, pending);
+    }
+    return pending;
+  }
+
+  async _fetch(numeroDocumento, load) {
+    const key = personaCacheKey(numeroDocumento);
+    try {
+      const cached = await this.redis.get(key);
+      if (cached !== null) {
+        const persona = JSON.parse(cached);
+        this._remember(numeroDocumento, persona);
+        this.counters.redis_hits++;
+        return { persona, source: 'redis' };
+      }
+    } catch (error) {
+      // Redis down: serve from the database rather than failing the lookup
+      this.counters.redis_errors++;
+      console.error('Persona cache read error:', error.message);
+    }
+
+    const row = await load();
+    this.counters.misses++;
+    // Round-trip through JSON so every tier hands out the same shape (dates as ISO strings)
+    const serialized = row ? JSON.stringify(row) : TOMBSTONE;
+    const persona = JSON.parse(serialized);
+    try {
+      await this.redis.set(key, serialized, {
+        NX: true,
+        EX: persona ? this.ttlSeconds : this.notFoundTtlSeconds
+      });
+    } catch (error) {
+      this.counters.redis_errors++;
+      console.error('Persona cache write error:', error.message);
+    }
+    this._remember(numeroDocumento, persona);
+    return { persona, source: 'db' };
+  }
+
+  _remember(numeroDocumento, persona) {
+    this.l1.delete(numeroDocumento);
+    this.l1.set(numeroDocumento, { persona, expires: Date.now() + this.l1TtlMs });
+    if (this.l1.size > this.l1MaxEntries) {
+      this.l1.delete(this.l1.keys().next().value);
+    }
+  }
+
+  // Drop the local copy only; Redis is kept current by the personas service
+  evict(numeroDocumento) {
+    this.counters.invalidations++;
+    this.l1.delete(numeroDocumento);
+  }
+
+  // Follow the personas service's invalidations on a dedicated connection
+  // (a subscribed Redis connection cannot run other commands)
+  async subscribe() {
+    const subscriber = this.redis.duplicate();
+    subscriber.on('error', (err) => console.error('Persona cache subscriber error', err));
+    await subscriber.connect();
+    await subscriber.subscribe(PERSONA_CACHE_CHANNEL, (numeroDocumento) => this.evict(numeroDocumento));
+    // Anything cached while we were not listening may be stale
+    subscriber.on('ready', () => this.l1.clear());
+    return subscriber;
+  }
+
+  stats() {
+    const lookups = this.counters.l1_hits + this.counters.redis_hits + this.counters.misses;
+    return {
+      ...this.counters,
+      lookups,
+      hit_ratio: lookups ? (this.counters.l1_hits + this.counters.redis_hits) / lookups : null,
+      l1_size: this.l1.size,
+      l1_max_entries: this.l1MaxEntries,
+      l1_ttl_ms: this.l1TtlMs
+    };
+  }
+}
+
+module.exports = { PersonaCache };
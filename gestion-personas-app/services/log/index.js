@@ -35,6 +35,8 @@ const logSchema = Joi.object({
   error_message: Joi.string().allow(null)
 });
 
+const SEARCH_MAX_LIMIT = 1000;
+
 const searchSchema = Joi.object({
   transaction_type: Joi.string(),
   entity_type: Joi.string(),
@@ -44,9 +46,30 @@ const searchSchema = Joi.object({
   fecha_inicio: Joi.date().iso(),
   fecha_fin: Joi.date().iso(),
   page: Joi.number().min(1).default(1),
-  limit: Joi.number().min(1).max(100).default(20)
+  limit: Joi.number().min(1).max(SEARCH_MAX_LIMIT).default(20),
+  // Empty cursor = first keyset page
+  cursor: Joi.string().allow(''),
+  include_total: Joi.string().valid('true', 'false')
 });
 
+// Keyset pagination for exports: the cursor is the (created_at, id) of the
+// last row returned, so deep pages cost the same as the first one
+function encodeCursor(row) {
+  return Buffer.from(JSON.stringify([row.cursor_created_at, row.id])).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+  try {
+    const [createdAt, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+    if (typeof createdAt !== 'string' || !Number.isInteger(id)) {
+      return null;
+    }
+    return { createdAt, id };
+  } catch (error) {
+    return null;
+  }
+}
+
 // Routes
 
 // Health check
@@ -131,12 +154,14 @@ app.get('/search', async (req, res) => {
       fecha_inicio,
       fecha_fin,
       page = 1,
-      limit = 20
+      limit = 20,
+      cursor,
+      include_total
     } = req.query;
 
     // Validate and sanitize pagination parameters
     const pageNum = Math.max(1, parseInt(page) || 1);
-    const limitNum = Math.max(1, Math.min(100, parseInt(limit) || 20));
+    const limitNum = Math.max(1, Math.min(SEARCH_MAX_LIMIT, parseInt(limit) || 20));
 
     // Build dynamic query
     let query = 'SELECT * FROM transaction_logs WHERE 1=1';
@@ -188,27 +213,59 @@ app.get('/search', async (req, res) => {
       paramCount++;
     }
 
-    // Count total results
-    const countQuery = query.replace('SELECT *', 'SELECT COUNT(*)');
-    const countResult = await pool.query(countQuery, params);
-    const totalCount = parseInt(countResult.rows[0].count);
+    // Count total results (skipped in cursor mode unless asked for)
+    let totalCount = null;
+    if (cursor === undefined || include_total === 'true') {
+      const countQuery = query.replace('SELECT *', 'SELECT COUNT(*)');
+      const countResult = await pool.query(countQuery, params);
+      totalCount = parseInt(countResult.rows[0].count);
+    }
 
-    // Add pagination
-    const offset = (pageNum - 1) * limitNum;
-    query += ` ORDER BY created_at DESC LIMIT $${paramCount} OFFSET $${paramCount + 1}`;
-    params.push(limitNum, offset);
+    let pagination;
+    if (cursor !== undefined) {
+      const position = cursor ? decodeCursor(cursor) : { createdAt: null };
+      if (!position) {
+        return res.status(400).json({ error: 'Invalid cursor' });
+      }
+      if (position.createdAt !== null) {
+        query += ` AND (created_at, id) < ($${paramCount}::timestamp, $${paramCount + 1})`;
+        params.push(position.createdAt, position.id);
+        paramCount += 2;
+      }
+      query = query.replace('SELECT *', 'SELECT *, created_at::text AS cursor_created_at');
+      query += ` ORDER BY created_at DESC, id DESC LIMIT $${paramCount}`;
+      params.push(limitNum + 1);
+    } else {
+      // Add pagination
+      const offset = (pageNum - 1) * limitNum;
+      query += ` ORDER BY created_at DESC LIMIT $${paramCount} OFFSET $${paramCount + 1}`;
+      params.push(limitNum, offset);
+    }
 
     // Execute query
     const result = await pool.query(query, params);
+    let logs = result.rows;
 
-    res.json({
-      logs: result.rows,
-      pagination: {
-        page: pageNum,
+    if (cursor !== undefined) {
+      const hasMore = logs.length > limitNum;
+      logs = logs.slice(0, limitNum);
+      pagination = {
         limit: limitNum,
-        total: totalCount,
-        totalPages: Math.ceil(totalCount / limitNum)
-      },
+        next_cursor: hasMore ? encodeCursor(logs[logs.length - 1]) : null,
+        has_more: hasMore
+      };
+      logs = logs.map(({ cursor_created_at, ...log }) => log);
+    } else {
+      pagination = { page: pageNum, limit: limitNum };
+    }
+    if (totalCount !== null) {
+      pagination.total = totalCount;
+      pagination.totalPages = Math.ceil(totalCount / limitNum);
+    }
+
+    res.json({
+      logs,
+      pagination,
       filters: {
         transaction_type,
         entity_type,
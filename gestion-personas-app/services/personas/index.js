@@ -8,6 +8,8 @@ const fs = require('fs').promises;
 const helmet = require('helmet');
 const cors = require('cors');
 const axios = require('axios');
+const redis = require('redis');
+const { PERSONA_CACHE_CHANNEL, personaCacheKey, setPersonaValidators } = require('../shared/personaContract');
 require('dotenv').config();
 
 const app = express();
@@ -55,6 +57,38 @@ const pool = new Pool({
   connectionString: process.env.DATABASE_URL
 });
 
+// Write-through for consulta's persona cache (services/consulta/personaCache.js):
+// same TTLs; the key format and invalidation channel come from services/shared
+const PERSONA_CACHE_TTL = 300;
+const PERSONA_CACHE_NOT_FOUND_TTL = parseInt(process.env.PERSONA_CACHE_NOT_FOUND_TTL_SECONDS) || 30;
+
+const redisClient = process.env.REDIS_URL ? redis.createClient({ url: process.env.REDIS_URL }) : null;
+if (redisClient) {
+  redisClient.on('error', (err) => console.error('Redis Client Error', err));
+  redisClient.connect();
+}
+
+// Store the committed row (or a tombstone once deleted) and tell every consulta
+// replica to drop its local copy. Overwrites unconditionally: consulta only fills
+// missing keys, so the last write here always wins over a concurrent lookup.
+async function writeThroughPersona(numeroDocumento, persona) {
+  if (!redisClient) {
+    return;
+  }
+  try {
+    const key = personaCacheKey(numeroDocumento);
+    if (persona) {
+      await redisClient.setEx(key, PERSONA_CACHE_TTL, JSON.stringify(persona));
+    } else {
+      await redisClient.setEx(key, PERSONA_CACHE_NOT_FOUND_TTL, 'null');
+    }
+    await redisClient.publish(PERSONA_CACHE_CHANNEL, numeroDocumento);
+  } catch (error) {
+    // The database write already succeeded; the cache heals within its TTLs
+    console.error('Error updating persona cache:', error.message);
+  }
+}
+
 // Multer configuration for file uploads
 const storage = multer.memoryStorage();
 const upload = multer({
@@ -63,18 +97,39 @@ const upload = multer({
     fileSize: 2 * 1024 * 1024 // 2MB limit
   },
   fileFilter: (req, file, cb) => {
-    const allowedTypes = /jpeg|jpg|png|gif/;
+    const allowedTypes = /jpeg|jpg|png|gif|webp/;
     const extname = allowedTypes.test(path.extname(file.originalname).toLowerCase());
     const mimetype = allowedTypes.test(file.mimetype);
     
     if (mimetype && extname) {
       return cb(null, true);
     } else {
-      cb(new Error('Solo se permiten imágenes (jpeg, jpg, png, gif)'));
+      cb(new Error('Solo se permiten imágenes (jpeg, jpg, png, gif, webp)'));
     }
   }
 });
 
+// The frontend already downscales photos to PHOTO_MAX_DIMENSION (2x the 300px
+// display size) and re-encodes them to WebP without metadata: those are stored
+// as sent. Anything else (other clients, the frontend's fallback when it could
+// not process an image) is cropped and re-encoded here as before.
+const PHOTO_MAX_DIMENSION = parseInt(process.env.PHOTO_MAX_DIMENSION) || 600;
+
+async function storePhoto(buffer, numeroDocumento) {
+  const image = sharp(buffer);
+  const metadata = await image.metadata();
+  const prepared = metadata.format === 'webp' &&
+    metadata.width <= PHOTO_MAX_DIMENSION && metadata.height <= PHOTO_MAX_DIMENSION &&
+    !metadata.exif && !metadata.icc && !metadata.xmp;
+
+  const data = prepared
+    ? buffer
+    : await image.resize(300, 300, { fit: 'cover' }).jpeg({ quality: 80 }).toBuffer();
+  const filename = `${numeroDocumento}_${Date.now()}.${prepared ? 'webp' : 'jpg'}`;
+  await fs.writeFile(path.join('/uploads', filename), data);
+  return `/uploads/${filename}`;
+}
+
 // Validation schema for personas
 const personaSchema = Joi.object({
   numero_documento: Joi.string()
@@ -204,18 +259,9 @@ app.post('/', upload.single('foto'), async (req, res) => {
     let foto_url = null;
     if (req.file) {
       try {
-        // Resize and optimize image
-        const optimizedImage = await sharp(req.file.buffer)
-          .resize(300, 300, { fit: 'cover' })
-          .jpeg({ quality: 80 })
-          .toBuffer();
-
         // Save to a storage service or local directory
         // For now, we'll save it locally
-        const filename = `${numero_documento}_${Date.now()}.jpg`;
-        const filepath = path.join('/uploads', filename);
-        await fs.writeFile(filepath, optimizedImage);
-        foto_url = `/uploads/${filename}`;
+        foto_url = await storePhoto(req.file.buffer, numero_documento);
       } catch (photoError) {
         console.error('Error processing photo:', photoError);
         // Continue without photo
@@ -249,6 +295,7 @@ app.post('/', upload.single('foto'), async (req, res) => {
     );
 
     const persona = result.rows[0];
+    await writeThroughPersona(numero_documento, persona);
     
     // Log successful creation
     await logTransaction('CREATE', persona.id, numero_documento, null, 'SUCCESS', req, persona);
@@ -284,12 +331,11 @@ app.get('/:numero_documento', async (req, res) => {
     // Log successful query
     await logTransaction('QUERY', persona.id, numero_documento, null, 'SUCCESS', req, persona);
 
-    // Add headers to prevent caching
-    res.set({
-      'Cache-Control': 'no-cache, no-store, must-revalidate',
-      'Pragma': 'no-cache',
-      'Expires': '0'
-    });
+    // Unchanged since the caller's copy: answer 304 without a body
+    setPersonaValidators(res, persona);
+    if (req.fresh) {
+      return res.status(304).end();
+    }
 
     res.json(persona);
   } catch (error) {
@@ -344,17 +390,9 @@ app.put('/:numero_documento', upload.single('foto'), async (req, res) => {
     // Process photo if uploaded
     if (req.file) {
       try {
-        const optimizedImage = await sharp(req.file.buffer)
-          .resize(300, 300, { fit: 'cover' })
-          .jpeg({ quality: 80 })
-          .toBuffer();
-
-        const filename = `${numero_documento}_${Date.now()}.jpg`;
-        const filepath = path.join('/uploads', filename);
-        await fs.writeFile(filepath, optimizedImage);
-        
+        const fotoUrl = await storePhoto(req.file.buffer, numero_documento);
         fields.push(`foto_url = $${paramCount}`);
-        values.push(`/uploads/${filename}`);
+        values.push(fotoUrl);
         paramCount++;
       } catch (photoError) {
         console.error('Error processing photo:', photoError);
@@ -378,6 +416,7 @@ app.put('/:numero_documento', upload.single('foto'), async (req, res) => {
 
     const result = await pool.query(updateQuery, values);
     const persona = result.rows[0];
+    await writeThroughPersona(numero_documento, persona);
 
     // Log successful update
     await logTransaction('UPDATE', persona.id, numero_documento, null, 'SUCCESS', req, persona);
@@ -423,6 +462,7 @@ app.delete('/:numero_documento', async (req, res) => {
       'DELETE FROM personas WHERE numero_documento = $1',
       [numero_documento]
     );
+    await writeThroughPersona(numero_documento, null);
 
     // Log successful deletion
     await logTransaction('DELETE', personaId, numero_documento, null, 'SUCCESS', req);
@@ -0,0 +1,26 @@
+// What the personas and consulta services must agree on about a persona:
+// the Redis key and invalidation channel of consulta's persona cache (written
+// through by personas, read by consulta) and the validators both send for
+// conditional GETs. Each service image copies this directory to /shared, next
+// to its /app, so `require('../shared/personaContract')` resolves the same way
+// in the repository and in the containers.
+
+const PERSONA_CACHE_CHANNEL = 'consulta:persona:invalidate';
+
+function personaCacheKey(numeroDocumento) {
+  return `consulta:persona:${numeroDocumento}`;
+}
+
+// Validators for conditional GETs: a persona's representation changes exactly
+// when its updated_at does (the database trigger bumps it on every UPDATE)
+function setPersonaValidators(res, persona) {
+  const updatedAt = new Date(persona.updated_at || persona.created_at);
+  res.set({
+    'ETag': `W/"persona-${persona.id}-${updatedAt.getTime()}"`,
+    'Last-Modified': updatedAt.toUTCString(),
+    // Clients may keep a copy but must revalidate it on every use
+    'Cache-Control': 'private, no-cache'
+  });
+}
+
+module.exports = { PERSONA_CACHE_CHANNEL, personaCacheKey, setPersonaValidators };